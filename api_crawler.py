@@ -1,305 +1,302 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import requests
-import time
-from datetime import datetime, timedelta
 import logging
 from config import Config
+from log_config import configure_logging
+from http_client import get_http_client
+from circuit_breaker import CircuitOpenError
+from run_deadline import DeadlineExceeded, deadline_expired
+from article_store import article_key
+from topics import QueryPlanner
+from date_utils import normalize_date, pubmed_date, crossref_date, get_date_window, is_within_window
+from ranking import RelevanceRanker
+from enrichment import AbstractEnricher, clean_jats, pubmed_abstract
 
 class APICrawler:
     """通过学术API获取真实文章数据"""
     
-    def __init__(self):
+    def __init__(self, http=None):
         self.config = Config()
         self.setup_logging()
+        self.http = http or get_http_client()
+        self.planner = QueryPlanner()
+        self.ranker = RelevanceRanker()
+        self.enricher = AbstractEnricher(http=self.http)
+        self.skipped_sources = {}  # 本次运行中未能（完整）获取的来源 -> 原因
     
     def setup_logging(self):
         """设置日志"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f"{self.config.PATHS['logs_dir']}/api_crawler.log"),
-                logging.StreamHandler()
-            ]
-        )
+        configure_logging()
         self.logger = logging.getLogger(__name__)
     
-    def get_real_articles(self):
-        """通过API获取真实文章数据"""
+    def begin_run(self):
+        """新一次运行开始：清空跳过记录，打开的熔断器转为半开试探"""
+        self.skipped_sources = {}
+        self.http.begin_run()
+    
+    def get_source_fetchers(self):
+        """主题配置中用到的各数据来源及其抓取函数（抓取函数接受可选的运行截止时间）"""
+        return {
+            source: (lambda deadline=None, source=source: self.get_source_articles(source, deadline))
+            for source in self.planner.sources()
+        }
+    
+    def get_real_articles(self, deadline=None):
+        """通过API获取真实文章数据（按主题配置的查询计划抓取所有来源）"""
         all_articles = []
         
-        # 尝试不同的API源
-        api_sources = [
-            self.get_arxiv_articles,
-            self.get_pubmed_articles,
-            self.get_crossref_articles
-        ]
-        
-        for api_func in api_sources:
+        for source, fetch in self.get_source_fetchers().items():
             try:
-                articles = api_func()
-                if articles:
-                    all_articles.extend(articles)
-                    self.logger.info(f"从 {api_func.__name__} 获取到 {len(articles)} 篇文章")
-                    break  # 如果从一个API获取成功，就停止尝试其他API
+                articles = fetch(deadline)
+                all_articles.extend(articles)
+                self.logger.info(f"从 {source} 获取到 {len(articles)} 篇文章")
             except Exception as e:
-                self.logger.warning(f"API调用失败 {api_func.__name__}: {str(e)}")
+                self.logger.warning(f"API调用失败 {source}: {str(e)}")
                 continue
         
-        return all_articles
+        return self.ranker.select_report(all_articles)
+    
+    def get_source_articles(self, source, deadline=None):
+        """执行某来源的查询计划：每个去重后的查询词只请求一次，结果按文章去重后分配到主题
+
+        deadline 为本次运行的截止时间（后台预取时为None），超出预算时停止剩余查询。
+        """
+        query_funcs = {
+            'arxiv': self.query_arxiv,
+            'pubmed': self.query_pubmed,
+            'crossref': self.query_crossref
+        }
+        queries = self.planner.plan().get(source, [])
+        articles = {}
+        
+        for done, query in enumerate(queries):
+            if deadline_expired(deadline):
+                # 时间预算用完，取消剩余查询，使用已获取的结果
+                self.skipped_sources[source] = f"超出时间预算，仅完成 {done}/{len(queries)} 个查询"
+                self.logger.warning(f"{source} 超出时间预算，跳过剩余 {len(queries) - done} 个查询")
+                if not articles:
+                    raise DeadlineExceeded(f"{source} 超出时间预算")
+                break
+            try:
+                for article in query_funcs[source](query['term'], query['days_back'], deadline):
+                    key = article_key(article)
+                    existing = articles.setdefault(key, article)
+                    existing.setdefault('query_terms', [])
+                    existing['query_terms'].append(query['term'])
+            except (CircuitOpenError, DeadlineExceeded) as e:
+                # 主机已熔断或时间预算用完，剩余查询词不再尝试
+                if isinstance(e, CircuitOpenError):
+                    self.skipped_sources[source] = f"{e.host} 已熔断"
+                else:
+                    self.skipped_sources[source] = f"超出时间预算，仅完成 {done}/{len(queries)} 个查询"
+                self.logger.warning(f"{source} {str(e)}，跳过剩余 {len(queries) - done} 个查询")
+                if not articles:
+                    raise
+                break
+            except Exception as e:
+                self.logger.error(f"{source} API调用失败（{query['term']}）: {str(e)}")
+            
+            self.http.pause(1)  # 避免请求过快（回放时跳过）
+        
+        self.logger.info(f"{source}: {len(queries)} 个查询，去重后 {len(articles)} 篇文章")
+        # 按相关度保留每个来源的前若干篇，再为其中缺少摘要的文章批量补全
+        selected = self.ranker.select(self.planner.assign(list(articles.values())),
+                                      self.config.RANKING_CONFIG['per_source'])
+        try:
+            if not deadline_expired(deadline):
+                self.enricher.enrich(selected, deadline)
+        except Exception as e:
+            self.logger.warning(f"{source} 摘要补全失败: {str(e)}")
+        return selected
     
     def get_arxiv_articles(self):
-        """从arXiv获取AI/机器学习相关文章"""
+        """从arXiv获取文章"""
+        return self.get_source_articles('arxiv')
+    
+    def get_pubmed_articles(self):
+        """从PubMed获取医学相关文章"""
+        return self.get_source_articles('pubmed')
+    
+    def get_crossref_articles(self):
+        """从Crossref获取跨学科学术文章"""
+        return self.get_source_articles('crossref')
+    
+    def query_arxiv(self, term, days_back, deadline=None):
+        """arXiv单个查询词的检索结果"""
         articles = []
+        url = "http://export.arxiv.org/api/query"
+        params = {
+            'search_query': f'all:"{term}"',
+            'start': 0,
+            'max_results': self.config.RANKING_CONFIG['candidates_per_query'],
+            'sortBy': 'submittedDate',
+            'sortOrder': 'descending'
+        }
+        
+        response = self.http.get(url, params=params, source='arxiv', deadline=deadline)
+        response.raise_for_status()
+        
+        # 解析arXiv的Atom格式响应
+        import xml.etree.ElementTree as ET
+        root = ET.fromstring(response.content)
         
-        # arXiv API查询参数 - 专注于儿童言语障碍DLD相关
-        query_terms = [
-            "developmental language disorder",
-            "child language impairment",
-            "speech language pathology children",
-            "language development disorder",
-            "specific language impairment",
-            "childhood apraxia of speech",
-            "pediatric communication disorders",
-            "language delay children",
-            "speech therapy children",
-            "bilingual language disorders",
-            "language disorder children"
-        ]
+        # arXiv的命名空间
+        ns = {'atom': 'http://www.w3.org/2005/Atom'}
         
-        for term in query_terms:
+        for entry in root.findall('atom:entry', ns):
             try:
-                url = "http://export.arxiv.org/api/query"
-                params = {
-                    'search_query': f'all:"{term}"',
-                    'start': 0,
-                    'max_results': 5,
-                    'sortBy': 'submittedDate',
-                    'sortOrder': 'descending'
-                }
-                
-                response = requests.get(url, params=params, timeout=30)
-                response.raise_for_status()
-                
-                # 解析arXiv的Atom格式响应
-                import xml.etree.ElementTree as ET
-                root = ET.fromstring(response.content)
-                
-                # arXiv的命名空间
-                ns = {'atom': 'http://www.w3.org/2005/Atom'}
-                
-                for entry in root.findall('atom:entry', ns):
-                    try:
-                        title = entry.find('atom:title', ns).text.strip()
-                        summary = entry.find('atom:summary', ns).text.strip() if entry.find('atom:summary', ns) is not None else ""
-                        link = entry.find('atom:id', ns).text
-                        published = entry.find('atom:published', ns).text
-                        
-                        # 检查日期是否在范围内
-                        article_date = datetime.fromisoformat(published.replace('Z', '+00:00')).strftime('%Y-%m-%d')
-                        if self.is_within_date_range(article_date):
-                            articles.append({
-                                'title': title,
-                                'abstract': summary[:300] if summary else "摘要暂不可用",
-                                'link': link,
-                                'date': article_date,
-                                'journal': 'arXiv',
-                                'source': 'arxiv'
-                            })
-                    except Exception as e:
-                        self.logger.warning(f"解析arXiv文章失败: {str(e)}")
-                        continue
-                
-                time.sleep(1)  # 避免请求过快
+                title = entry.find('atom:title', ns).text.strip()
+                summary = entry.find('atom:summary', ns).text.strip() if entry.find('atom:summary', ns) is not None else ""
+                link = entry.find('atom:id', ns).text
+                published = entry.find('atom:published', ns).text
                 
+                # 检查日期是否在范围内
+                article_date = normalize_date(published) or ''
+                if self.is_within_date_range(article_date, days_back):
+                    articles.append({
+                        'title': title,
+                        'abstract': ' '.join(summary.split()) if summary else "摘要暂不可用",
+                        'link': link,
+                        'date': article_date,
+                        'journal': 'arXiv',
+                        'source': 'arxiv'
+                    })
             except Exception as e:
-                self.logger.error(f"arXiv API调用失败: {str(e)}")
+                self.logger.warning(f"解析arXiv文章失败: {str(e)}")
                 continue
         
-        return articles[:10]  # 限制数量
+        return articles
     
-    def get_pubmed_articles(self):
-        """从PubMed获取医学相关文章"""
+    def query_pubmed(self, term, days_back, deadline=None):
+        """PubMed单个查询词的检索结果（按入库日期限定时间窗口）"""
         articles = []
         
-        # PubMed搜索关键词 - 专注于儿童言语障碍DLD相关
-        search_terms = [
-            "developmental language disorder children",
-            "specific language impairment",
-            "child language impairment",
-            "pediatric speech disorders",
-            "language delay children",
-            "childhood apraxia of speech",
-            "bilingual language disorders children",
-            "speech therapy pediatric",
-            "communication disorders children",
-            "language disorder children"
-        ]
+        # PubMed E-utilities API
+        base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+        
+        # 搜索文章
+        search_url = f"{base_url}esearch.fcgi"
+        search_params = {
+            'db': 'pubmed',
+            'term': term,
+            'retmode': 'json',
+            'retmax': self.config.RANKING_CONFIG['candidates_per_query'],
+            'sort': 'relevance',
+            'field': 'title',
+            'datetype': 'edat',
+            'reldate': days_back
+        }
+        
+        search_response = self.http.get(search_url, params=search_params, source='pubmed', deadline=deadline)
+        search_response.raise_for_status()
+        search_data = search_response.json()
+        
+        article_ids = search_data.get('esearchresult', {}).get('idlist', [])
+        if not article_ids:
+            return articles
+        
+        # 获取文章详情
+        fetch_url = f"{base_url}efetch.fcgi"
+        fetch_params = {
+            'db': 'pubmed',
+            'id': ','.join(article_ids),
+            'retmode': 'xml'
+        }
+        
+        fetch_response = self.http.get(fetch_url, params=fetch_params, source='pubmed', deadline=deadline)
+        fetch_response.raise_for_status()
         
-        for term in search_terms:
+        # 解析PubMed XML
+        import xml.etree.ElementTree as ET
+        root = ET.fromstring(fetch_response.content)
+        
+        for article in root.findall('.//PubmedArticle'):
             try:
-                # PubMed E-utilities API
-                base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
-                
-                # 搜索文章
-                search_url = f"{base_url}esearch.fcgi"
-                search_params = {
-                    'db': 'pubmed',
-                    'term': term,
-                    'retmode': 'json',
-                    'retmax': 5,
-                    'sort': 'relevance',
-                    'field': 'title'
-                }
+                # 提取标题
+                title_elem = article.find('.//ArticleTitle')
+                title = title_elem.text if title_elem is not None else "无标题"
                 
-                search_response = requests.get(search_url, params=search_params, timeout=30)
-                search_response.raise_for_status()
-                search_data = search_response.json()
+                # 提取摘要（结构化摘要的各部分合并）
+                abstract = pubmed_abstract(article)
                 
-                article_ids = search_data.get('esearchresult', {}).get('idlist', [])
+                # 提取日期（ArticleDate/PubDate 的完整年月日）
+                article_date = pubmed_date(article) or ''
                 
-                if article_ids:
-                    # 获取文章详情
-                    fetch_url = f"{base_url}efetch.fcgi"
-                    fetch_params = {
-                        'db': 'pubmed',
-                        'id': ','.join(article_ids),
-                        'retmode': 'xml'
-                    }
-                    
-                    fetch_response = requests.get(fetch_url, params=fetch_params, timeout=30)
-                    fetch_response.raise_for_status()
-                    
-                    # 解析PubMed XML
-                    import xml.etree.ElementTree as ET
-                    root = ET.fromstring(fetch_response.content)
-                    
-                    for article in root.findall('.//PubmedArticle'):
-                        try:
-                            # 提取标题
-                            title_elem = article.find('.//ArticleTitle')
-                            title = title_elem.text if title_elem is not None else "无标题"
-                            
-                            # 提取摘要
-                            abstract_elem = article.find('.//AbstractText')
-                            abstract = abstract_elem.text if abstract_elem is not None else "摘要暂不可用"
-                            
-                            # 提取日期
-                            pub_date_elem = article.find('.//PubDate/Year')
-                            pub_year = pub_date_elem.text if pub_date_elem is not None else datetime.now().year
-                            
-                            # 生成链接
-                            article_id_elem = article.find('.//ArticleId[@IdType="pubmed"]')
-                            article_id = article_id_elem.text if article_id_elem is not None else ""
-                            link = f"https://pubmed.ncbi.nlm.nih.gov/{article_id}" if article_id else ""
-                            
-                            articles.append({
-                                'title': title,
-                                'abstract': abstract[:300] if abstract else "摘要暂不可用",
-                                'link': link,
-                                'date': f"{pub_year}-01-01",  # PubMed日期精度较低
-                                'journal': 'PubMed',
-                                'source': 'pubmed'
-                            })
-                            
-                        except Exception as e:
-                            self.logger.warning(f"解析PubMed文章失败: {str(e)}")
-                            continue
+                # 生成链接
+                article_id_elem = article.find('.//ArticleId[@IdType="pubmed"]')
+                article_id = article_id_elem.text if article_id_elem is not None else ""
+                link = f"https://pubmed.ncbi.nlm.nih.gov/{article_id}" if article_id else ""
+                doi = article.findtext('.//ArticleId[@IdType="doi"]') or ''
                 
-                time.sleep(1)  # 避免请求过快
+                articles.append({
+                    'title': title,
+                    'abstract': abstract or "摘要暂不可用",
+                    'link': link,
+                    'doi': doi.lower(),
+                    'pmid': article_id,
+                    'date': article_date,
+                    'journal': 'PubMed',
+                    'source': 'pubmed'
+                })
                 
             except Exception as e:
-                self.logger.error(f"PubMed API调用失败: {str(e)}")
+                self.logger.warning(f"解析PubMed文章失败: {str(e)}")
                 continue
         
-        return articles[:10]
+        return articles
     
-    def get_crossref_articles(self):
-        """从Crossref获取跨学科学术文章"""
+    def query_crossref(self, term, days_back, deadline=None):
+        """Crossref单个查询词的检索结果（按出版日期限定时间窗口）"""
         articles = []
+        start_date, _ = get_date_window(days_back)
         
-        search_terms = [
-            "developmental language disorder",
-            "child language impairment",
-            "speech therapy children",
-            "pediatric communication disorders",
-            "language delay children",
-            "specific language impairment",
-            "bilingual language disorders",
-            "childhood apraxia of speech",
-            "speech language pathology",
-            "language disorder children"
-        ]
+        url = "https://api.crossref.org/works"
+        params = {
+            'query': term,
+            'rows': self.config.RANKING_CONFIG['candidates_per_query'],
+            'sort': 'relevance',
+            'filter': f'from-pub-date:{start_date}'
+        }
         
-        for term in search_terms:
+        response = self.http.get(url, params=params, source='crossref', deadline=deadline)
+        response.raise_for_status()
+        data = response.json()
+        
+        for item in data.get('message', {}).get('items', []):
             try:
-                url = "https://api.crossref.org/works"
-                params = {
-                    'query': term,
-                    'rows': 5,
-                    'sort': 'relevance',
-                    'filter': 'from-pub-date:2023'
-                }
-                
-                response = requests.get(url, params=params, timeout=30)
-                response.raise_for_status()
-                data = response.json()
+                title = item.get('title', ['无标题'])[0]
+                abstract = clean_jats(item.get('abstract'))
+                link = item.get('URL', '')
+                date_str = crossref_date(item) or ''
                 
-                for item in data.get('message', {}).get('items', []):
-                    try:
-                        title = item.get('title', ['无标题'])[0]
-                        abstract = item.get('abstract', '摘要暂不可用')
-                        link = item.get('URL', '')
-                        published = item.get('published', {}).get('date-parts', [[2023, 1, 1]])[0]
-                        
-                        # 格式化日期
-                        if len(published) >= 3:
-                            date_str = f"{published[0]}-{published[1]:02d}-{published[2]:02d}"
-                        else:
-                            date_str = f"{published[0]}-01-01"
-                        
-                        journal = item.get('container-title', ['未知期刊'])[0]
-                        
-                        articles.append({
-                            'title': title,
-                            'abstract': abstract[:300] if abstract else "摘要暂不可用",
-                            'link': link,
-                            'date': date_str,
-                            'journal': journal,
-                            'source': 'crossref'
-                        })
-                        
-                    except Exception as e:
-                        self.logger.warning(f"解析Crossref文章失败: {str(e)}")
-                        continue
+                journal = item.get('container-title', ['未知期刊'])[0]
                 
-                time.sleep(1)
+                articles.append({
+                    'title': title,
+                    'abstract': abstract or "摘要暂不可用",
+                    'link': link,
+                    'doi': (item.get('DOI') or '').lower(),
+                    'date': date_str,
+                    'journal': journal,
+                    'source': 'crossref'
+                })
                 
             except Exception as e:
-                self.logger.error(f"Crossref API调用失败: {str(e)}")
+                self.logger.warning(f"解析Crossref文章失败: {str(e)}")
                 continue
         
-        return articles[:10]
+        return articles
     
-    def is_within_date_range(self, date_str):
-        """检查日期是否在指定范围内"""
-        try:
-            article_date = datetime.strptime(date_str, '%Y-%m-%d')
-            start_date, end_date = self.config.get_date_range()
-            start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-            end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-            
-            return start_date_obj <= article_date <= end_date_obj
-        except Exception:
-            return True  # 如果日期解析失败，默认包含
+    def is_within_date_range(self, date_str, days_back=None):
+        """检查日期是否在指定范围内（窗口每天只计算一次；没有日期时保留）"""
+        return is_within_window(date_str, days_back)
     
-    def crawl_journals(self):
+    def crawl_journals(self, deadline=None):
         """主爬取函数 - 不使用模拟数据"""
         self.logger.info("开始通过API获取真实文章数据")
         
-        articles = self.get_real_articles()
+        articles = self.get_real_articles(deadline)
         
         if not articles:
             self.logger.warning("未从任何API获取到文章数据")
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import json
+import bisect
+import hashlib
+import logging
+from datetime import datetime
+from config import Config
+from log_config import configure_logging
+from html_generator import HTMLGenerator, get_template_env
+from topics import TopicMatcher
+
+def _hash(*parts):
+    """计算若干字符串的组合哈希"""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def slugify(name):
+    """生成稳定的URL片段：ASCII部分加名称哈希前缀，避免中文名和重名冲突"""
+    ascii_part = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')[:50]
+    suffix = hashlib.sha1(name.encode('utf-8')).hexdigest()[:6]
+    return f"{ascii_part}-{suffix}" if ascii_part else suffix
+
+
+GROUP_KINDS = ('journals', 'topics')
+MANIFEST_VERSION = 2
+
+
+class ArchiveBuilder:
+    """历史日报的增量静态归档站点
+
+    每天的输入（文章和摘要）保存在 data/archive/days 下，生成索引所需的
+    精简文章列表保存在 data/archive/index 下，每个期刊/主题分组的状态
+    （包含该分组文章的日期及篇数）保存在 data/archive/groups 下。清单
+    文件只记录每天的哈希、摘要预览和篇数、各分组的总篇数、页面签名，
+    以及上次构建后新增或变化的日期和分组。
+
+    构建时只重新生成变化的每日页面和受影响分组的索引页；索引页按
+    时间从旧到新固定分页，新增一天只影响最后一页，因此每次发布的
+    代价与变化的日期和分组数成正比，而不是与历史长度成正比。模板
+    变化时全部重新生成。
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.setup_logging()
+        self.output_dir = self.config.PATHS['archive_dir']
+        self.input_dir = os.path.join(self.config.PATHS['data_dir'], 'archive')
+        self.manifest_path = os.path.join(self.input_dir, 'manifest.json')
+        self.page_size = self.config.ARCHIVE_CONFIG['page_size']
+        self.html_generator = None
+        self.topic_matcher = TopicMatcher()
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def empty_manifest():
+        return {
+            'version': MANIFEST_VERSION,
+            'template_hash': '',
+            'days': {},
+            'groups': {kind: {} for kind in GROUP_KINDS},
+            'dirty_days': [],
+            'dirty_groups': {kind: [] for kind in GROUP_KINDS},
+            'pages': {}
+        }
+
+    def load_manifest(self):
+        """读取清单文件（旧版清单会先迁移）"""
+        if not os.path.exists(self.manifest_path):
+            return self.empty_manifest()
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MANIFEST_VERSION:
+            manifest = self.migrate_manifest(manifest)
+        return manifest
+
+    def migrate_manifest(self, old_manifest):
+        """旧版清单在每天的条目中保存完整文章列表：根据保存的每日输入
+        重建分组状态，并在下次构建时全部重新生成"""
+        self.logger.info("归档清单为旧版格式，正在按每日输入重建分组状态")
+        manifest = self.empty_manifest()
+        for date in sorted(old_manifest.get('days', {})):
+            with open(self.day_input_path(date), 'r', encoding='utf-8') as f:
+                day = json.load(f)
+            self.register_day(manifest, date, day['articles'], day['summary'],
+                              old_manifest['days'][date]['hash'])
+        self.save_manifest(manifest)
+        return manifest
+
+    def save_manifest(self, manifest):
+        """原子写入清单文件"""
+        self._write_file(self.manifest_path, json.dumps(manifest, ensure_ascii=False))
+
+    def day_input_path(self, date):
+        """某天输入数据的保存路径"""
+        return os.path.join(self.input_dir, 'days', f'{date}.json')
+
+    def day_index_path(self, date):
+        """某天精简文章列表的保存路径"""
+        return os.path.join(self.input_dir, 'index', f'{date}.json')
+
+    def group_path(self, kind, key):
+        """某个分组状态的保存路径"""
+        return os.path.join(self.input_dir, 'groups', kind, f'{slugify(key)}.json')
+
+    def load_group(self, kind, key):
+        """读取分组状态 {'key', 'dates': {日期: 篇数}}"""
+        path = self.group_path(kind, key)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'key': key, 'dates': {}}
+
+    def add_day(self, date, articles, summary):
+        """保存某天的输入数据并登记到清单（内容未变化时不做任何写入）"""
+        payload = json.dumps({
+            'date': date,
+            'summary': summary,
+            'articles': articles
+        }, ensure_ascii=False, sort_keys=True, default=list)
+        input_hash = _hash(payload)
+
+        manifest = self.load_manifest()
+        if manifest['days'].get(date, {}).get('hash') == input_hash:
+            return False
+
+        self._write_file(self.day_input_path(date), payload)
+        self.register_day(manifest, date, articles, summary, input_hash)
+        self.save_manifest(manifest)
+        self.logger.info(f"归档输入已更新: {date}")
+        return True
+
+    def register_day(self, manifest, date, articles, summary, input_hash):
+        """写出某天的精简文章列表，更新受影响分组的状态，并标记待构建"""
+        records = [
+            {
+                'title': article.get('title', ''),
+                'link': article.get('link', ''),
+                'journal': article.get('journal', ''),
+                'topics': sorted(article.get('topics') or self.topic_matcher.match(article))
+            }
+            for article in articles
+        ]
+        self._write_file(self.day_index_path(date), json.dumps(records, ensure_ascii=False))
+
+        new_counts = {kind: {} for kind in GROUP_KINDS}
+        for record in records:
+            for kind, keys in (('journals', [record['journal']]), ('topics', record['topics'])):
+                for key in keys:
+                    if key:
+                        new_counts[kind][key] = new_counts[kind].get(key, 0) + 1
+
+        # 受影响的分组：这一天原来所属的分组和现在所属的分组
+        old_keys = manifest['days'].get(date, {}).get('groups', {})
+        for kind in GROUP_KINDS:
+            for key in set(old_keys.get(kind, [])) | set(new_counts[kind]):
+                group = self.load_group(kind, key)
+                if key in new_counts[kind]:
+                    group['dates'][date] = new_counts[kind][key]
+                else:
+                    group['dates'].pop(date, None)
+                self._write_file(self.group_path(kind, key), json.dumps(group, ensure_ascii=False))
+
+                total = sum(group['dates'].values())
+                if total:
+                    manifest['groups'][kind][key] = total
+                else:
+                    manifest['groups'][kind].pop(key, None)
+                if key not in manifest['dirty_groups'][kind]:
+                    manifest['dirty_groups'][kind].append(key)
+
+        excerpt_length = self.config.ARCHIVE_CONFIG['excerpt_length']
+        manifest['days'][date] = {
+            'hash': input_hash,
+            'excerpt': summary[:excerpt_length],
+            'count': len(records),
+            'groups': {kind: sorted(new_counts[kind]) for kind in GROUP_KINDS}
+        }
+        if date not in manifest['dirty_days']:
+            manifest['dirty_days'].append(date)
+
+    def load_day_index(self, date, cache):
+        """读取某天的精简文章列表（同一次构建内缓存）"""
+        if date not in cache:
+            with open(self.day_index_path(date), 'r', encoding='utf-8') as f:
+                cache[date] = json.load(f)
+        return cache[date]
+
+    def templates_hash(self):
+        """模板目录内所有文件的组合哈希，任何模板变化都会使页面失效"""
+        templates_dir = self.config.PATHS['templates_dir']
+        parts = []
+        for root, _, files in os.walk(templates_dir):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                with open(path, 'r', encoding='utf-8') as f:
+                    parts.append(os.path.relpath(path, templates_dir))
+                    parts.append(f.read())
+        return _hash(*sorted(parts))
+
+    def build(self):
+        """增量构建归档站点，返回本次写入的页面数"""
+        manifest = self.load_manifest()
+        template_hash = self.templates_hash()
+        full = manifest['template_hash'] != template_hash
+        if full:
+            self.logger.info("模板已变化，所有归档页面将重新生成")
+            dirty_days = set(manifest['days'])
+            dirty_groups = {kind: set(manifest['groups'][kind]) for kind in GROUP_KINDS}
+        else:
+            dirty_days = set(manifest['dirty_days'])
+            dirty_groups = {kind: set(manifest['dirty_groups'][kind]) for kind in GROUP_KINDS}
+        manifest['template_hash'] = template_hash
+
+        pages = manifest['pages']
+        day_index = {}
+        written = 0
+
+        # 1. 每日详情页：仅重新生成输入变化的日期
+        for date in sorted(dirty_days & set(manifest['days'])):
+            path = f'days/{date}.html'
+            signature = _hash(template_hash, manifest['days'][date]['hash'])
+            if pages.get(path) != signature or not self._output_exists(path):
+                self.render_day(date)
+                written += 1
+            pages[path] = signature
+
+        # 2. 按日期的分页索引：条目只需清单中的摘要预览和篇数
+        if dirty_days or full:
+            written += self.build_paginated(
+                '', '学术期刊日报归档', sorted(manifest['days']), dirty_days, full,
+                lambda date: {'date': date, 'excerpt': manifest['days'][date]['excerpt'],
+                              'count': manifest['days'][date]['count']},
+                False, template_hash, pages)
+
+        # 3. 按期刊、主题的分页索引：只处理受影响的分组
+        for kind, title in (('journals', '按期刊浏览'), ('topics', '按主题浏览')):
+            if not dirty_groups[kind] and not full:
+                continue
+            for key in sorted(dirty_groups[kind]):
+                if key not in manifest['groups'][kind]:
+                    continue
+                group = self.load_group(kind, key)
+                written += self.build_paginated(
+                    f'{kind}/{slugify(key)}/', self.group_name(kind, key),
+                    sorted(group['dates']), dirty_days, full,
+                    lambda date, kind=kind, key=key: self.group_entry(kind, key, date, day_index),
+                    True, template_hash, pages)
+
+            group_list = [{
+                'name': self.group_name(kind, key),
+                'url': f'{slugify(key)}/index.html',
+                'count': count
+            } for key, count in sorted(manifest['groups'][kind].items())]
+            written += self.write_page(f'{kind}/index.html', 'archive_groups.html', {
+                'title': title,
+                'root': '../',
+                'groups': group_list
+            }, template_hash, pages)
+
+        manifest['dirty_days'] = []
+        manifest['dirty_groups'] = {kind: [] for kind in GROUP_KINDS}
+        self.save_manifest(manifest)
+        self.logger.info(f"归档构建完成，写入 {written} 个页面，共 {len(pages)} 个页面")
+        return written
+
+    def group_name(self, kind, key):
+        return self.topic_matcher.topic_name(key) if kind == 'topics' else key
+
+    def group_entry(self, kind, key, date, day_index):
+        """分组索引中某天的条目：当天属于该分组的文章"""
+        if kind == 'journals':
+            items = [article for article in self.load_day_index(date, day_index)
+                     if article['journal'] == key]
+        else:
+            items = [article for article in self.load_day_index(date, day_index)
+                     if key in article['topics']]
+        return {'date': date, 'excerpt': '', 'count': len(items), 'articles': items}
+
+    def build_paginated(self, prefix, title, dates, changed_dates, full, load_entry,
+                        show_articles, template_hash, pages):
+        """按时间从旧到新固定分页，index.html 为最新一页
+
+        只生成包含变化日期的页面及其之后的页面（插入或移除日期会使
+        之后的条目后移或前移），以及最后两页（新增一页时原来的最后一页
+        需要加上“较新”链接）。load_entry 只对这些页面上的日期调用。
+        """
+        root = '../' * prefix.count('/')
+        page_count = max(1, (len(dates) + self.page_size - 1) // self.page_size)
+        if full:
+            first_page = 1
+        else:
+            changed_pages = [bisect.bisect_left(dates, date) // self.page_size + 1
+                             for date in changed_dates]
+            first_page = min([page_count - 1] + changed_pages)
+        written = 0
+
+        for page in range(max(1, first_page), page_count + 1):
+            page_dates = dates[(page - 1) * self.page_size:page * self.page_size]
+            context = {
+                'title': title,
+                'root': root,
+                'show_articles': show_articles,
+                'entries': [load_entry(date) for date in reversed(page_dates)],
+                'newer_url': f'page-{page + 1}.html' if page < page_count else '',
+                'older_url': f'page-{page - 1}.html' if page > 1 else ''
+            }
+            written += self.write_page(f'{prefix}page-{page}.html', 'archive_index.html',
+                                       context, template_hash, pages)
+            if page == page_count:
+                written += self.write_page(f'{prefix}index.html', 'archive_index.html',
+                                           context, template_hash, pages)
+        return written
+
+    def write_page(self, path, template_name, context, template_hash, pages):
+        """签名未变化且文件存在时跳过渲染，返回写入的页面数"""
+        signature = _hash(template_hash, template_name,
+                          json.dumps(context, ensure_ascii=False, sort_keys=True))
+        if pages.get(path) == signature and self._output_exists(path):
+            return 0
+        pages[path] = signature
+
+        template = get_template_env().get_template(template_name)
+        self._write_file(os.path.join(self.output_dir, path), template.render(**context))
+        return 1
+
+    def render_day(self, date):
+        """根据保存的输入重新生成某天的日报页面"""
+        with open(self.day_input_path(date), 'r', encoding='utf-8') as f:
+            day = json.load(f)
+
+        if self.html_generator is None:
+            self.html_generator = HTMLGenerator()
+        data = self.html_generator.prepare_report_data(
+            day['articles'], day['summary'], datetime.strptime(date, '%Y-%m-%d'))
+        data['archive_root'] = '../'
+        html_content = self.html_generator.render_template(data)
+        self._write_file(os.path.join(self.output_dir, 'days', f'{date}.html'), html_content)
+
+    def _output_exists(self, path):
+        return os.path.exists(os.path.join(self.output_dir, path))
+
+    def _write_file(self, filepath, content):
+        """先写临时文件再替换，避免发布过程中出现半截页面"""
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        tmp_path = filepath + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, filepath)
+
+
+if __name__ == "__main__":
+    # 重新构建归档站点
+    builder = ArchiveBuilder()
+    count = builder.build()
+    print(f"归档站点已更新，写入 {count} 个页面: {builder.output_dir}")
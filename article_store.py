@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import hashlib
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from config import Config
+from log_config import configure_logging
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    article_key TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    abstract TEXT NOT NULL DEFAULT '',
+    journal TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    link TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL DEFAULT '',
+    summary TEXT NOT NULL DEFAULT '',
+    topics TEXT NOT NULL DEFAULT '[]',
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_date ON articles(date);
+CREATE INDEX IF NOT EXISTS idx_articles_journal ON articles(journal);
+CREATE INDEX IF NOT EXISTS idx_articles_source ON articles(source);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, abstract, journal, summary,
+    content='articles', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+-- 词表视图：每个词元出现在多少篇文章中，用于相关度排序的IDF统计
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_vocab USING fts5vocab(articles_fts, 'row');
+
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, abstract, journal, summary)
+    VALUES (new.id, new.title, new.abstract, new.journal, new.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, abstract, journal, summary)
+    VALUES ('delete', old.id, old.title, old.abstract, old.journal, old.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE OF title, abstract, journal, summary ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, abstract, journal, summary)
+    VALUES ('delete', old.id, old.title, old.abstract, old.journal, old.summary);
+    INSERT INTO articles_fts(rowid, title, abstract, journal, summary)
+    VALUES (new.id, new.title, new.abstract, new.journal, new.summary);
+END;
+
+CREATE TABLE IF NOT EXISTS daily_reports (
+    date TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    article_keys TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+-- 摘要补全结果的永久缓存（identifier 为 'doi:…' 或 'pmid:…'，abstract 为空表示未查到）
+CREATE TABLE IF NOT EXISTS enrichment (
+    identifier TEXT PRIMARY KEY,
+    abstract TEXT NOT NULL DEFAULT '',
+    fetched_at TEXT NOT NULL
+);
+
+-- 周报/月报的汇总摘要缓存（input_hash 为各日摘要和统计的哈希，输入不变时不再调用模型）
+CREATE TABLE IF NOT EXISTS rollups (
+    period TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (period, start_date)
+);
+"""
+
+# 占位文本不写入索引，避免搜索“摘要”时命中大量无关文章
+PLACEHOLDER_ABSTRACTS = {'摘要暂不可用'}
+
+
+def article_key(article):
+    """文章的稳定标识：优先DOI，其次链接，最后标题"""
+    for field in ('doi', 'link'):
+        value = (article.get(field) or '').strip().lower()
+        if value:
+            return f'{field}:{value}'
+    title = ' '.join((article.get('title') or '').lower().split())
+    return 'title:' + hashlib.sha1(title.encode('utf-8')).hexdigest()
+
+
+class ArticleStore:
+    """文章历史库（SQLite），附带FTS5全文索引
+
+    标题、摘要、期刊和文章摘要由触发器同步到 articles_fts，
+    每次入库只更新新增或变化的文章，检索使用BM25排序。
+    """
+
+    def __init__(self, db_path=None):
+        self.config = Config()
+        self.setup_logging()
+        self.db_path = db_path or os.path.join(self.config.PATHS['data_dir'],
+                                               self.config.STORE_CONFIG['db_file'])
+        self.local = threading.local()
+        self.init_schema()
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def conn(self):
+        """每个线程使用独立连接"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def init_schema(self):
+        """创建表、全文索引和触发器"""
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+    def ingest_articles(self, articles):
+        """批量入库：新文章插入，已有文章只在内容变化时更新
+
+        返回新插入的文章数。每篇文章会被写入 'article_key' 字段。
+        """
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        inserted = 0
+
+        with self.conn:
+            for article in articles:
+                key = article_key(article)
+                article['article_key'] = key
+                abstract = article.get('abstract') or ''
+                if abstract in PLACEHOLDER_ABSTRACTS:
+                    abstract = ''
+
+                cursor = self.conn.execute(
+                    """INSERT INTO articles (article_key, title, abstract, journal, source, link,
+                                             date, summary, topics, first_seen, last_seen)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT(article_key) DO NOTHING""",
+                    (key, article.get('title', ''), abstract, article.get('journal', ''),
+                     article.get('source', ''), article.get('link', ''), article.get('date') or '',
+                     article.get('summary', ''), json.dumps(sorted(article.get('topics', []))),
+                     now, now)
+                )
+                if cursor.rowcount:
+                    inserted += 1
+                    continue
+
+                # 已存在：仅在内容有变化时更新，避免无谓地重写全文索引
+                self.conn.execute(
+                    "UPDATE articles SET last_seen = ?, date = ?, topics = ? WHERE article_key = ?",
+                    (now, article.get('date') or '', json.dumps(sorted(article.get('topics', []))), key)
+                )
+                self.conn.execute(
+                    """UPDATE articles SET title = ?, journal = ?, link = ?,
+                           abstract = CASE WHEN ? != '' THEN ? ELSE abstract END,
+                           source = CASE WHEN ? != '' THEN ? ELSE source END
+                       WHERE article_key = ?
+                         AND (title != ? OR journal != ? OR link != ?
+                              OR (? != '' AND abstract != ?) OR (? != '' AND source != ?))""",
+                    (article.get('title', ''), article.get('journal', ''), article.get('link', ''),
+                     abstract, abstract, article.get('source', ''), article.get('source', ''), key,
+                     article.get('title', ''), article.get('journal', ''), article.get('link', ''),
+                     abstract, abstract, article.get('source', ''), article.get('source', ''))
+                )
+
+        self.logger.info(f"入库 {len(articles)} 篇文章，其中新增 {inserted} 篇")
+        return inserted
+
+    def save_daily_report(self, date, summary, articles):
+        """保存某天的整体摘要及其文章列表"""
+        keys = [article.get('article_key') or article_key(article) for article in articles]
+        with self.conn:
+            self.conn.execute(
+                """INSERT OR REPLACE INTO daily_reports (date, summary, article_keys, created_at)
+                   VALUES (?, ?, ?, ?)""",
+                (date, summary, json.dumps(keys), datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+
+    def get_articles_seen_since(self, since):
+        """最近一次出现时间不早于 since（'YYYY-MM-DD HH:MM:SS'）的文章，按日期倒序"""
+        rows = self.conn.execute(
+            """SELECT article_key, title, abstract, journal, source, link, date, summary, topics
+               FROM articles WHERE last_seen >= ? ORDER BY date DESC, id DESC""",
+            (since,)
+        ).fetchall()
+
+        articles = []
+        for row in rows:
+            article = dict(row)
+            article['topics'] = json.loads(article['topics'])
+            if not article['abstract']:
+                article['abstract'] = '摘要暂不可用'
+            articles.append(article)
+        return articles
+
+    def iter_report_articles(self, since=None, until=None, batch_size=1000):
+        """按日报逐批读取各日收录的文章（since/until 为日报日期 YYYY-MM-DD）
+
+        每篇文章在它出现过的每份日报中各产生一行，带有 'report_date'，
+        顺序与日报中的顺序一致。使用游标分批取出，内存占用与总数无关。
+        """
+        sql = ["""SELECT r.date AS report_date, a.article_key, a.title, a.abstract, a.journal, a.source,
+                         a.link, a.date, a.summary, a.topics
+                  FROM daily_reports r, json_each(r.article_keys) k
+                  JOIN articles a ON a.article_key = k.value
+                  WHERE 1 = 1"""]
+        params = []
+        if since:
+            sql.append('AND r.date >= ?')
+            params.append(since)
+        if until:
+            sql.append('AND r.date <= ?')
+            params.append(until)
+        sql.append('ORDER BY r.date, k.key')
+
+        cursor = self.conn.execute(' '.join(sql), params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                article = dict(row)
+                article['topics'] = json.loads(article['topics'])
+                yield article
+
+    def iter_daily_reports(self, since=None, until=None):
+        """按日期顺序读取每日整体摘要"""
+        sql = ["SELECT date, summary, article_keys FROM daily_reports WHERE 1 = 1"]
+        params = []
+        if since:
+            sql.append('AND date >= ?')
+            params.append(since)
+        if until:
+            sql.append('AND date <= ?')
+            params.append(until)
+        sql.append('ORDER BY date')
+
+        for row in self.conn.execute(' '.join(sql), params):
+            report = dict(row)
+            report['article_keys'] = json.loads(report['article_keys'])
+            yield report
+
+    def get_articles_by_keys(self, keys):
+        """按文章标识批量读取文章，返回 {article_key: 文章}"""
+        keys = list(keys)
+        articles = {}
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            rows = self.conn.execute(
+                f"""SELECT article_key, title, abstract, journal, source, link, date, summary, topics
+                    FROM articles WHERE article_key IN ({','.join('?' * len(batch))})""",
+                batch
+            ).fetchall()
+            for row in rows:
+                article = dict(row)
+                article['topics'] = json.loads(article['topics'])
+                articles[article['article_key']] = article
+        return articles
+
+    def get_rollup(self, period, start_date, input_hash):
+        """输入未变化时返回缓存的汇总摘要，否则返回None"""
+        row = self.conn.execute(
+            "SELECT summary FROM rollups WHERE period = ? AND start_date = ? AND input_hash = ?",
+            (period, start_date, input_hash)
+        ).fetchone()
+        return row['summary'] if row else None
+
+    def save_rollup(self, period, start_date, input_hash, summary):
+        """保存汇总摘要"""
+        with self.conn:
+            self.conn.execute(
+                """INSERT OR REPLACE INTO rollups (period, start_date, input_hash, summary, created_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (period, start_date, input_hash, summary, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+
+    def get_unsummarized_articles(self, since, limit):
+        """最近出现但尚未生成单篇摘要的文章"""
+        rows = self.conn.execute(
+            """SELECT article_key, title, abstract, journal, link FROM articles
+               WHERE summary = '' AND last_seen >= ? ORDER BY last_seen DESC LIMIT ?""",
+            (since, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_article_summary(self, key, summary):
+        """保存单篇文章的摘要（同步更新全文索引）"""
+        with self.conn:
+            self.conn.execute("UPDATE articles SET summary = ? WHERE article_key = ?", (summary, key))
+
+    def search(self, query, since=None, until=None, journal=None, source=None, limit=20):
+        """全文检索，按BM25相关度排序
+
+        query 使用FTS5查询语法（如 'bilingual AND children'、'"language disorder"'）；
+        since/until 为 YYYY-MM-DD，journal 为子串匹配（不区分大小写）。
+        """
+        sql = ["""SELECT a.title, a.abstract, a.journal, a.source, a.link, a.date, a.summary,
+                         bm25(articles_fts, 10.0, 3.0, 1.0, 2.0) AS score,
+                         snippet(articles_fts, -1, '[', ']', '…', 12) AS snippet
+                  FROM articles_fts
+                  JOIN articles a ON a.id = articles_fts.rowid
+                  WHERE articles_fts MATCH ?"""]
+        params = [query]
+
+        if since:
+            sql.append('AND a.date >= ?')
+            params.append(since)
+        if until:
+            sql.append('AND a.date <= ?')
+            params.append(until)
+        if journal:
+            sql.append('AND a.journal LIKE ?')
+            params.append(f'%{journal}%')
+        if source:
+            sql.append('AND a.source = ?')
+            params.append(source)
+
+        sql.append('ORDER BY score LIMIT ?')
+        params.append(limit)
+
+        try:
+            rows = self.conn.execute(' '.join(sql), params).fetchall()
+        except sqlite3.OperationalError:
+            # 查询语法有误时按普通词组逐个加引号重试
+            params[0] = ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+            rows = self.conn.execute(' '.join(sql), params).fetchall()
+        return [dict(row) for row in rows]
+
+    def term_document_frequencies(self, terms):
+        """各词元在历史库中出现的文章数（来自全文索引词表）"""
+        terms = list(terms)
+        frequencies = {}
+        # 分批查询，避免超出SQLite的参数个数限制
+        for i in range(0, len(terms), 500):
+            batch = terms[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT term, doc FROM articles_vocab WHERE term IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            frequencies.update((row['term'], row['doc']) for row in rows)
+        return frequencies
+
+    def get_enrichments(self, identifiers, retry_days):
+        """查询摘要补全缓存，返回 {identifier: abstract}
+
+        查到摘要的结果永久有效；未查到的记录在 retry_days 天内同样视为命中
+        （摘要为空），过期后才重新请求。
+        """
+        identifiers = list(identifiers)
+        cutoff = (datetime.now() - timedelta(days=retry_days)).strftime('%Y-%m-%d %H:%M:%S')
+        results = {}
+        for i in range(0, len(identifiers), 500):
+            batch = identifiers[i:i + 500]
+            rows = self.conn.execute(
+                f"""SELECT identifier, abstract FROM enrichment
+                    WHERE identifier IN ({','.join('?' * len(batch))})
+                      AND (abstract != '' OR fetched_at >= ?)""",
+                batch + [cutoff]
+            ).fetchall()
+            results.update((row['identifier'], row['abstract']) for row in rows)
+        return results
+
+    def save_enrichments(self, results):
+        """保存摘要补全结果 {identifier: abstract}，并回填文章库中缺少摘要的文章"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO enrichment (identifier, abstract, fetched_at) VALUES (?, ?, ?)",
+                [(identifier, abstract, now) for identifier, abstract in results.items()]
+            )
+            self.conn.executemany(
+                "UPDATE articles SET abstract = ? WHERE article_key = ? AND length(abstract) < length(?)",
+                [(abstract, identifier, abstract) for identifier, abstract in results.items()
+                 if abstract and identifier.startswith('doi:')]
+            )
+
+    def count_articles(self):
+        """文章总数"""
+        return self.conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import hashlib
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from config import Config
+from log_config import configure_logging
+from topics import TopicMatcher
+from archive import slugify
+from article_store import article_key
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+ET.register_namespace('', ATOM_NS)
+
+
+def atom(tag):
+    return f'{{{ATOM_NS}}}{tag}'
+
+
+def entry_hash(entry):
+    """条目内容的哈希（不含更新时间），用于判断条目是否变化"""
+    content = {key: value for key, value in entry.items() if key != 'updated'}
+    return hashlib.sha1(json.dumps(content, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class AtomFeedPublisher:
+    """归档站点下的 Atom 订阅源，增量维护
+
+    feeds/all.xml 包含每日摘要和单篇文章条目，feeds/topics/<主题>.xml 只含
+    该主题的文章（及当天的摘要）。条目ID由日期或文章标识生成，跨运行
+    稳定；每个订阅源最多保留 max_entries 条，每次运行只合并当天的条目，
+    内容未变化的订阅源不重写文件，静态服务器据此给出不变的
+    ETag/Last-Modified。各订阅源的内容哈希（ETag）记录在 feeds/index.json。
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.setup_logging()
+        self.output_dir = os.path.join(self.config.PATHS['archive_dir'], 'feeds')
+        self.state_path = os.path.join(self.config.PATHS['data_dir'], 'archive', 'atom_state.json')
+        self.topic_matcher = TopicMatcher()
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def load_state(self):
+        """读取各订阅源当前的条目"""
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"读取订阅源状态失败，将重新生成: {str(e)}")
+        return {'feeds': {}}
+
+    def link(self, path, depth):
+        """站点内页面的链接：配置了 base_url 时为绝对地址，否则相对于订阅源文件"""
+        base_url = self.config.ATOM_CONFIG['base_url']
+        return base_url.rstrip('/') + '/' + path if base_url else '../' * depth + path
+
+    def digest_entry(self, date, summary, count, depth):
+        return {
+            'id': f"{self.config.ATOM_CONFIG['id_prefix']}digest:{date}",
+            'title': f"学术期刊日报 {date}（{count} 篇）",
+            'link': self.link(f'days/{date}.html', depth),
+            'published': date,
+            'content': summary,
+            'categories': []
+        }
+
+    def article_entry(self, article, key):
+        topics = sorted(article.get('topics') or [])
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+        abstract = article.get('abstract') or ''
+        return {
+            'id': f"{self.config.ATOM_CONFIG['id_prefix']}article:{digest}",
+            'title': article.get('title', ''),
+            'link': article.get('link', ''),
+            'published': article.get('date') or '',
+            'journal': article.get('journal', ''),
+            'content': article.get('summary') or ('' if abstract == '摘要暂不可用' else abstract),
+            'categories': [(key, self.topic_matcher.topic_name(key)) for key in topics]
+        }
+
+    def day_entries(self, date, articles, summary):
+        """当天各订阅源的新条目 {订阅源路径: (标题, 条目列表)}"""
+        feeds = {'all.xml': ('学术期刊日报', [self.digest_entry(date, summary, len(articles), 1)])}
+        for article in articles:
+            article = dict(article, topics=article.get('topics') or self.topic_matcher.match(article))
+            entry = self.article_entry(article, article.get('article_key') or article_key(article))
+            feeds['all.xml'][1].append(entry)
+            for key, name in entry['categories']:
+                path = f'topics/{slugify(key)}.xml'
+                if path not in feeds:
+                    feeds[path] = (f'学术期刊日报 · {name}',
+                                   [self.digest_entry(date, summary, 0, 2)])
+                feeds[path][1].append(entry)
+
+        # 主题订阅源中摘要条目的标题使用该主题当天的文章数
+        for _, entries in feeds.values():
+            entries[0]['title'] = f"学术期刊日报 {date}（{len(entries) - 1} 篇）"
+        return feeds
+
+    def publish(self, date, articles, summary):
+        """合并当天的条目并写出变化的订阅源，返回写出的文件数"""
+        atom_config = self.config.ATOM_CONFIG
+        now = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        state = self.load_state()
+        written = 0
+
+        for path, (title, new_entries) in self.day_entries(date, articles, summary).items():
+            feed = state['feeds'].setdefault(path, {'title': title, 'etag': '', 'entries': []})
+            feed['title'] = title
+            existing = {entry['id']: entry for entry in feed['entries']}
+
+            for entry in new_entries:
+                entry = dict(entry, hash=entry_hash(entry))
+                old = existing.get(entry['id'])
+                if old is not None and old['hash'] == entry['hash']:
+                    continue
+                entry['updated'] = now
+                existing[entry['id']] = entry
+
+            # 按更新时间保留最新的 max_entries 条
+            entries = sorted(existing.values(), key=lambda entry: entry['updated'], reverse=True)
+            feed['entries'] = entries[:atom_config['max_entries']]
+
+            xml = self.render_feed(path, feed)
+            etag = hashlib.sha1(xml).hexdigest()[:16]
+            if etag == feed['etag'] and os.path.exists(os.path.join(self.output_dir, path)):
+                continue
+            feed['etag'] = etag
+            feed['updated'] = feed['entries'][0]['updated']
+            self._write_file(os.path.join(self.output_dir, path), xml)
+            written += 1
+
+        if written:
+            index = {path: {'title': feed['title'], 'etag': f'"{feed["etag"]}"',
+                            'updated': feed.get('updated', ''), 'entries': len(feed['entries'])}
+                     for path, feed in sorted(state['feeds'].items())}
+            self._write_file(os.path.join(self.output_dir, 'index.json'),
+                             json.dumps(index, ensure_ascii=False, indent=2).encode('utf-8'))
+        self._write_file(self.state_path, json.dumps(state, ensure_ascii=False).encode('utf-8'))
+        self.logger.info(f"Atom 订阅源已更新，写出 {written} 个文件，共 {len(state['feeds'])} 个订阅源")
+        return written
+
+    def render_feed(self, path, feed):
+        """生成订阅源的 XML（只由保存的条目决定，相同条目得到相同字节）"""
+        atom_config = self.config.ATOM_CONFIG
+        depth = path.count('/') + 1
+        root = ET.Element(atom('feed'))
+        ET.SubElement(root, atom('id')).text = f"{atom_config['id_prefix']}feed:{path}"
+        ET.SubElement(root, atom('title')).text = feed['title']
+        ET.SubElement(root, atom('updated')).text = feed['entries'][0]['updated'] if feed['entries'] else ''
+        ET.SubElement(ET.SubElement(root, atom('author')), atom('name')).text = 'AutoDLD'
+        ET.SubElement(root, atom('link'), rel='alternate', href=self.link('index.html', depth))
+        if atom_config['base_url']:
+            ET.SubElement(root, atom('link'), rel='self', href=self.link(f'feeds/{path}', depth))
+
+        for entry in feed['entries']:
+            element = ET.SubElement(root, atom('entry'))
+            ET.SubElement(element, atom('id')).text = entry['id']
+            ET.SubElement(element, atom('title')).text = entry['title']
+            ET.SubElement(element, atom('updated')).text = entry['updated']
+            if len(entry['published']) == 10:
+                ET.SubElement(element, atom('published')).text = f"{entry['published']}T00:00:00Z"
+            if entry['link']:
+                ET.SubElement(element, atom('link'), rel='alternate', href=entry['link'])
+            for term, label in entry['categories']:
+                ET.SubElement(element, atom('category'), term=term, label=label)
+            if entry.get('journal'):
+                ET.SubElement(ET.SubElement(element, atom('source')), atom('title')).text = entry['journal']
+            if entry['content']:
+                ET.SubElement(element, atom('content'), type='text').text = entry['content']
+        return ET.tostring(root, encoding='utf-8', xml_declaration=True)
+
+    def _write_file(self, filepath, content):
+        """先写临时文件再替换，读取方不会看到半截文件"""
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        tmp_path = filepath + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, filepath)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import gzip
+import json
+import base64
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from urllib.parse import urlsplit
+import requests
+from requests.structures import CaseInsensitiveDict
+from config import Config
+from log_config import configure_logging
+
+CASSETTE_FILE = 'cassette.jsonl.gz'
+
+# 回放时仍有意义的响应头（其余如 Set-Cookie、Content-Encoding 不保存）
+KEPT_HEADERS = ('content-type', 'etag', 'last-modified', 'location')
+
+
+def request_key(method, url, body):
+    """请求的匹配键：方法 + 完整URL（含查询参数）+ 请求体摘要"""
+    digest = hashlib.sha1(body or b'').hexdigest()[:16]
+    return f"{method} {url} {digest}"
+
+
+def route_key(method, url):
+    """退而求其次的匹配键：方法 + 不含查询参数的地址（查询参数含日期等易变内容）"""
+    parts = urlsplit(url)
+    return f"{method} {parts.scheme}://{parts.netloc}{parts.path}"
+
+
+class Cassette:
+    """HTTP请求的录制与回放
+
+    录制模式下每个请求和响应（解压后的正文）追加到 DIR/cassette.jsonl.gz；
+    回放模式下按完整请求匹配返回记录的响应，不访问网络，同一请求出现
+    多次时按录制顺序依次返回，录制的响应用完后不再重复返回。找不到完全一致的请求时（例如查询参数中
+    的日期已变化），按方法和路径取下一条未用过的记录。
+    """
+
+    def __init__(self, directory, mode):
+        self.config = Config()
+        self.setup_logging()
+        self.directory = directory
+        self.mode = mode
+        self.path = os.path.join(directory, CASSETTE_FILE)
+        self.lock = threading.Lock()
+        self.recorded_at = None
+
+        if mode == 'record':
+            os.makedirs(directory, exist_ok=True)
+            self.file = gzip.open(self.path, 'wt', encoding='utf-8')
+            self.recorded_at = datetime.now()
+            self.write({'recorded_at': self.recorded_at.isoformat(timespec='seconds')})
+            self.logger.info(f"开始录制HTTP请求: {self.path}")
+        else:
+            self.load()
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    def load(self):
+        """读取录制文件，按请求和路径建立索引"""
+        self.exact = {}
+        self.routes = {}
+        count = 0
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                if 'recorded_at' in entry:
+                    self.recorded_at = datetime.fromisoformat(entry['recorded_at'])
+                    continue
+                self.exact.setdefault(entry['key'], []).append(entry)
+                self.routes.setdefault(route_key(entry['method'], entry['url']), []).append(entry)
+                count += 1
+        self.logger.info(f"加载回放记录 {count} 条（录制于 {self.recorded_at}）: {self.path}")
+
+    def write(self, entry):
+        """追加一条记录（每条立即写出，进程中断时已录制的部分仍可用）"""
+        with self.lock:
+            self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.file.flush()
+
+    def record(self, prepared, response):
+        """保存一次请求及其响应"""
+        self.write({
+            'key': request_key(prepared.method, prepared.url, self.body_bytes(prepared)),
+            'method': prepared.method,
+            'url': prepared.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {name: value for name, value in response.headers.items()
+                        if name.lower() in KEPT_HEADERS},
+            'body': base64.b64encode(response.content).decode('ascii')
+        })
+
+    def replay(self, prepared):
+        """返回与请求匹配的已录制响应；没有记录时抛出 ConnectionError"""
+        key = request_key(prepared.method, prepared.url, self.body_bytes(prepared))
+        with self.lock:
+            entry = self.take(self.exact.get(key)) or self.take(self.routes.get(route_key(prepared.method, prepared.url)))
+        if entry is None:
+            raise requests.ConnectionError(f"回放记录中没有该请求（或已用完）的响应: {prepared.method} {prepared.url}")
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason', '')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.url = entry['url']
+        response.request = prepared
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = base64.b64decode(entry['body'])
+        response._content_consumed = True
+        return response
+
+    @staticmethod
+    def take(entries):
+        """取出第一条未使用的记录；没有或全部用过时返回None"""
+        for entry in entries or ():
+            if not entry.get('used'):
+                entry['used'] = True
+                return entry
+        return None
+
+    @staticmethod
+    def body_bytes(prepared):
+        body = prepared.body or b''
+        return body.encode('utf-8') if isinstance(body, str) else body
+
+    def close(self):
+        """结束录制"""
+        if self.mode == 'record' and not self.file.closed:
+            with self.lock:
+                self.file.close()
+            self.logger.info(f"HTTP录制完成: {self.path}")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+import requests
+from config import Config
+from log_config import configure_logging
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """主机的熔断器处于打开状态，请求被直接跳过（不产生网络请求）"""
+
+    def __init__(self, host):
+        super().__init__(f"{host} 已熔断，跳过请求")
+        self.host = host
+
+
+class CircuitBreakers:
+    """按主机的熔断器
+
+    连续失败 failure_threshold 次或连续超时 timeout_threshold 次后打开，
+    本次运行中对该主机的请求立即失败；下次运行开始（或打开超过
+    cooldown_minutes，用于常驻进程）时转为半开，每次只放行一个试探请求，
+    试探结束前的其他请求仍被跳过：成功则关闭，失败则重新打开。状态保存
+    在 state_file 中（默认 CIRCUIT_CONFIG['state_file']），跨进程保留；
+    正在进行的试探只记录在内存中。
+    """
+
+    def __init__(self, state_file=None):
+        self.config = Config()
+        self.setup_logging()
+        self.state_file = state_file or self.config.CIRCUIT_CONFIG['state_file']
+        self.lock = threading.Lock()
+        self.hosts = self.load_state()
+        self.skipped = {}
+        self.trials = {}  # 正在进行半开试探的主机 -> 发出试探请求的线程
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def load_state(self):
+        """读取各主机的熔断状态"""
+        state_file = self.state_file
+        if os.path.exists(state_file):
+            try:
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('hosts', {})
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"读取熔断状态失败: {str(e)}")
+        return {}
+
+    def save_state(self):
+        """保存熔断状态及本次运行跳过的主机（调用方持有锁）"""
+        state_file = self.state_file
+        try:
+            os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+            tmp_path = state_file + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'hosts': self.hosts, 'skipped': self.skipped}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, state_file)
+        except OSError as e:
+            self.logger.warning(f"保存熔断状态失败: {str(e)}")
+
+    def begin_run(self):
+        """新一次运行开始：打开的熔断器转为半开，清空跳过记录"""
+        with self.lock:
+            for host, entry in self.hosts.items():
+                if entry['state'] == OPEN:
+                    entry['state'] = HALF_OPEN
+                    self.logger.info(f"熔断器半开，本次运行试探 {host}")
+            self.skipped = {}
+            self.save_state()
+
+    def allow(self, host):
+        """是否允许向该主机发请求；不允许时记入本次运行的跳过记录"""
+        circuit_config = self.config.CIRCUIT_CONFIG
+        if not circuit_config['enabled']:
+            return True
+
+        with self.lock:
+            entry = self.hosts.get(host)
+            if entry is None or entry['state'] == CLOSED:
+                return True
+
+            if entry['state'] == OPEN:
+                cooldown = timedelta(minutes=circuit_config['cooldown_minutes'])
+                if datetime.now() - datetime.fromisoformat(entry['opened_at']) >= cooldown:
+                    entry['state'] = HALF_OPEN
+                    self.logger.info(f"熔断器半开，试探 {host}")
+
+            # 半开时只放行一个试探请求，其余请求在试探结束前仍被跳过
+            if entry['state'] == HALF_OPEN and host not in self.trials:
+                self.trials[host] = threading.get_ident()
+                return True
+
+            self.skipped[host] = self.skipped.get(host, 0) + 1
+            if self.skipped[host] == 1:
+                self.save_state()
+            return False
+
+    def record_success(self, host):
+        """请求成功：清零失败计数，半开状态恢复为关闭"""
+        with self.lock:
+            self.trials.pop(host, None)
+            entry = self.hosts.get(host)
+            if entry is None:
+                return
+            if entry['state'] != CLOSED:
+                self.logger.info(f"{host} 已恢复，熔断器关闭")
+            del self.hosts[host]
+            self.save_state()
+
+    def record_failure(self, host, timeout=False):
+        """请求失败（连接错误、超时或5xx）：达到阈值或半开试探失败时打开"""
+        circuit_config = self.config.CIRCUIT_CONFIG
+        if not circuit_config['enabled']:
+            return
+
+        with self.lock:
+            self.trials.pop(host, None)
+            entry = self.hosts.setdefault(host, {'state': CLOSED, 'failures': 0, 'timeouts': 0})
+            entry['failures'] += 1
+            entry['timeouts'] = entry['timeouts'] + 1 if timeout else 0
+
+            if entry['state'] == OPEN:
+                return
+            if (entry['state'] == HALF_OPEN
+                    or entry['failures'] >= circuit_config['failure_threshold']
+                    or entry['timeouts'] >= circuit_config['timeout_threshold']):
+                entry['state'] = OPEN
+                entry['opened_at'] = datetime.now().isoformat(timespec='seconds')
+                self.logger.warning(f"{host} 连续失败 {entry['failures']} 次"
+                                    f"（超时 {entry['timeouts']} 次），熔断器打开，本次运行跳过该主机")
+                self.save_state()
+
+    def release(self, host):
+        """请求结束：本线程的试探请求未记录成功或失败时（如运行时间预算
+        用完）释放试探名额，由下一个请求继续试探"""
+        with self.lock:
+            if self.trials.get(host) == threading.get_ident():
+                del self.trials[host]
+
+    def skipped_hosts(self):
+        """本次运行中被跳过的主机及跳过的请求数"""
+        with self.lock:
+            return dict(self.skipped)
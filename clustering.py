@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import math
+import logging
+from collections import Counter
+import numpy as np
+from config import Config
+from log_config import configure_logging
+from ranking import tokenize, STOPWORDS
+
+# 聚类时额外忽略的学术写作常用词，避免它们成为主题标签
+CLUSTER_STOPWORDS = STOPWORDS | {
+    'is', 'are', 'was', 'were', 'be', 'been', 'this', 'that', 'these', 'those', 'as', 'we',
+    'our', 'their', 'its', 'it', 'not', 'but', 'than', 'between', 'among', 'into', 'using',
+    'based', 'study', 'results', 'methods', 'background', 'conclusion', 'conclusions',
+    'objective', 'aim', 'which', 'who', 'also', 'may', 'can', 'more', 'after', 'during'
+}
+
+
+class ThemeClusterer:
+    """当日文章的主题聚类
+
+    标题和摘要向量化为TF-IDF（以NumPy数组实现的CSR稀疏矩阵，行向量
+    L2归一化），用球面k-means（余弦相似度）分组；每个主题以质心权重
+    最高的几个词为标签，并选出与质心最接近的文章作为代表。
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.setup_logging()
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def vectorize(self, articles):
+        """返回 (indptr, indices, data, vocabulary)：L2归一化的TF-IDF稀疏矩阵"""
+        cluster_config = self.config.CLUSTER_CONFIG
+        title_weight = self.config.RANKING_CONFIG['title_weight']
+
+        documents = []
+        df = Counter()
+        for article in articles:
+            tf = Counter()
+            for token in tokenize(article.get('title') or ''):
+                if len(token) > 2 and token not in CLUSTER_STOPWORDS and not token.isdigit():
+                    tf[token] += title_weight
+            for token in tokenize(article.get('abstract') or ''):
+                if len(token) > 2 and token not in CLUSTER_STOPWORDS and not token.isdigit():
+                    tf[token] += 1
+            documents.append(tf)
+            df.update(tf.keys())
+
+        # 只出现在一篇文章中的词对分组没有帮助；文章很少时全部保留
+        min_df = 2 if len(articles) >= 10 else 1
+        common = [term for term, count in df.most_common(cluster_config['max_features']) if count >= min_df]
+        vocabulary = {term: i for i, term in enumerate(common)}
+        total = len(articles)
+        idf = [math.log((1 + total) / (1 + df[term])) + 1 for term in common]
+
+        indptr = [0]
+        indices = []
+        data = []
+        for tf in documents:
+            for term, count in tf.items():
+                column = vocabulary.get(term)
+                if column is not None:
+                    indices.append(column)
+                    data.append((1 + math.log(count)) * idf[column])
+            indptr.append(len(indices))
+
+        indptr = np.array(indptr, dtype=np.int64)
+        indices = np.array(indices, dtype=np.int64)
+        data = np.array(data, dtype=np.float64)
+
+        # 行向量L2归一化，使点积即为余弦相似度
+        row_ids = np.repeat(np.arange(len(documents)), np.diff(indptr))
+        row_norms = np.sqrt(np.bincount(row_ids, weights=data ** 2, minlength=len(documents)))
+        row_norms[row_norms == 0] = 1.0
+        data /= row_norms[row_ids]
+        return indptr, indices, data, common
+
+    def similarities(self, indptr, indices, data, centroids):
+        """稀疏矩阵与质心矩阵的乘积：每篇文章与每个质心的余弦相似度"""
+        rows = len(indptr) - 1
+        result = np.zeros((rows, len(centroids)))
+        if len(data) == 0:
+            return result
+        products = centroids[:, indices].T * data[:, None]
+        nonempty = np.diff(indptr) > 0
+        result[nonempty] = np.add.reduceat(products, indptr[:-1][nonempty], axis=0)
+        return result
+
+    def cluster(self, articles):
+        """返回主题列表 [{'label', 'terms', 'articles', 'representative'}]，按文章数降序"""
+        cluster_config = self.config.CLUSTER_CONFIG
+        if not articles:
+            return []
+
+        indptr, indices, data, terms = self.vectorize(articles)
+        count = len(articles)
+        k = max(1, min(cluster_config['max_clusters'], int(round((count / 2) ** 0.5))))
+        if not terms or k == 1:
+            labels = np.zeros(count, dtype=np.int64)
+            centroids = self.compute_centroids(indptr, indices, data, labels, 1, len(terms))
+        else:
+            labels, centroids = self.spherical_kmeans(indptr, indices, data, k, len(terms))
+
+        scores = self.similarities(indptr, indices, data, centroids)
+
+        themes = []
+        for cluster_id in range(len(centroids)):
+            members = np.flatnonzero(labels == cluster_id)
+            if len(members) == 0:
+                continue
+            top = np.argsort(centroids[cluster_id])[::-1][:cluster_config['label_terms']]
+            top_terms = [terms[i] for i in top if centroids[cluster_id][i] > 0]
+            representative = members[np.argmax(scores[members, cluster_id])]
+            themes.append({
+                'label': ' / '.join(top_terms) if top_terms else '其他',
+                'terms': top_terms,
+                'articles': [articles[i] for i in members],
+                'representative': articles[representative]
+            })
+
+        themes.sort(key=lambda theme: len(theme['articles']), reverse=True)
+        self.logger.info(f"{count} 篇文章聚为 {len(themes)} 个主题")
+        return themes
+
+    def compute_centroids(self, indptr, indices, data, labels, k, dimensions):
+        """按簇累加文章向量并归一化"""
+        centroids = np.zeros((k, dimensions))
+        if len(data):
+            row_labels = np.repeat(labels, np.diff(indptr))
+            np.add.at(centroids, (row_labels, indices), data)
+        norms = np.linalg.norm(centroids, axis=1)
+        norms[norms == 0] = 1.0
+        return centroids / norms[:, None]
+
+    def spherical_kmeans(self, indptr, indices, data, k, dimensions):
+        """球面k-means，k-means++方式初始化（固定随机种子，结果可复现）"""
+        cluster_config = self.config.CLUSTER_CONFIG
+        rng = np.random.default_rng(cluster_config['seed'])
+        count = len(indptr) - 1
+
+        # k-means++：依次选取与已选质心最不相似的文章
+        first = rng.integers(count)
+        centroids = self.row_vectors(indptr, indices, data, [first], dimensions)
+        closest = self.similarities(indptr, indices, data, centroids)[:, 0]
+        for _ in range(1, k):
+            distance = np.clip(1 - closest, 0, None)
+            total = distance.sum()
+            if total <= 0:
+                break
+            chosen = rng.choice(count, p=distance / total)
+            vector = self.row_vectors(indptr, indices, data, [chosen], dimensions)
+            centroids = np.vstack([centroids, vector])
+            closest = np.maximum(closest, self.similarities(indptr, indices, data, vector)[:, 0])
+
+        labels = np.full(count, -1, dtype=np.int64)
+        for _ in range(cluster_config['iterations']):
+            new_labels = np.argmax(self.similarities(indptr, indices, data, centroids), axis=1)
+            if np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+            centroids = self.compute_centroids(indptr, indices, data, labels, len(centroids), dimensions)
+        return labels, centroids
+
+    def row_vectors(self, indptr, indices, data, rows, dimensions):
+        """取出若干行的稠密向量"""
+        vectors = np.zeros((len(rows), dimensions))
+        for i, row in enumerate(rows):
+            start, end = indptr[row], indptr[row + 1]
+            vectors[i, indices[start:end]] = data[start:end]
+        return vectors
@@ -17,19 +17,83 @@ class Config:
         'smtp_port': 587,
         'sender_email': 'YOUR_EMAIL@example.com',  # 发件人邮箱
         'sender_password': 'YOUR_EMAIL_PASSWORD',  # 邮箱授权码或密码
-        'receiver_email': 'YOUR_RECEIVER_EMAIL@example.com'  # 接收邮箱
+        'receiver_email': 'YOUR_RECEIVER_EMAIL@example.com',  # 接收邮箱
+        'use_tls': True,                   # 是否启用STARTTLS
+        'timeout': 30,                     # SMTP连接超时（秒）
+        'max_connections': 3,              # 批量发送时的并行连接数（注意服务商限制）
+        'max_messages_per_connection': 50, # 单条连接发送上限，达到后换新连接
+        'max_retries': 1,                  # 连接中断时的重试次数
+        'max_html_bytes': 90 * 1024,       # 邮件HTML大小上限，超出时发送精简版（Gmail约102KB截断）
+        'report_url': ''                   # 完整日报的访问地址，精简版邮件中附带该链接
     }
-    
+
+    # 主题配置：每个主题同时是一个检索配置
+    #   keywords: 标注主题时匹配标题和摘要的关键词（不区分大小写）
+    #   terms:    向各数据来源检索时使用的查询词，相同的查询词在所有主题间只查询一次
+    #   sources:  使用的数据来源（arxiv、pubmed、crossref），为空表示全部
+    #   days_back: 时间窗口（天），省略时使用 CRAWL_CONFIG['days_back']
+    #   journals: 只收录这些期刊的文章（部分匹配，不区分大小写），为空表示不过滤
+    # 新增主题只需在此添加一项，与已有主题重复的查询词不会产生额外请求
+    TOPICS = {
+        'dld': {
+            'name': '发育性语言障碍',
+            'keywords': ['developmental language disorder', 'specific language impairment',
+                         'language impairment', 'language disorder', 'language delay'],
+            'terms': ['developmental language disorder', 'specific language impairment',
+                      'child language impairment', 'language development disorder',
+                      'language delay children', 'language disorder children'],
+            'sources': ['arxiv', 'pubmed', 'crossref'],
+            'days_back': 7,
+            'journals': []
+        },
+        'speech': {
+            'name': '儿童言语障碍',
+            'keywords': ['apraxia of speech', 'speech sound disorder', 'speech therapy',
+                         'speech language pathology', 'communication disorder'],
+            'terms': ['childhood apraxia of speech', 'speech therapy children',
+                      'pediatric communication disorders', 'pediatric speech disorders',
+                      'speech language pathology'],
+            'sources': ['arxiv', 'pubmed', 'crossref'],
+            'days_back': 7,
+            'journals': []
+        },
+        'bilingual': {
+            'name': '双语儿童',
+            'keywords': ['bilingual', 'multilingual'],
+            'terms': ['bilingual language disorders'],
+            'sources': ['arxiv', 'pubmed', 'crossref'],
+            'days_back': 7,
+            'journals': []
+        }
+    }
+
+    # 订阅者列表（为空时以 EMAIL_CONFIG['receiver_email'] 作为唯一订阅者）
+    # topics/journals/sources 为空表示不过滤；language 为 'zh' 或 'en'
+    SUBSCRIBERS = [
+        # {
+        #     'name': '张老师',
+        #     'email': 'someone@example.com',
+        #     'language': 'zh',
+        #     'topics': ['dld', 'bilingual'],
+        #     'journals': [],
+        #     'sources': ['pubmed', 'crossref'],
+        #     'enabled': True
+        # },
+    ]
+
     # 期刊网站列表
+    # feed_url 为期刊的RSS/Atom订阅源（优先使用），没有订阅源的期刊解析主页
     JOURNAL_URLS = [
         {
             'name': 'Nature Machine Intelligence',
             'url': 'https://www.nature.com/natmachintell/',
+            'feed_url': 'https://www.nature.com/natmachintell.rss',
             'type': 'nature'
         },
         {
             'name': 'Medical Image Analysis',
             'url': 'https://www.sciencedirect.com/journal/medical-image-analysis',
+            'feed_url': 'https://rss.sciencedirect.com/publication/science/13618415',
             'type': 'sciencedirect'
         },
         {
@@ -40,26 +104,31 @@ class Config:
         {
             'name': 'Artificial Intelligence in Medicine',
             'url': 'https://www.sciencedirect.com/journal/artificial-intelligence-in-medicine',
+            'feed_url': 'https://rss.sciencedirect.com/publication/science/09333657',
             'type': 'sciencedirect'
         },
         {
             'name': 'Psychiatry Research',
             'url': 'https://www.sciencedirect.com/journal/psychiatry-research',
+            'feed_url': 'https://rss.sciencedirect.com/publication/science/01651781',
             'type': 'sciencedirect'
         },
         {
             'name': 'Cell Reports Medicine',
             'url': 'https://www.cell.com/cell-reports-medicine',
+            'feed_url': 'https://www.cell.com/cell-reports-medicine/current.rss',
             'type': 'cell'
         },
         {
             'name': 'Journal of Speech, Language, and Hearing Research',
             'url': 'https://academy.pubs.asha.org/journal/jslhr',
+            'feed_url': 'https://pubs.asha.org/action/showFeed?type=etoc&feed=rss&jc=jslhr',
             'type': 'asha'
         },
         {
             'name': 'Language, Speech, and Hearing Services in Schools',
             'url': 'https://academy.pubs.asha.org/journal/lshss',
+            'feed_url': 'https://pubs.asha.org/action/showFeed?type=etoc&feed=rss&jc=lshss',
             'type': 'asha'
         },
         {
@@ -70,13 +139,28 @@ class Config:
         {
             'name': 'International Journal of Language & Communication Disorders',
             'url': 'https://onlinelibrary.wiley.com/journal/14606984',
+            'feed_url': 'https://onlinelibrary.wiley.com/feed/14606984/most-recent',
             'type': 'wiley'
         }
     ]
     
+    # 自定义期刊页面解析规则（与 parsers.PARSER_SPECS 合并，同名时覆盖内置规则）
+    # 新增出版商时在 JOURNAL_URLS 中使用对应的 type，并在 fixtures/parsers/ 下
+    # 保存页面样本，运行 python3 parsers.py 校验
+    PARSER_SPECS = {
+        # 'example': {
+        #     'containers': ['li.article-item'],
+        #     'title': ['h3 a'],
+        #     'date': ['span.pub-date'],
+        #     'date_formats': ['%d %B %Y'],
+        #     'abstract': ['div.abstract'],
+        #     'base_url': 'https://example.com/'
+        # },
+    }
+    
     # 爬取配置
     CRAWL_CONFIG = {
-        'days_back': 7,  # 爬取过去7天的文章
+        'days_back': 7,  # 爬取过去7天的文章（主题未指定 days_back 时使用）
         'timeout': 30,   # 请求超时时间（秒）
         'delay': 2,      # 请求间隔延迟（秒）
         'user_agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -86,6 +170,7 @@ class Config:
     SUMMARY_CONFIG = {
         'max_length': 500,  # 摘要最大长度
         'min_length': 300,  # 摘要最小长度
+        'max_words': 300,   # 英文摘要的最大单词数（中文摘要按汉字数计算）
         'temperature': 0.7  # 生成温度
     }
     
@@ -93,24 +178,217 @@ class Config:
     SCHEDULE_CONFIG = {
         'hour': 8,        # 早上8点执行
         'minute': 0,      # 0分钟
-        'log_file': 'logs/scheduler.log'
+        'log_file': 'logs/scheduler.log',
+        'cron': '',               # 常驻模式的cron表达式，留空时使用 hour/minute
+        'fanout': False,          # 常驻模式是否按订阅者分发
+        'catch_up_hours': 6,      # 常驻进程启动时补跑错过的任务的最长时限（小时）
+        'lock_file': 'data/autodld.lock',     # 防止多个日报任务同时运行
+        'state_file': 'data/daemon_state.json'  # 记录上次执行的时间
     }
-    
+
+    # 相关度排序配置（BM25，按文章所属主题的查询词和关键词打分）
+    RANKING_CONFIG = {
+        'candidates_per_query': 20,  # 每个查询词向数据来源请求的候选文章数
+        'per_source': 10,            # 每个来源保留的文章数
+        'per_journal': 8,            # 日报中每个期刊最多收录的文章数
+        'max_articles': 30,          # 日报最多收录的文章数
+        'k1': 1.2,
+        'b': 0.75,
+        'title_weight': 2.0,         # 标题中的词频权重（摘要为1）
+        'stats_refresh_minutes': 60  # 历史库词频统计的缓存时间
+    }
+
+    # 摘要补全配置：缺少摘要（或只有短片段）的文章按DOI/PMID批量向PubMed、
+    # Crossref查询，结果永久缓存在文章库中
+    ENRICH_CONFIG = {
+        'enabled': True,
+        'batch_size': 100,           # 每次批量请求的标识数
+        'min_abstract_length': 200,  # 短于此长度的摘要视为片段，需要补全
+        'retry_days': 30             # 未查到摘要的标识，间隔多少天后再重试
+    }
+
+    # 主题聚类配置（TF-IDF + 球面k-means，用于日报的按主题浏览和摘要输入）
+    CLUSTER_CONFIG = {
+        'enabled': True,
+        'max_clusters': 8,      # 主题数上限（实际约为 sqrt(文章数/2)）
+        'label_terms': 3,       # 主题标签使用的词数
+        'max_features': 5000,   # 词表大小上限
+        'iterations': 20,       # k-means最大迭代次数
+        'seed': 42              # 初始化随机种子，保证同样的输入得到同样的分组
+    }
+
+    # 后台预取配置：常驻模式下按间隔轮询各来源，新文章入库并预先生成单篇摘要，
+    # 定时触发时只需生成整体摘要、渲染和发送
+    PREFETCH_CONFIG = {
+        'enabled': True,
+        'intervals': {            # 各来源的轮询间隔（分钟）
+            'arxiv': 180,
+            'pubmed': 120,
+            'crossref': 240
+        },
+        'summarize_articles': True,     # 是否预先生成单篇摘要
+        'max_summaries_per_poll': 30,   # 每轮最多生成的单篇摘要数
+        'max_age_hours': 24,            # 日报收录该时间内预取到的文章；来源超过该时间未成功轮询则触发时现场抓取
+        'state_file': 'data/prefetch_state.json',
+        'circuit_state_file': 'data/prefetch_circuit_state.json'  # 后台预取独立的熔断状态
+    }
+
+    # HTTP连接池配置
+    HTTP_CONFIG = {
+        'pool_connections': 10,  # 缓存的主机连接池数量
+        'pool_maxsize': 10       # 每个主机的最大连接数
+    }
+
+    # 运行截止时间：HTTP请求超时和摘要调用都压缩在预算内，超时的来源
+    # 跳过并在日报中注明，保证日报按时送达
+    DEADLINE_CONFIG = {
+        'enabled': True,
+        'deliver_by': '',            # 'HH:MM'，留空或已过该时刻时使用 max_run_minutes
+        'max_run_minutes': 10,       # 从开始运行算起的总时间预算
+        'stage_reserves': {          # 各阶段为后续阶段预留的秒数
+            'collect': 120,          # 抓取时留出摘要、渲染和发送的时间
+            'summary': 30,           # 摘要时留出渲染和发送的时间
+            'render': 0,
+            'deliver': 0
+        },
+        'min_request_seconds': 3     # 剩余时间少于此值时不再发起新请求
+    }
+
+    # 期刊订阅源配置：配置了 feed_url 的期刊读取RSS/Atom（条件请求），
+    # 订阅源不可用时回退到解析期刊主页
+    FEED_CONFIG = {
+        'enabled': True,
+        'state_file': 'data/feed_state.json'  # 各订阅源的 ETag/Last-Modified 及上次结果
+    }
+
+    # 期刊页面解析配置：大页面交给按CPU核数创建的进程池解析
+    PARSE_CONFIG = {
+        'enabled': True,
+        'processes': 0,              # 进程数，0 表示CPU核数
+        'min_pool_bytes': 200000     # 小于此大小的页面直接在当前进程解析
+    }
+
+    # 运行剖析配置（main.py --profile）
+    PROFILE_CONFIG = {
+        'sample_interval_ms': 5,     # 调用栈采样间隔（用于生成火焰图）
+        'top_functions': 30,         # 每个阶段列出的热点函数数
+        'top_allocations': 15,       # 每个阶段列出的内存分配热点数
+        'traceback_frames': 10       # tracemalloc 记录的调用栈深度
+    }
+
+    # 按主机的熔断器：故障主机在本次运行中快速跳过，下次运行时半开试探
+    CIRCUIT_CONFIG = {
+        'enabled': True,
+        'failure_threshold': 3,      # 连续失败次数达到后打开
+        'timeout_threshold': 2,      # 连续超时次数达到后打开（超时代价更高）
+        'cooldown_minutes': 30,      # 常驻进程中打开多久后转为半开
+        'state_file': 'data/circuit_state.json'
+    }
+
+    # 响应大小与流量配置：正文按块读取，超过来源的上限即中止
+    BYTES_CONFIG = {
+        'caps': {                    # 各来源单个响应解压后的字节上限（0 表示不限）
+            'journal': 3 * 1024 * 1024,    # 期刊列表页，超过时截断（文章列表在页面前部）
+            'feed': 2 * 1024 * 1024,       # 期刊RSS/Atom订阅源
+            'arxiv': 5 * 1024 * 1024,
+            'pubmed': 10 * 1024 * 1024,
+            'crossref': 5 * 1024 * 1024,
+            'deepseek': 1024 * 1024,
+            'default': 20 * 1024 * 1024
+        },
+        'chunk_size': 64 * 1024,
+        'compress_warn_bytes': 16 * 1024   # 超过此大小却未压缩的响应计入统计
+    }
+
+    # 日志配置（所有模块共用一个日志系统）
+    LOG_CONFIG = {
+        'level': 'INFO',
+        'file': 'autodld.log',     # 位于 logs_dir 下
+        'rotation': 'size',        # 'size' 按大小轮转，'time' 按时间轮转
+        'max_bytes': 10 * 1024 * 1024,  # 按大小轮转时单个文件上限
+        'when': 'midnight',        # 按时间轮转时的轮转周期
+        'backup_count': 14,        # 保留的历史文件数量
+        'compress': True,          # 轮转后的旧文件使用gzip压缩
+        'json': True,              # 文件日志使用JSON行格式
+        'format': '%(asctime)s - %(levelname)s - %(message)s'  # 控制台格式
+    }
+
     # 文件路径配置（相对于项目根目录）
     PATHS = {
         'base_dir': '.',
         'templates_dir': 'templates',
         'data_dir': 'data',
-        'logs_dir': 'logs'
+        'logs_dir': 'logs',
+        'archive_dir': 'archive',  # 静态归档站点输出目录
+        'exports_dir': 'exports'   # 机器可读导出（NDJSON/CSV/Parquet）目录
+    }
+
+    # 文章历史库配置
+    STORE_CONFIG = {
+        'db_file': 'autodld.db'  # 位于 data_dir 下，包含文章、每日摘要和全文索引
+    }
+
+    # 归档站点配置
+    ARCHIVE_CONFIG = {
+        'enabled': True,
+        'page_size': 30,       # 每个索引页的条目数
+        'excerpt_length': 120  # 日期索引中摘要预览的长度
+    }
+    
+    # Atom 订阅源配置：归档站点下的 feeds/all.xml 和按主题的 feeds/topics/*.xml
+    ATOM_CONFIG = {
+        'enabled': True,
+        'max_entries': 200,              # 每个订阅源保留的条目数
+        'base_url': '',                  # 归档站点的公开地址，留空时链接相对于订阅源文件
+        'id_prefix': 'urn:autodld:'      # 条目ID前缀（ID一经发布不应再改）
+    }
+    
+    # 周报/月报配置（main.py rollup）：由已保存的日报和文章库汇总，不重新抓取
+    ROLLUP_CONFIG = {
+        'digest_chars': 800,     # 归并摘要时每天的日报摘要最多使用的字数
+        'top_journals': 10,      # 报告中列出的期刊数
+        'max_themes': 8          # 报告中列出的主题数
+    }
+    
+    # 导出配置：每次运行后把文章和整体摘要写成机器可读文件，字段固定
+    EXPORT_CONFIG = {
+        'enabled': True,
+        'formats': ['ndjson', 'csv', 'parquet'],  # parquet 需要安装 pyarrow，未安装时跳过
+        'row_group_size': 10000,   # Parquet 每个行组的行数（写出时内存中只保留一个行组）
+        'compression': 'zstd'      # Parquet 压缩算法
     }
     
     @classmethod
-    def get_date_range(cls):
-        """获取过去7天的日期范围"""
+    def get_date_range(cls, days_back=None):
+        """获取过去 days_back 天（默认 CRAWL_CONFIG['days_back']）的日期范围"""
         end_date = datetime.now()
-        start_date = end_date - timedelta(days=cls.CRAWL_CONFIG['days_back'])
+        start_date = end_date - timedelta(days=days_back or cls.CRAWL_CONFIG['days_back'])
         return start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
     
+    @classmethod
+    def reload(cls):
+        """重新读取config.py并就地更新配置项（常驻进程热加载用）"""
+        import sys
+        import importlib
+        module = sys.modules[__name__]
+        fresh = importlib.reload(module).Config
+        # 各模块持有的是原Config类，保持其身份不变，只替换配置值
+        module.Config = cls
+        for name, value in vars(fresh).items():
+            if name.isupper():
+                setattr(cls, name, value)
+    
+    @classmethod
+    def redirect_outputs(cls, root):
+        """把数据、状态文件、归档、导出和日报输出改到 root 下（回放时使用，不影响正式数据）"""
+        for name in ('data_dir', 'archive_dir', 'exports_dir'):
+            cls.PATHS[name] = os.path.join(root, cls.PATHS[name])
+        cls.PATHS['base_dir'] = root
+        for section in (cls.SCHEDULE_CONFIG, cls.PREFETCH_CONFIG, cls.FEED_CONFIG, cls.CIRCUIT_CONFIG):
+            for key, value in section.items():
+                if key.endswith('_file') and value.startswith('data/'):
+                    section[key] = os.path.join(root, value)
+    
     @classmethod
     def ensure_directories(cls):
         """确保必要的目录存在"""
@@ -1,22 +1,33 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import requests
-import time
-import re
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
-from urllib.parse import urljoin
+from datetime import datetime
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 import logging
 from config import Config
+from log_config import configure_logging
+from http_client import get_http_client
+from ranking import RelevanceRanker
+from parsers import get_parse_pool
+from feeds import FeedReader
+from enrichment import AbstractEnricher
+from circuit_breaker import CircuitOpenError
+from run_deadline import DeadlineExceeded, deadline_expired
+from date_utils import get_date_window, is_within_window
 
 class JournalCrawler:
     """期刊文章爬取器"""
     
     def __init__(self):
         self.config = Config()
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.http = get_http_client()
+        self.ranker = RelevanceRanker()
+        self.enricher = AbstractEnricher()
+        self.parse_pool = get_parse_pool()
+        self.feeds = FeedReader()
+        self.skipped_sources = {}  # 本次运行中未能获取的期刊 -> 原因
+        # 期刊网站按浏览器方式请求，请求头随每次请求发送
+        self.headers = {
             'User-Agent': self.config.CRAWL_CONFIG['user_agent'],
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
@@ -27,52 +38,70 @@ class JournalCrawler:
             'Sec-Fetch-Mode': 'navigate',
             'Sec-Fetch-Site': 'none',
             'Cache-Control': 'max-age=0'
-        })
+        }
         self.setup_logging()
     
     def setup_logging(self):
         """设置日志"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f"{self.config.PATHS['logs_dir']}/crawler.log"),
-                logging.StreamHandler()
-            ]
-        )
+        configure_logging()
         self.logger = logging.getLogger(__name__)
     
-    def crawl_journals(self):
-        """爬取所有期刊的最新文章"""
+    def crawl_journals(self, deadline=None):
+        """爬取所有期刊的最新文章（deadline 为本次运行的截止时间）"""
         all_articles = []
-        start_date, end_date = self.config.get_date_range()
+        start_date, end_date = get_date_window()
         
         self.logger.info(f"开始爬取期刊文章，时间范围: {start_date} 到 {end_date}")
+        self.skipped_sources = {}
         
-        # 先尝试真实爬取
+        # 先尝试真实爬取：下载下一个页面的同时，已下载的页面在进程池中解析
         real_articles_found = False
+        pending = []
         for journal in self.config.JOURNAL_URLS:
+            if deadline_expired(deadline):
+                self.skipped_sources[journal['name']] = "超出时间预算"
+                continue
             try:
                 self.logger.info(f"正在爬取: {journal['name']}")
-                articles = self.crawl_single_journal(journal)
-                if articles:
-                    all_articles.extend(articles)
-                    real_articles_found = True
-                    self.logger.info(f"{journal['name']} 爬取完成，找到 {len(articles)} 篇文章")
+                articles = self.fetch_feed(journal, deadline)
+                if articles is not None:
+                    pending.append((journal, self.completed(articles)))
                 else:
-                    self.logger.info(f"{journal['name']} 爬取完成，找到 0 篇文章")
+                    content = self.fetch_page(journal, deadline)
+                    pending.append((journal, self.parse_pool.submit(content, journal)))
                 
                 # 延迟避免请求过快
-                time.sleep(self.config.CRAWL_CONFIG['delay'])
+                self.http.pause(self.config.CRAWL_CONFIG['delay'])
                 
+            except CircuitOpenError as e:
+                self.skipped_sources[journal['name']] = f"{e.host} 已熔断"
+                self.logger.warning(f"{journal['name']} 所在主机 {e.host} 已熔断，跳过")
+                continue
+            except DeadlineExceeded:
+                self.skipped_sources[journal['name']] = "超出时间预算"
+                continue
             except Exception as e:
                 self.logger.error(f"爬取 {journal['name']} 时出错: {str(e)}")
                 continue
         
+        for journal, future in pending:
+            articles = self.select_articles(journal, future, deadline)
+            if articles:
+                all_articles.extend(articles)
+                real_articles_found = True
+            self.logger.info(f"{journal['name']} 爬取完成，找到 {len(articles)} 篇文章")
+        
         # 如果没有找到真实文章，使用模拟数据
         if not real_articles_found:
             self.logger.warning("未找到真实文章，使用模拟数据生成日报")
             all_articles = self.generate_sample_articles()
+        else:
+            # 页面上通常只有摘要片段，按链接中的DOI一次性批量补全
+            try:
+                if not deadline_expired(deadline):
+                    self.enricher.enrich(all_articles, deadline)
+            except Exception as e:
+                self.logger.warning(f"期刊文章摘要补全失败: {str(e)}")
         
         self.logger.info(f"所有期刊爬取完成，共找到 {len(all_articles)} 篇文章")
         return all_articles
@@ -156,323 +185,70 @@ class JournalCrawler:
         
         return sample_articles
     
-    def crawl_single_journal(self, journal):
-        """爬取单个期刊的文章"""
-        articles = []
-        
+    def crawl_single_journal(self, journal, deadline=None):
+        """爬取单个期刊的文章（有订阅源时读取订阅源，否则解析主页）"""
+        articles = self.fetch_feed(journal, deadline)
+        if articles is not None:
+            return self.select_articles(journal, self.completed(articles))
         try:
-            response = self.session.get(journal['url'], timeout=self.config.CRAWL_CONFIG['timeout'])
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'lxml')
-            
-            # 根据期刊类型使用不同的解析方法
-            if journal['type'] == 'nature':
-                articles = self.parse_nature(soup, journal)
-            elif journal['type'] == 'sciencedirect':
-                articles = self.parse_sciencedirect(soup, journal)
-            elif journal['type'] == 'ieee':
-                articles = self.parse_ieee(soup, journal)
-            elif journal['type'] == 'cell':
-                articles = self.parse_cell(soup, journal)
-            elif journal['type'] == 'asha':
-                articles = self.parse_asha(soup, journal)
-            elif journal['type'] == 'apa':
-                articles = self.parse_apa(soup, journal)
-            elif journal['type'] == 'wiley':
-                articles = self.parse_wiley(soup, journal)
-            else:
-                articles = self.parse_generic(soup, journal)
-                
+            content = self.fetch_page(journal, deadline)
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
         except Exception as e:
-            self.logger.error(f"解析 {journal['name']} 时出错: {str(e)}")
-        
-        return articles
-    
-    def parse_nature(self, soup, journal):
-        """解析Nature系列期刊"""
-        articles = []
-        article_elements = soup.find_all('article', class_=re.compile(r'article|item'))
-        
-        for element in article_elements[:10]:  # 限制数量
-            try:
-                title_elem = element.find(['h1', 'h2', 'h3', 'h4'], class_=re.compile(r'title|heading'))
-                link_elem = element.find('a', href=True)
-                date_elem = element.find('time') or element.find('span', class_=re.compile(r'date|time'))
-                
-                if title_elem and link_elem:
-                    title = title_elem.get_text(strip=True)
-                    link = urljoin(journal['url'], link_elem['href'])
-                    date = self.extract_date(date_elem) if date_elem else datetime.now().strftime('%Y-%m-%d')
-                    
-                    # 检查是否在时间范围内
-                    if self.is_within_date_range(date):
-                        articles.append({
-                            'title': title,
-                            'link': link,
-                            'date': date,
-                            'journal': journal['name'],
-                            'abstract': self.extract_abstract(element)
-                        })
-                        
-            except Exception as e:
-                self.logger.warning(f"解析Nature文章时出错: {str(e)}")
-                continue
-        
-        return articles
+            self.logger.error(f"下载 {journal['name']} 时出错: {str(e)}")
+            return []
+        return self.select_articles(journal, self.parse_pool.submit(content, journal), deadline)
     
-    def parse_sciencedirect(self, soup, journal):
-        """解析ScienceDirect期刊"""
-        articles = []
-        # ScienceDirect通常有特定的文章列表结构
-        article_elements = soup.find_all('li', class_=re.compile(r'article|item|result'))
-        
-        for element in article_elements[:10]:
-            try:
-                title_elem = element.find('h2', class_=re.compile(r'title')) or element.find('a', class_=re.compile(r'title'))
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                    link = urljoin(journal['url'], title_elem.get('href', ''))
-                    date = datetime.now().strftime('%Y-%m-%d')  # ScienceDirect日期需要进一步解析
-                    
-                    articles.append({
-                        'title': title,
-                        'link': link,
-                        'date': date,
-                        'journal': journal['name'],
-                        'abstract': ''
-                    })
-                    
-            except Exception as e:
-                self.logger.warning(f"解析ScienceDirect文章时出错: {str(e)}")
-                continue
-        
-        return articles
-    
-    def parse_ieee(self, soup, journal):
-        """解析IEEE期刊"""
-        articles = []
-        # IEEE Xplore的文章列表结构
-        article_elements = soup.find_all('div', class_=re.compile(r'result|article|item'))
-        
-        for element in article_elements[:10]:
-            try:
-                title_elem = element.find('h2') or element.find('a', class_=re.compile(r'title'))
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                    link = urljoin(journal['url'], title_elem.get('href', ''))
-                    
-                    articles.append({
-                        'title': title,
-                        'link': link,
-                        'date': datetime.now().strftime('%Y-%m-%d'),
-                        'journal': journal['name'],
-                        'abstract': ''
-                    })
-                    
-            except Exception as e:
-                self.logger.warning(f"解析IEEE文章时出错: {str(e)}")
-                continue
-        
-        return articles
-    
-    def parse_cell(self, soup, journal):
-        """解析Cell Press期刊"""
-        articles = []
-        article_elements = soup.find_all('article') or soup.find_all('div', class_=re.compile(r'article|item'))
-        
-        for element in article_elements[:10]:
-            try:
-                title_elem = element.find('h2') or element.find('a', class_=re.compile(r'title'))
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                    link = urljoin(journal['url'], title_elem.get('href', ''))
-                    
-                    articles.append({
-                        'title': title,
-                        'link': link,
-                        'date': datetime.now().strftime('%Y-%m-%d'),
-                        'journal': journal['name'],
-                        'abstract': ''
-                    })
-                    
-            except Exception as e:
-                self.logger.warning(f"解析Cell文章时出错: {str(e)}")
-                continue
-        
-        return articles
-    
-    def parse_asha(self, soup, journal):
-        """解析ASHA期刊"""
-        articles = []
-        article_elements = soup.find_all('div', class_=re.compile(r'article|item|listing'))
-        
-        for element in article_elements[:10]:
-            try:
-                title_elem = element.find('h3') or element.find('a', class_=re.compile(r'title'))
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                    link = urljoin(journal['url'], title_elem.get('href', ''))
-                    
-                    articles.append({
-                        'title': title,
-                        'link': link,
-                        'date': datetime.now().strftime('%Y-%m-%d'),
-                        'journal': journal['name'],
-                        'abstract': ''
-                    })
-                    
-            except Exception as e:
-                self.logger.warning(f"解析ASHA文章时出错: {str(e)}")
-                continue
-        
-        return articles
-    
-    def parse_apa(self, soup, journal):
-        """解析APA期刊"""
-        articles = []
-        article_elements = soup.find_all('div', class_=re.compile(r'article|item|issue'))
-        
-        for element in article_elements[:10]:
-            try:
-                title_elem = element.find('h3') or element.find('a', class_=re.compile(r'title'))
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                    link = urljoin(journal['url'], title_elem.get('href', ''))
-                    
-                    articles.append({
-                        'title': title,
-                        'link': link,
-                        'date': datetime.now().strftime('%Y-%m-%d'),
-                        'journal': journal['name'],
-                        'abstract': ''
-                    })
-                    
-            except Exception as e:
-                self.logger.warning(f"解析APA文章时出错: {str(e)}")
-                continue
-        
-        return articles
-    
-    def parse_wiley(self, soup, journal):
-        """解析Wiley期刊"""
-        articles = []
-        article_elements = soup.find_all('article') or soup.find_all('div', class_=re.compile(r'article|item'))
-        
-        for element in article_elements[:10]:
-            try:
-                title_elem = element.find('h2') or element.find('a', class_=re.compile(r'title'))
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                    link = urljoin(journal['url'], title_elem.get('href', ''))
-                    
-                    articles.append({
-                        'title': title,
-                        'link': link,
-                        'date': datetime.now().strftime('%Y-%m-%d'),
-                        'journal': journal['name'],
-                        'abstract': ''
-                    })
-                    
-            except Exception as e:
-                self.logger.warning(f"解析Wiley文章时出错: {str(e)}")
-                continue
-        
-        return articles
+    def fetch_feed(self, journal, deadline=None):
+        """读取期刊的订阅源；没有配置或读取失败时返回None（由调用方解析主页）"""
+        if not self.config.FEED_CONFIG['enabled'] or not journal.get('feed_url'):
+            return None
+        try:
+            return self.feeds.fetch(journal, self.headers, deadline)
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            self.logger.warning(f"{journal['name']} 订阅源不可用，改为解析主页: {str(e)}")
+            return None
     
-    def parse_generic(self, soup, journal):
-        """通用解析方法"""
-        articles = []
-        # 尝试多种常见的文章元素
-        selectors = [
-            'article',
-            '.article',
-            '.item',
-            '.result',
-            '.listing-item',
-            '[class*="article"]',
-            '[class*="item"]'
-        ]
-        
-        for selector in selectors:
-            article_elements = soup.select(selector)
-            if article_elements:
-                break
-        
-        for element in article_elements[:10]:
-            try:
-                title_elem = (element.find('h1') or element.find('h2') or 
-                             element.find('h3') or element.find('a', class_=re.compile(r'title')))
-                
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                    link_elem = title_elem if title_elem.name == 'a' else title_elem.find('a', href=True)
-                    link = urljoin(journal['url'], link_elem.get('href', '')) if link_elem else ''
-                    
-                    articles.append({
-                        'title': title,
-                        'link': link,
-                        'date': datetime.now().strftime('%Y-%m-%d'),
-                        'journal': journal['name'],
-                        'abstract': ''
-                    })
-                    
-            except Exception as e:
-                self.logger.warning(f"通用解析文章时出错: {str(e)}")
-                continue
-        
-        return articles
+    @staticmethod
+    def completed(articles):
+        """已得到结果的 Future，与进程池的解析结果统一处理"""
+        future = Future()
+        future.set_result(articles)
+        return future
     
-    def extract_date(self, date_elem):
-        """提取日期信息"""
-        try:
-            if date_elem.get('datetime'):
-                date_str = date_elem['datetime']
-            else:
-                date_str = date_elem.get_text(strip=True)
-            
-            # 尝试解析各种日期格式
-            date_formats = [
-                '%Y-%m-%d',
-                '%d %B %Y',
-                '%B %d, %Y',
-                '%Y/%m/%d',
-                '%m/%d/%Y'
-            ]
-            
-            for fmt in date_formats:
-                try:
-                    date_obj = datetime.strptime(date_str[:10], fmt)
-                    return date_obj.strftime('%Y-%m-%d')
-                except ValueError:
-                    continue
-            
-            return datetime.now().strftime('%Y-%m-%d')
-            
-        except Exception:
-            return datetime.now().strftime('%Y-%m-%d')
+    def fetch_page(self, journal, deadline=None):
+        """下载期刊页面，返回原始字节"""
+        response = self.http.get(journal['url'], headers=self.headers,
+                                 source='journal', allow_truncated=True, deadline=deadline)
+        response.raise_for_status()
+        return response.content
     
-    def extract_abstract(self, element):
-        """提取摘要信息"""
+    def select_articles(self, journal, future, deadline=None):
+        """取回解析结果，按日期窗口过滤后按相关度保留每个期刊的前若干篇
+
+        有截止时间时最多等待到当前阶段的预算用完，仍未解析完的页面
+        取消并记为跳过。
+        """
+        timeout = max(0, deadline.remaining()) if deadline is not None else None
         try:
-            abstract_elem = element.find('p', class_=re.compile(r'abstract|summary'))
-            if abstract_elem:
-                return abstract_elem.get_text(strip=True)[:200]  # 限制长度
-        except Exception:
-            pass
-        return ""
+            # 按期刊类型从解析器注册表获取解析规则（在进程池或当前进程中执行）
+            articles = [article for article in future.result(timeout)
+                        if self.is_within_date_range(article['date'])]
+        except FutureTimeoutError:
+            future.cancel()
+            self.skipped_sources[journal['name']] = "超出时间预算"
+            self.logger.warning(f"{journal['name']} 的页面未能在时间预算内解析完，跳过")
+            articles = []
+        except Exception as e:
+            self.logger.error(f"解析 {journal['name']} 时出错: {str(e)}")
+            articles = []
+        return self.ranker.select(articles, self.config.RANKING_CONFIG['per_journal'])
     
     def is_within_date_range(self, date_str):
-        """检查日期是否在指定范围内"""
-        try:
-            article_date = datetime.strptime(date_str, '%Y-%m-%d')
-            start_date, end_date = self.config.get_date_range()
-            start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-            end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-            
-            return start_date_obj <= article_date <= end_date_obj
-        except Exception:
-            return True  # 如果日期解析失败，默认包含
+        """检查日期是否在指定范围内（窗口每天只计算一次；没有日期时保留）"""
+        return is_within_window(date_str)
 
 if __name__ == "__main__":
     # 测试爬虫
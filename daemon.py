@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import signal
+import logging
+import threading
+from datetime import datetime, timedelta
+from config import Config
+from log_config import configure_logging
+from run_lock import RunLock
+from prefetch import PrefetchThread
+from parsers import shutdown_parse_pool
+
+class CronSchedule:
+    """标准5字段cron表达式（分 时 日 月 周），支持 * , - / 语法"""
+
+    FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron表达式应包含5个字段: {expression}")
+
+        self.expression = expression
+        (self.minutes, self.hours, self.days,
+         self.months, self.weekdays) = [
+            self.parse_field(field, low, high)
+            for field, (low, high) in zip(fields, self.FIELD_RANGES)
+        ]
+        # 周日可写作0或7
+        if 7 in self.weekdays:
+            self.weekdays = (self.weekdays - {7}) | {0}
+        # '*/2' 这类以*开头的写法同样视为不受限
+        self.day_restricted = not fields[2].startswith('*')
+        self.weekday_restricted = not fields[4].startswith('*')
+
+    @staticmethod
+    def parse_field(field, low, high):
+        """解析单个字段为取值集合"""
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_str = part.split('/', 1)
+                step = int(step_str)
+                if step <= 0:
+                    raise ValueError(f"无效的步长: {field}")
+
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(value) for value in part.split('-', 1))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+
+            if start < low or end > high or start > end:
+                raise ValueError(f"字段取值超出范围: {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def day_matches(self, moment):
+        """日和周同时受限时满足其一即可（与cron语义一致）"""
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment):
+        """返回严格晚于 moment 的下一个触发时间"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+
+        while candidate < limit:
+            if candidate.month not in self.months:
+                month_start = candidate.replace(day=1, hour=0, minute=0)
+                candidate = (month_start + timedelta(days=32)).replace(day=1)
+            elif not self.day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+
+        raise ValueError(f"cron表达式没有可用的触发时间: {self.expression}")
+
+
+class ReportDaemon:
+    """常驻进程：内置调度器按cron表达式定时生成日报
+
+    与cron每天冷启动相比，HTTP连接池、已编译模板、文章库连接等状态
+    在多次运行之间保持；支持SIGHUP热加载配置、启动时补跑错过的任务，
+    并通过文件锁避免与其他日报任务重叠执行。
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.setup_logging()
+        self.schedule = CronSchedule(self.get_cron_expression())
+        self.system = None
+        self.prefetch_thread = None
+        self.wake_event = threading.Event()
+        self.stop_requested = False
+        self.reload_requested = False
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def get_cron_expression(self):
+        """从 SCHEDULE_CONFIG 获取cron表达式"""
+        schedule_config = self.config.SCHEDULE_CONFIG
+        return schedule_config.get('cron') or f"{schedule_config['minute']} {schedule_config['hour']} * * *"
+
+    def load_state(self):
+        """读取上次执行记录"""
+        state_file = self.config.SCHEDULE_CONFIG['state_file']
+        if os.path.exists(state_file):
+            try:
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"读取常驻进程状态失败: {str(e)}")
+        return {}
+
+    def save_state(self, state):
+        """保存执行记录"""
+        state_file = self.config.SCHEDULE_CONFIG['state_file']
+        os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+        tmp_path = state_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, state_file)
+
+    def handle_signal(self, signum, frame):
+        """SIGTERM/SIGINT 在当前任务完成后退出，SIGHUP 重新加载配置"""
+        if signum == signal.SIGHUP:
+            self.logger.info("收到SIGHUP，将在空闲时重新加载配置")
+            self.reload_requested = True
+        else:
+            self.logger.info("收到退出信号，将在当前任务完成后退出")
+            self.stop_requested = True
+        self.wake_event.set()
+
+    def warm_up(self):
+        """预先创建各模块并编译模板，使定时任务触发后立即开始工作
+
+        新实例创建成功后才释放旧实例的文章库连接和预取HTTP客户端，
+        重建失败时继续使用旧实例。
+        """
+        from main import AutoDLD
+        from html_generator import get_template_env
+
+        previous = self.system
+        self.system = AutoDLD()
+        if previous is not None:
+            previous.close()
+        env = get_template_env()
+        for template_name in ('report.html', 'email.html', 'partials/email_article.html'):
+            env.get_template(template_name)
+        self.logger.info(f"常驻进程预热完成，库中共 {self.system.store.count_articles()} 篇文章")
+
+    def start_prefetch(self):
+        """按 PREFETCH_CONFIG 启动后台预取线程"""
+        if self.config.PREFETCH_CONFIG['enabled']:
+            self.prefetch_thread = PrefetchThread(self.system.prefetcher)
+            self.prefetch_thread.start()
+
+    def stop_prefetch(self):
+        """停止后台预取线程（等待当前轮询完成）"""
+        if self.prefetch_thread is not None:
+            self.prefetch_thread.stop()
+            self.prefetch_thread = None
+
+    def reload(self):
+        """重新加载配置并重建各模块（连接池和模板缓存保留）"""
+        self.reload_requested = False
+        self.stop_prefetch()
+        try:
+            Config.reload()
+            shutdown_parse_pool()
+            self.schedule = CronSchedule(self.get_cron_expression())
+            self.warm_up()
+            self.logger.info(f"配置已重新加载，调度表达式: {self.schedule.expression}")
+        except Exception as e:
+            self.logger.error(f"重新加载配置失败，继续使用原配置: {str(e)}")
+        self.start_prefetch()
+
+    def latest_missed_slot(self, now):
+        """上次执行之后、当前时间之前最近一次应触发的时间"""
+        last_slot = self.load_state().get('last_slot')
+        if not last_slot:
+            return None
+
+        slot = None
+        moment = datetime.fromisoformat(last_slot)
+        for _ in range(10000):
+            next_slot = self.schedule.next_after(moment)
+            if next_slot > now:
+                break
+            slot = moment = next_slot
+        return slot
+
+    def catch_up(self):
+        """启动时补跑错过的任务（超过补跑时限的只记录不执行）"""
+        now = datetime.now()
+        if not self.load_state().get('last_slot'):
+            # 首次启动：从现在开始计算错过的任务
+            self.save_state({'last_slot': now.replace(second=0, microsecond=0).isoformat()})
+            return
+
+        missed = self.latest_missed_slot(now)
+        if missed is None:
+            return
+
+        max_delay = timedelta(hours=self.config.SCHEDULE_CONFIG['catch_up_hours'])
+        if now - missed <= max_delay:
+            self.logger.info(f"补跑错过的任务: {missed}")
+            self.run_scheduled(missed)
+        else:
+            self.logger.warning(f"错过的任务 {missed} 已超过补跑时限，跳过")
+            self.save_state({**self.load_state(), 'last_slot': missed.isoformat()})
+
+    def run_scheduled(self, slot):
+        """执行一次日报任务（持有运行锁）"""
+        lock = RunLock(self.config.SCHEDULE_CONFIG['lock_file'])
+        if not lock.acquire():
+            self.logger.warning("另一个日报任务正在运行，跳过本次执行")
+            return False
+
+        started = datetime.now()
+        try:
+            if self.config.SCHEDULE_CONFIG['fanout']:
+                success = self.system.run_fanout_report(open_browser=False)
+            else:
+                success = self.system.run_daily_report(send_email=True, open_browser=False)
+        except Exception as e:
+            self.logger.error(f"定时任务执行出错: {str(e)}")
+            success = False
+        finally:
+            lock.release()
+
+        self.save_state({
+            'last_slot': slot.isoformat(),
+            'last_started': started.isoformat(),
+            'last_finished': datetime.now().isoformat(),
+            'last_success': success
+        })
+        return success
+
+    def run_forever(self):
+        """主循环"""
+        signal.signal(signal.SIGTERM, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+        signal.signal(signal.SIGHUP, self.handle_signal)
+
+        self.warm_up()
+        self.logger.info(f"常驻进程已启动 (pid {os.getpid()})，调度表达式: {self.schedule.expression}")
+        self.catch_up()
+        self.start_prefetch()
+
+        while not self.stop_requested:
+            next_run = self.schedule.next_after(datetime.now())
+            self.logger.info(f"下次执行时间: {next_run}")
+
+            while not self.stop_requested and not self.reload_requested:
+                remaining = (next_run - datetime.now()).total_seconds()
+                if remaining <= 0:
+                    break
+                # 分段等待，兼顾系统休眠后的时钟跳变
+                self.wake_event.wait(min(remaining, 60))
+                self.wake_event.clear()
+
+            if self.stop_requested:
+                break
+            if self.reload_requested:
+                self.reload()
+                continue
+
+            self.run_scheduled(next_run)
+
+        self.stop_prefetch()
+        if self.system is not None:
+            self.system.close()
+        self.logger.info("常驻进程已退出")
+
+
+if __name__ == "__main__":
+    ReportDaemon().run_forever()
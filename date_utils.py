@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from config import Config
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+_MONTH = r'(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?'
+
+# 快速路径：按常见程度排列，使用 search 以便从“Published: 13 March 2025”等文本中提取
+_ISO = re.compile(r'(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})')
+_DAY_MONTH_YEAR = re.compile(r'(\d{1,2})(?:st|nd|rd|th)?\s+' + _MONTH + r',?\s+(\d{4})', re.IGNORECASE)
+_MONTH_DAY_YEAR = re.compile(_MONTH + r'\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})', re.IGNORECASE)
+_US_NUMERIC = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})')
+_MONTH_YEAR = re.compile(_MONTH + r',?\s+(\d{4})', re.IGNORECASE)
+_YEAR_MONTH = re.compile(r'(\d{4})\s+' + _MONTH, re.IGNORECASE)
+
+# 回放录制的HTTP请求时固定为录制当天，使日期窗口与录制时一致
+_today_override = None
+
+
+def _format(year, month, day):
+    """校验并格式化为 YYYY-MM-DD，非法日期返回None"""
+    try:
+        return date(int(year), int(month), int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def _candidates(text):
+    """按常见程度依次给出内置写法匹配到的 (年, 月, 日)，按需逐个匹配"""
+    match = _ISO.search(text)
+    if match:
+        yield match.groups()
+    match = _DAY_MONTH_YEAR.search(text)
+    if match:
+        day, month, year = match.groups()
+        yield year, MONTHS[month.lower()], day
+    match = _MONTH_DAY_YEAR.search(text)
+    if match:
+        month, day, year = match.groups()
+        yield year, MONTHS[month.lower()], day
+    match = _US_NUMERIC.search(text)
+    if match:
+        month, day, year = match.groups()
+        yield year, month, day
+    match = _MONTH_YEAR.search(text)
+    if match:
+        month, year = match.groups()
+        yield year, MONTHS[month.lower()], 1
+    match = _YEAR_MONTH.search(text)
+    if match:
+        year, month = match.groups()
+        yield year, MONTHS[month.lower()], 1
+
+
+@lru_cache(maxsize=8192)
+def normalize_date(text, formats=()):
+    """把各种日期写法规范化为 'YYYY-MM-DD'，无法识别时返回None（不回退到当天）
+
+    支持ISO（含时间部分）、'15 January 2025'、'January 15, 2025'、
+    'MM/DD/YYYY'，以及只有年月的 'March 2025'、'2025 Mar'（取当月1日）；
+    formats 为解析规则指定的 strptime 格式，先于内置写法尝试（例如
+    '%d/%m/%Y' 优先于内置的 'MM/DD/YYYY'）；内置写法得到非法日期时继续
+    尝试后面的写法。结果按输入缓存。
+    """
+    if not text:
+        return None
+    text = text.strip()
+
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+
+    for year, month, day in _candidates(text):
+        result = _format(year, month, day)
+        if result:
+            return result
+    return None
+
+
+def _month_number(value):
+    """PubMed的月份可能是数字或英文缩写"""
+    value = (value or '').strip()
+    if value.isdigit():
+        return int(value)
+    return MONTHS.get(value[:3].lower())
+
+
+def pubmed_date(article_elem):
+    """从PubMed XML的 PubmedArticle 提取出版日期
+
+    优先使用电子出版日期 ArticleDate，其次 PubDate（Year/Month/Day，月份
+    可为缩写），最后解析 MedlineDate（如 '2025 Mar-Apr'）。缺少的日、月
+    取1；完全没有日期时返回None。
+    """
+    for path in ('.//ArticleDate', './/PubDate'):
+        elem = article_elem.find(path)
+        if elem is None:
+            continue
+        year = elem.findtext('Year')
+        if year:
+            month = _month_number(elem.findtext('Month')) or 1
+            day = (elem.findtext('Day') or '1').strip()
+            result = _format(year, month, day if day.isdigit() else 1)
+            if result:
+                return result
+        medline = elem.findtext('MedlineDate')
+        if medline:
+            result = normalize_date(medline)
+            if result:
+                return result
+            year_match = re.search(r'\d{4}', medline)
+            if year_match:
+                return _format(year_match.group(), 1, 1)
+    return None
+
+
+def crossref_date(item):
+    """从Crossref条目提取出版日期（按 published、online、print、issued 的顺序）"""
+    for field in ('published', 'published-online', 'published-print', 'issued'):
+        parts = (item.get(field) or {}).get('date-parts') or []
+        if parts and parts[0] and parts[0][0]:
+            year, month, day = (list(parts[0]) + [1, 1])[:3]
+            result = _format(year, month or 1, day or 1)
+            if result:
+                return result
+    return None
+
+
+@lru_cache(maxsize=64)
+def _window(days_back, today):
+    start = today - timedelta(days=days_back)
+    return start.isoformat(), today.isoformat()
+
+
+def set_today(day):
+    """固定日期窗口、日报日期等使用的“今天”（None 恢复为系统日期）"""
+    global _today_override
+    _today_override = day
+
+
+def current_day():
+    """本次运行的“今天”（回放时为录制当天）"""
+    return _today_override or date.today()
+
+
+def get_date_window(days_back=None):
+    """返回 (起始日期, 截止日期) 字符串；同一天内对同一窗口只计算一次"""
+    return _window(days_back or Config.CRAWL_CONFIG['days_back'], current_day())
+
+
+def is_within_window(date_str, days_back=None):
+    """'YYYY-MM-DD' 日期是否在窗口内；没有日期时返回True（无法判断，保留文章）"""
+    if not date_str:
+        return True
+    start_date, end_date = get_date_window(days_back)
+    return start_date <= date_str <= end_date
@@ -1,12 +1,120 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import time
+import queue
 import smtplib
 import logging
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime
 from config import Config
+from log_config import configure_logging
+from date_utils import current_day
+from html_generator import EMAIL_LABELS
+
+class SMTPConnection:
+    """可复用的已认证SMTP连接
+
+    连接在多封邮件之间保持打开，服务器断开时自动重连；
+    达到单连接邮件数上限后主动换新连接，避免触发服务商限制。
+    """
+    
+    # 连接层面的错误：重连后重试
+    RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+    
+    def __init__(self, email_config, logger):
+        self.email_config = email_config
+        self.logger = logger
+        self.server = None
+        self.messages_sent = 0
+    
+    def connect(self):
+        """建立连接、启用TLS并登录"""
+        config = self.email_config
+        server = smtplib.SMTP(config['smtp_server'], config['smtp_port'],
+                              timeout=config.get('timeout', 30))
+        try:
+            # 未显式配置时沿用原有行为：仅QQ邮箱启用TLS
+            if config.get('use_tls', config['smtp_server'] == 'smtp.qq.com'):
+                server.starttls()
+            
+            server.ehlo_or_helo_if_needed()
+            if server.has_extn('auth'):
+                server.login(config['sender_email'], config['sender_password'])
+            elif config.get('sender_password'):
+                # 常见原因是未启用TLS：多数服务商只在STARTTLS之后提供AUTH
+                self.logger.warning(f"SMTP服务器 {config['smtp_server']} 未提供AUTH，"
+                                    f"已配置的密码未使用，将不登录直接发送")
+        except Exception:
+            server.close()
+            raise
+        
+        self.server = server
+        self.messages_sent = 0
+    
+    def close(self):
+        """关闭连接（忽略关闭过程中的错误）"""
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+        self.server = None
+    
+    def ensure_connected(self):
+        """确保连接可用，必要时新建或轮换连接"""
+        limit = self.email_config.get('max_messages_per_connection', 0)
+        if self.server is not None and limit and self.messages_sent >= limit:
+            self.close()
+        if self.server is None:
+            self.connect()
+    
+    def deliver(self, msg):
+        """发送一封邮件，返回包含耗时和结果的字典"""
+        start = time.perf_counter()
+        result = {
+            'recipient': msg['To'],
+            'success': False,
+            'attempts': 0,
+            'elapsed': 0.0,
+            'error': ''
+        }
+        
+        max_attempts = 1 + self.email_config.get('max_retries', 1)
+        while result['attempts'] < max_attempts:
+            result['attempts'] += 1
+            try:
+                self.ensure_connected()
+                self.server.send_message(msg)
+                self.messages_sent += 1
+                result['success'] = True
+                result['error'] = ''
+                break
+            except smtplib.SMTPAuthenticationError:
+                result['error'] = "邮箱认证失败，请检查邮箱地址和授权码"
+                self.close()
+                break
+            except smtplib.SMTPRecipientsRefused as e:
+                result['error'] = f"收件人被拒绝: {str(e)}"
+                break
+            except smtplib.SMTPResponseException as e:
+                # 421 表示服务器即将关闭连接，换新连接后重试
+                result['error'] = f"SMTP错误: {e.smtp_code} {e.smtp_error}"
+                self.close()
+                if e.smtp_code != 421:
+                    break
+            except self.RECONNECT_ERRORS as e:
+                result['error'] = f"连接中断: {str(e)}"
+                self.logger.warning(f"SMTP连接中断，准备重连: {str(e)}")
+                self.close()
+            except smtplib.SMTPException as e:
+                result['error'] = f"SMTP错误: {str(e)}"
+                break
+        
+        result['elapsed'] = time.perf_counter() - start
+        return result
 
 class EmailSender:
     """邮件发送器"""
@@ -14,21 +122,16 @@ class EmailSender:
     def __init__(self):
         self.config = Config()
         self.setup_logging()
+        self.connection = None
+        self.connection_lock = threading.Lock()
     
     def setup_logging(self):
         """设置日志"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f"{self.config.PATHS['logs_dir']}/email_sender.log"),
-                logging.StreamHandler()
-            ]
-        )
+        configure_logging()
         self.logger = logging.getLogger(__name__)
     
-    def send_daily_report(self, html_content, articles_count):
-        """发送日报邮件"""
+    def send_daily_report(self, html_content, articles_count, receiver_email=None):
+        """发送日报邮件（receiver_email 为空时发送给配置中的接收邮箱）"""
         try:
             # 检查邮箱配置是否完整
             if not self.validate_email_config():
@@ -36,7 +139,7 @@ class EmailSender:
                 return False
             
             # 创建邮件内容
-            msg = self.create_email_message(html_content, articles_count)
+            msg = self.create_email_message(html_content, articles_count, receiver_email)
             
             # 发送邮件
             success = self.send_email(msg)
@@ -52,10 +155,12 @@ class EmailSender:
             self.logger.error(f"发送日报邮件时出错: {str(e)}")
             return False
     
-    def validate_email_config(self):
-        """验证邮箱配置"""
+    def validate_email_config(self, require_receiver=True):
+        """验证邮箱配置（按订阅者分发时收件人来自订阅者列表，不要求 receiver_email）"""
         config = self.config.EMAIL_CONFIG
-        required_fields = ['smtp_server', 'smtp_port', 'sender_email', 'sender_password', 'receiver_email']
+        required_fields = ['smtp_server', 'smtp_port', 'sender_email', 'sender_password']
+        if require_receiver:
+            required_fields.append('receiver_email')
         
         for field in required_fields:
             if not config.get(field):
@@ -64,161 +169,25 @@ class EmailSender:
         
         return True
     
-    def create_email_message(self, html_content, articles_count):
-        """创建邮件消息"""
-        current_date = datetime.now().strftime('%Y-%m-%d')
+    def create_email_message(self, html_content, articles_count, receiver_email=None, language='zh'):
+        """创建邮件消息（html_content 为完整的邮件HTML文档，原样作为HTML正文；
+        主题和纯文本正文按 language 使用 EMAIL_LABELS 中的文字）"""
+        current_date = current_day().isoformat()
         email_config = self.config.EMAIL_CONFIG
+        labels = EMAIL_LABELS.get(language, EMAIL_LABELS['zh'])
         
         # 创建多部分消息
         msg = MIMEMultipart('alternative')
-        msg['Subject'] = f'每日新闻导览 - {current_date}'
+        msg['Subject'] = labels['subject'].format(date=current_date)
         msg['From'] = email_config['sender_email']
-        msg['To'] = email_config['receiver_email']
+        msg['To'] = receiver_email or email_config['receiver_email']
         
         # 创建纯文本版本（备用）
-        text_content = f"""
-学术期刊日报 - {current_date}
-
-今日共收录 {articles_count} 篇文章，涵盖多个学术期刊的最新研究动态。
-
-详细内容请查看HTML版本邮件。
-
---
-AutoDLD系统自动生成
-        """
-        
-        # 创建HTML版本
-        html_content_with_wrapper = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, 
-                       "PingFang SC", "Hiragino Sans GB", "Microsoft YaHei", sans-serif;
-            line-height: 1.6;
-            margin: 0;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }}
-        .container {{
-            max-width: 600px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            overflow: hidden;
-        }}
-        .header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 30px;
-            text-align: center;
-        }}
-        .header h1 {{
-            margin: 0;
-            font-size: 24px;
-            font-weight: 600;
-        }}
-        .header .date {{
-            margin-top: 10px;
-            opacity: 0.9;
-        }}
-        .content {{
-            padding: 30px;
-        }}
-        .summary-section {{
-            background: #f8f9fa;
-            padding: 20px;
-            border-radius: 8px;
-            margin-bottom: 20px;
-            border-left: 4px solid #3498db;
-        }}
-        .summary-section h2 {{
-            color: #2c3e50;
-            margin-top: 0;
-            font-size: 18px;
-        }}
-        .stats {{
-            background: #e8f4fd;
-            padding: 15px;
-            border-radius: 8px;
-            margin-bottom: 20px;
-            text-align: center;
-            font-size: 14px;
-            color: #2c3e50;
-        }}
-        .footer {{
-            text-align: center;
-            padding: 20px;
-            color: #7f8c8d;
-            font-size: 12px;
-            border-top: 1px solid #e0e0e0;
-        }}
-        .article-list {{
-            margin-top: 20px;
-        }}
-        .article-item {{
-            padding: 10px 0;
-            border-bottom: 1px solid #e0e0e0;
-        }}
-        .article-item:last-child {{
-            border-bottom: none;
-        }}
-        .article-title {{
-            font-weight: 500;
-            margin-bottom: 5px;
-        }}
-        .article-title a {{
-            color: #2980b9;
-            text-decoration: none;
-        }}
-        .article-meta {{
-            font-size: 12px;
-            color: #7f8c8d;
-        }}
-        @media (max-width: 480px) {{
-            .content {{
-                padding: 15px;
-            }}
-            .header {{
-                padding: 20px;
-            }}
-            .header h1 {{
-                font-size: 20px;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>📚 学术期刊日报</h1>
-            <div class="date">{current_date}</div>
-        </div>
-        
-        <div class="content">
-            <div class="stats">
-                📊 今日收录 {articles_count} 篇文章 | ⏰ 生成时间: {datetime.now().strftime('%H:%M:%S')}
-            </div>
-            
-            {html_content}
-            
-            <div class="footer">
-                <p>本日报由 AutoDLD 系统自动生成</p>
-                <p>数据来源于各学术期刊官方网站</p>
-            </div>
-        </div>
-    </div>
-</body>
-</html>
-        """
+        text_content = labels['text_body'].format(date=current_date, count=articles_count)
         
         # 添加文本和HTML部分
         part1 = MIMEText(text_content, 'plain', 'utf-8')
-        part2 = MIMEText(html_content_with_wrapper, 'html', 'utf-8')
+        part2 = MIMEText(html_content, 'html', 'utf-8')
         
         msg.attach(part1)
         msg.attach(part2)
@@ -226,59 +195,96 @@ AutoDLD系统自动生成
         return msg
     
     def send_email(self, msg):
-        """发送邮件"""
-        email_config = self.config.EMAIL_CONFIG
+        """发送邮件（复用本实例的SMTP连接）"""
+        with self.connection_lock:
+            if self.connection is None:
+                self.connection = SMTPConnection(self.config.EMAIL_CONFIG, self.logger)
+            result = self.connection.deliver(msg)
+        
+        if result['success']:
+            self.logger.info(f"邮件发送成功: {result['recipient']} ({result['elapsed']:.2f} 秒)")
+        else:
+            self.logger.error(f"邮件发送失败: {result['recipient']} - {result['error']}")
+        return result['success']
+    
+    def send_bulk(self, messages):
+        """批量发送邮件
+        
+        由少量工作线程各自持有一条长连接并行发送，连接数受
+        EMAIL_CONFIG['max_connections'] 限制。返回与 messages 一一对应的
+        结果列表，每项包含收件人、是否成功、尝试次数、耗时和错误信息。
+        """
+        if not messages:
+            return []
+        
+        workers = max(1, min(self.config.EMAIL_CONFIG.get('max_connections', 3), len(messages)))
+        job_queue = queue.Queue()
+        for index, msg in enumerate(messages):
+            job_queue.put((index, msg))
+        results = [None] * len(messages)
+        
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._delivery_worker, args=(job_queue, results),
+                             name=f'smtp-worker-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        total_time = time.perf_counter() - start
+        
+        success_count = sum(1 for result in results if result['success'])
+        slowest = max(result['elapsed'] for result in results)
+        self.logger.info(f"批量发送完成: 成功 {success_count}/{len(results)} 封，"
+                         f"{workers} 条连接，总耗时 {total_time:.2f} 秒，单封最长 {slowest:.2f} 秒")
+        for result in results:
+            if not result['success']:
+                self.logger.warning(f"发送给 {result['recipient']} 失败: {result['error']}")
         
+        return results
+    
+    def _delivery_worker(self, job_queue, results):
+        """工作线程：持有一条连接，依次发送队列中的邮件"""
+        connection = SMTPConnection(self.config.EMAIL_CONFIG, self.logger)
         try:
-            # 创建SMTP连接
-            if email_config['smtp_server'] == 'smtp.qq.com':
-                # QQ邮箱需要TLS
-                server = smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port'])
-                server.starttls()  # 启用TLS加密
-            else:
-                # 其他邮箱服务器
-                server = smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port'])
-            
-            # 登录邮箱
-            server.login(email_config['sender_email'], email_config['sender_password'])
-            
-            # 发送邮件
-            server.send_message(msg)
-            
-            # 关闭连接
-            server.quit()
-            
-            self.logger.info("邮件发送成功")
-            return True
-            
-        except smtplib.SMTPAuthenticationError:
-            self.logger.error("邮箱认证失败，请检查邮箱地址和授权码")
-            return False
-        except smtplib.SMTPException as e:
-            self.logger.error(f"SMTP错误: {str(e)}")
-            return False
-        except Exception as e:
-            self.logger.error(f"发送邮件时发生未知错误: {str(e)}")
-            return False
+            while True:
+                try:
+                    index, msg = job_queue.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    results[index] = connection.deliver(msg)
+                except Exception as e:
+                    results[index] = {
+                        'recipient': msg['To'],
+                        'success': False,
+                        'attempts': 1,
+                        'elapsed': 0.0,
+                        'error': f"发送邮件时发生未知错误: {str(e)}"
+                    }
+        finally:
+            connection.close()
+    
+    def close(self):
+        """关闭复用的SMTP连接"""
+        with self.connection_lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
     
     def test_email_connection(self):
         """测试邮箱连接"""
         if not self.validate_email_config():
             return False, "邮箱配置不完整"
         
-        email_config = self.config.EMAIL_CONFIG
+        connection = SMTPConnection(self.config.EMAIL_CONFIG, self.logger)
         
         try:
-            # 测试连接
-            if email_config['smtp_server'] == 'smtp.qq.com':
-                server = smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port'])
-                server.starttls()
-            else:
-                server = smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port'])
-            
-            # 测试登录
-            server.login(email_config['sender_email'], email_config['sender_password'])
-            server.quit()
+            # 测试连接和登录
+            connection.connect()
+            connection.close()
             
             return True, "邮箱连接测试成功"
             
@@ -289,13 +295,13 @@ AutoDLD系统自动生成
     
     def send_test_email(self):
         """发送测试邮件"""
-        test_html = """
-        <div class="summary-section">
-            <h2>🎯 测试邮件</h2>
-            <p>这是一封测试邮件，用于验证邮件发送功能是否正常工作。</p>
-            <p>如果收到此邮件，说明AutoDLD系统的邮件发送功能配置正确。</p>
-        </div>
-        """
+        test_html = """<!DOCTYPE html>
+<html><head><meta charset="UTF-8"></head>
+<body style="font-family:sans-serif;line-height:1.6;padding:20px">
+<h2>🎯 测试邮件</h2>
+<p>这是一封测试邮件，用于验证邮件发送功能是否正常工作。</p>
+<p>如果收到此邮件，说明AutoDLD系统的邮件发送功能配置正确。</p>
+</body></html>"""
         
         success = self.send_daily_report(test_html, 0)
         
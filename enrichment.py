@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+import html
+import logging
+import xml.etree.ElementTree as ET
+from config import Config
+from log_config import configure_logging
+from http_client import get_http_client
+from circuit_breaker import CircuitOpenError
+from run_deadline import DeadlineExceeded
+from article_store import PLACEHOLDER_ABSTRACTS
+
+EUTILS_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+CROSSREF_URL = "https://api.crossref.org/works"
+
+DOI_PATTERN = re.compile(r'\b(10\.\d{4,9}/[^\s"<>?#]+)', re.IGNORECASE)
+TAG_PATTERN = re.compile(r'</?[A-Za-z][^>]*>')
+JATS_TITLE_PATTERN = re.compile(r'<jats:title[^>]*>.*?</jats:title>', re.IGNORECASE | re.DOTALL)
+
+
+def extract_doi(text):
+    """从链接或文本中提取DOI（小写，去掉结尾标点）"""
+    match = DOI_PATTERN.search(text or '')
+    return match.group(1).rstrip('.,;)').lower() if match else ''
+
+
+def clean_jats(text):
+    """去掉摘要中的标签（Crossref的JATS标签及其中的“Abstract”小标题、订阅源中的HTML），合并空白"""
+    text = JATS_TITLE_PATTERN.sub(' ', text or '')
+    text = html.unescape(TAG_PATTERN.sub(' ', text))
+    return ' '.join(TAG_PATTERN.sub(' ', text).split())
+
+
+def pubmed_abstract(article_elem):
+    """拼接PubMed结构化摘要的各部分（BACKGROUND: ... METHODS: ...）"""
+    parts = []
+    for elem in article_elem.findall('.//Abstract/AbstractText'):
+        text = ' '.join(''.join(elem.itertext()).split())
+        if not text:
+            continue
+        label = elem.get('Label')
+        parts.append(f"{label}: {text}" if label else text)
+    return ' '.join(parts)
+
+
+class AbstractEnricher:
+    """为缺少摘要的文章批量补全摘要
+
+    收集缺少摘要的文章的PMID和DOI，先查文章库中的永久缓存，未命中的
+    通过PubMed（DOI批量esearch + 批量efetch）和Crossref（filter=doi:列表）
+    成批解析；结果（包括查不到的）写入缓存，每篇文章只补全一次。
+    """
+
+    def __init__(self, store=None, http=None):
+        self.config = Config()
+        self.setup_logging()
+        self.http = http or get_http_client()
+        self.store = store
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def needs_abstract(self, article):
+        """摘要缺失、是占位文本或只是页面上的短片段"""
+        abstract = (article.get('abstract') or '').strip()
+        return (not abstract or abstract in PLACEHOLDER_ABSTRACTS
+                or len(abstract) < self.config.ENRICH_CONFIG['min_abstract_length'])
+
+    def identifiers(self, article):
+        """文章的DOI和PMID（DOI也会从链接中提取）"""
+        doi = (article.get('doi') or '').lower() or extract_doi(article.get('link'))
+        pmid = article.get('pmid') or ''
+        if not pmid:
+            match = re.search(r'pubmed\.ncbi\.nlm\.nih\.gov/(\d+)', article.get('link') or '')
+            pmid = match.group(1) if match else ''
+        return doi, pmid
+
+    def enrich(self, articles, deadline=None):
+        """就地补全文章摘要，返回补全的篇数（deadline 为本次运行的截止时间）"""
+        if not self.config.ENRICH_CONFIG['enabled']:
+            return 0
+
+        pending = []
+        for article in articles:
+            if self.needs_abstract(article):
+                doi, pmid = self.identifiers(article)
+                if doi or pmid:
+                    pending.append((article, f'doi:{doi}' if doi else '', f'pmid:{pmid}' if pmid else ''))
+        if not pending:
+            return 0
+
+        if self.store is None:
+            from article_store import ArticleStore
+            self.store = ArticleStore()
+
+        # 1. 永久缓存（包括之前未查到的，在 retry_days 内不再请求）
+        keys = {key for _, doi_key, pmid_key in pending for key in (doi_key, pmid_key) if key}
+        cached = self.store.get_enrichments(keys, self.config.ENRICH_CONFIG['retry_days'])
+        missing_pmids = set()
+        missing_dois = set()
+        for _, doi_key, pmid_key in pending:
+            if (doi_key and doi_key in cached) or (pmid_key and pmid_key in cached):
+                continue
+            if pmid_key:
+                missing_pmids.add(pmid_key[5:])
+            elif doi_key:
+                missing_dois.add(doi_key[4:])
+
+        # 2. 批量请求：PMID直接efetch；DOI先在PubMed中查，剩余的查Crossref
+        #    熔断和时间预算用完时异常直接抛出，本次不写入任何结果
+        resolved = {}
+        answered = set()
+        if missing_dois:
+            results, pubmed_answered = self.fetch_pubmed_by_doi(missing_dois, deadline)
+            resolved.update(results)
+        if missing_pmids:
+            results, pmid_answered = self.fetch_pubmed(missing_pmids, deadline)
+            resolved.update(results)
+            answered |= pmid_answered
+        remaining_dois = {doi for doi in missing_dois if f'doi:{doi}' not in resolved}
+        if remaining_dois:
+            results, crossref_answered = self.fetch_crossref(remaining_dois, deadline)
+            resolved.update(results)
+            # DOI只有在PubMed和Crossref的请求都成功时才能确认未查到
+            answered |= pubmed_answered & crossref_answered
+
+        # 只为请求成功的标识记录“未查到”，失败的批次下次运行重试
+        results = {key: '' for key in answered}
+        results.update(resolved)
+        for _, doi_key, pmid_key in pending:
+            abstract = resolved.get(pmid_key) or resolved.get(doi_key)
+            if abstract:
+                # 同时有PMID和DOI的文章两个键都保存，文章库按DOI回填
+                results.update((key, abstract) for key in (doi_key, pmid_key) if key)
+        if results:
+            self.store.save_enrichments(results)
+        cached.update(resolved)
+
+        enriched = 0
+        for article, doi_key, pmid_key in pending:
+            abstract = cached.get(pmid_key) or cached.get(doi_key)
+            if abstract and len(abstract) > len(article.get('abstract') or ''):
+                article['abstract'] = abstract
+                enriched += 1
+        self.logger.info(f"摘要补全: 待补全 {len(pending)} 篇，补全 {enriched} 篇，"
+                         f"新请求 {len(missing_pmids) + len(missing_dois)} 个标识")
+        return enriched
+
+    def batches(self, items):
+        """按 batch_size 分批"""
+        items = sorted(items)
+        size = self.config.ENRICH_CONFIG['batch_size']
+        for i in range(0, len(items), size):
+            yield items[i:i + size]
+
+    def fetch_pubmed(self, pmids, deadline=None):
+        """批量efetch，返回 ({'pmid:…'/'doi:…': 摘要}, 请求成功的 'pmid:…' 集合)"""
+        results = {}
+        answered = set()
+        for batch in self.batches(pmids):
+            try:
+                response = self.http.post(f"{EUTILS_URL}efetch.fcgi",
+                                          data={'db': 'pubmed', 'id': ','.join(batch), 'retmode': 'xml'},
+                                          source='pubmed', deadline=deadline)
+                response.raise_for_status()
+                root = ET.fromstring(response.content)
+            except (CircuitOpenError, DeadlineExceeded):
+                raise
+            except Exception as e:
+                self.logger.warning(f"PubMed批量获取摘要失败: {str(e)}")
+                continue
+            answered.update(f'pmid:{pmid}' for pmid in batch)
+
+            for article in root.findall('.//PubmedArticle'):
+                abstract = pubmed_abstract(article)
+                if not abstract:
+                    continue
+                pmid = article.findtext('.//MedlineCitation/PMID')
+                doi = article.findtext('.//ArticleId[@IdType="doi"]')
+                if pmid:
+                    results[f'pmid:{pmid}'] = abstract
+                if doi:
+                    results[f'doi:{doi.lower()}'] = abstract
+        return results, answered
+
+    def fetch_pubmed_by_doi(self, dois, deadline=None):
+        """用一次esearch把一批DOI转换为PMID，再批量efetch
+
+        返回 (结果, 在PubMed中确认查过的 'doi:…' 集合)；任何一步失败时
+        无法确认哪些DOI不在PubMed中，确认集合为空。
+        """
+        pmids = set()
+        answered = set()
+        complete = True
+        for batch in self.batches(dois):
+            try:
+                response = self.http.post(f"{EUTILS_URL}esearch.fcgi", data={
+                    'db': 'pubmed',
+                    'term': ' OR '.join(f'"{doi}"[doi]' for doi in batch),
+                    'retmode': 'json',
+                    'retmax': len(batch)
+                }, source='pubmed', deadline=deadline)
+                response.raise_for_status()
+                pmids.update(response.json().get('esearchresult', {}).get('idlist', []))
+            except (CircuitOpenError, DeadlineExceeded):
+                raise
+            except Exception as e:
+                self.logger.warning(f"PubMed DOI转换失败: {str(e)}")
+                continue
+            answered.update(f'doi:{doi}' for doi in batch)
+
+        results = {}
+        if pmids:
+            results, pmid_answered = self.fetch_pubmed(pmids, deadline)
+            complete = pmid_answered == {f'pmid:{pmid}' for pmid in pmids}
+        return results, answered if complete else set()
+
+    def fetch_crossref(self, dois, deadline=None):
+        """Crossref按DOI列表过滤批量查询，返回 (结果, 请求成功的 'doi:…' 集合)"""
+        results = {}
+        answered = set()
+        for batch in self.batches(dois):
+            try:
+                response = self.http.get(CROSSREF_URL, params={
+                    'filter': ','.join(f'doi:{doi}' for doi in batch),
+                    'select': 'DOI,abstract',
+                    'rows': len(batch)
+                }, source='crossref', deadline=deadline)
+                response.raise_for_status()
+                items = response.json().get('message', {}).get('items', [])
+            except (CircuitOpenError, DeadlineExceeded):
+                raise
+            except Exception as e:
+                self.logger.warning(f"Crossref批量获取摘要失败: {str(e)}")
+                continue
+            answered.update(f'doi:{doi}' for doi in batch)
+
+            for item in items:
+                abstract = clean_jats(item.get('abstract'))
+                if abstract and item.get('DOI'):
+                    results[f"doi:{item['DOI'].lower()}"] = abstract
+        return results, answered
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import csv
+import json
+import logging
+from datetime import datetime
+from config import Config
+from log_config import configure_logging
+from article_store import PLACEHOLDER_ABSTRACTS
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    # 列式文件是可选的，未安装 pyarrow 时只导出 NDJSON 和 CSV
+    pyarrow = None
+
+# 导出记录的固定字段（新增字段只追加在末尾，不改变已有字段的顺序和含义）
+EXPORT_FORMATS = ('ndjson', 'csv', 'parquet')
+ARTICLE_FIELDS = ('report_date', 'article_key', 'doi', 'title', 'journal', 'source',
+                  'link', 'date', 'topics', 'abstract', 'summary')
+DIGEST_FIELDS = ('date', 'summary', 'article_count', 'article_keys')
+
+
+def article_record(article, report_date):
+    """把文章转换为导出记录（字段见 ARTICLE_FIELDS）"""
+    key = article.get('article_key', '')
+    abstract = article.get('abstract') or ''
+    return {
+        'report_date': report_date,
+        'article_key': key,
+        'doi': article.get('doi') or (key[4:] if key.startswith('doi:') else ''),
+        'title': article.get('title', ''),
+        'journal': article.get('journal', ''),
+        'source': article.get('source', ''),
+        'link': article.get('link', ''),
+        'date': article.get('date') or '',
+        'topics': sorted(article.get('topics') or []),
+        'abstract': '' if abstract in PLACEHOLDER_ABSTRACTS else abstract,
+        'summary': article.get('summary', '')
+    }
+
+
+def csv_value(value):
+    """CSV中列表字段用分号连接"""
+    return ';'.join(value) if isinstance(value, list) else value
+
+
+class RecordWriter:
+    """一种记录的流式写出器，同时写 NDJSON、CSV 和（可选）Parquet
+
+    每条记录到达即写出，内存中只保留 Parquet 的当前行组。写入过程中
+    使用 .tmp 文件，close() 时才替换为正式文件，读取方不会看到半截文件。
+    """
+
+    def __init__(self, directory, name, fields, formats, parquet_schema=None):
+        self.config = Config()
+        self.setup_logging()
+        self.fields = fields
+        self.count = 0
+        self.paths = {}
+        self.files = {}
+        self.csv_writer = None
+        self.parquet_writer = None
+        self.parquet_schema = parquet_schema
+        self.row_group = []
+        os.makedirs(directory, exist_ok=True)
+
+        if 'ndjson' in formats:
+            self.files['ndjson'] = self.open_file(directory, f'{name}.ndjson')
+        if 'csv' in formats:
+            self.files['csv'] = self.open_file(directory, f'{name}.csv', newline='')
+            self.csv_writer = csv.writer(self.files['csv'])
+            self.csv_writer.writerow(fields)
+        if 'parquet' in formats and parquet_schema is not None:
+            if pyarrow is None:
+                self.logger.warning("未安装 pyarrow，跳过 Parquet 导出")
+            else:
+                path = os.path.join(directory, f'{name}.parquet')
+                self.paths['parquet'] = path
+                self.parquet_writer = pyarrow.parquet.ParquetWriter(
+                    path + '.tmp', parquet_schema,
+                    compression=self.config.EXPORT_CONFIG['compression'])
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def open_file(self, directory, filename, newline=None):
+        """打开临时文件并登记正式路径"""
+        path = os.path.join(directory, filename)
+        self.paths[filename.rsplit('.', 1)[-1]] = path
+        return open(path + '.tmp', 'w', encoding='utf-8', newline=newline)
+
+    def write(self, record):
+        """写出一条记录"""
+        if 'ndjson' in self.files:
+            self.files['ndjson'].write(json.dumps(record, ensure_ascii=False) + '\n')
+        if self.csv_writer is not None:
+            self.csv_writer.writerow([csv_value(record[field]) for field in self.fields])
+        if self.parquet_writer is not None:
+            self.row_group.append(record)
+            if len(self.row_group) >= self.config.EXPORT_CONFIG['row_group_size']:
+                self.flush_row_group()
+        self.count += 1
+
+    def flush_row_group(self):
+        """把缓存的行作为一个行组写入 Parquet"""
+        if self.row_group:
+            table = pyarrow.Table.from_pylist(self.row_group, schema=self.parquet_schema)
+            self.parquet_writer.write_table(table)
+            self.row_group = []
+
+    def close(self):
+        """结束写入并发布文件，返回 {格式: 路径}"""
+        for f in self.files.values():
+            f.close()
+        if self.parquet_writer is not None:
+            self.flush_row_group()
+            self.parquet_writer.close()
+        for path in self.paths.values():
+            os.replace(path + '.tmp', path)
+        return dict(self.paths)
+
+    def abort(self):
+        """出错时丢弃未完成的文件"""
+        for f in self.files.values():
+            f.close()
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+        for path in self.paths.values():
+            if os.path.exists(path + '.tmp'):
+                os.remove(path + '.tmp')
+
+
+class Exporter:
+    """文章和每日摘要的机器可读导出
+
+    每次运行后写出 exports/<日期>/articles.* 和 digest.*（ndjson、csv，
+    安装了 pyarrow 时另有 zstd 压缩的 parquet）；export 命令从文章库流式导出任意时间段的历史，
+    记录格式与每日导出相同。
+    """
+
+    def __init__(self, store=None):
+        self.config = Config()
+        self.setup_logging()
+        self.store = store
+        self.output_dir = self.config.PATHS['exports_dir']
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def article_schema():
+        if pyarrow is None:
+            return None
+        return pyarrow.schema([
+            (field, pyarrow.list_(pyarrow.string()) if field == 'topics' else pyarrow.string())
+            for field in ARTICLE_FIELDS
+        ])
+
+    @staticmethod
+    def digest_schema():
+        if pyarrow is None:
+            return None
+        return pyarrow.schema([
+            ('date', pyarrow.string()),
+            ('summary', pyarrow.string()),
+            ('article_count', pyarrow.int32()),
+            ('article_keys', pyarrow.list_(pyarrow.string()))
+        ])
+
+    def write_records(self, directory, name, fields, records, formats, schema):
+        """把记录流写入一组文件，返回写出的记录数"""
+        writer = RecordWriter(directory, name, fields, formats, schema)
+        try:
+            for record in records:
+                writer.write(record)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        return writer.count
+
+    def export_run(self, date, summary, articles, formats=None):
+        """导出本次运行的文章和整体摘要，返回输出目录"""
+        formats = formats or self.config.EXPORT_CONFIG['formats']
+        directory = os.path.join(self.output_dir, date)
+        keys = [article.get('article_key', '') for article in articles]
+
+        count = self.write_records(directory, 'articles', ARTICLE_FIELDS,
+                                   (article_record(article, date) for article in articles),
+                                   formats, self.article_schema())
+        self.write_records(directory, 'digest', DIGEST_FIELDS,
+                           [{'date': date, 'summary': summary,
+                             'article_count': len(articles), 'article_keys': keys}],
+                           formats, self.digest_schema())
+        self.logger.info(f"已导出 {count} 篇文章和当日摘要: {directory}")
+        return directory
+
+    def export_history(self, since=None, until=None, directory=None, formats=None):
+        """从文章库流式导出 since..until（YYYY-MM-DD）各日日报的文章和每日摘要
+
+        文章按日报展开，出现在多份日报中的文章每份各占一行，与每日导出
+        一致。返回 (输出目录, 文章行数, 摘要数)。
+        """
+        formats = formats or self.config.EXPORT_CONFIG['formats']
+        directory = directory or os.path.join(
+            self.output_dir, f"history_{since or 'all'}_{until or datetime.now().strftime('%Y-%m-%d')}")
+
+        articles = (article_record(article, article['report_date'])
+                    for article in self.store.iter_report_articles(since, until))
+        article_count = self.write_records(directory, 'articles', ARTICLE_FIELDS, articles,
+                                           formats, self.article_schema())
+
+        digests = ({'date': report['date'], 'summary': report['summary'],
+                    'article_count': len(report['article_keys']), 'article_keys': report['article_keys']}
+                   for report in self.store.iter_daily_reports(since, until))
+        digest_count = self.write_records(directory, 'digest', DIGEST_FIELDS, digests,
+                                          formats, self.digest_schema())
+
+        self.logger.info(f"已导出历史文章 {article_count} 篇、每日摘要 {digest_count} 份: {directory}")
+        return directory, article_count, digest_count
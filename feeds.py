@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import logging
+import threading
+import xml.etree.ElementTree as ET
+from config import Config
+from log_config import configure_logging
+from http_client import get_http_client
+from date_utils import normalize_date
+from enrichment import clean_jats, extract_doi
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+
+# RSS 2.0 的 item、RSS 1.0（RDF）的 item 和 Atom 的 entry 都按本地名识别
+ITEM_TAGS = {'item', 'entry'}
+DATE_TAGS = ('published', 'pubDate', 'date', 'publicationDate', 'coverDate', 'updated')
+ABSTRACT_TAGS = ('summary', 'description', 'content', 'encoded', 'abstract')
+
+
+def local_name(tag):
+    """去掉命名空间：'{http://purl.org/dc/elements/1.1/}date' -> 'date'"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_item(elem):
+    """把一个 item/entry 元素转换为 {本地名: 文本}，Atom 的链接取 href 属性"""
+    fields = {}
+    for child in elem:
+        name = local_name(child.tag)
+        if name == 'link' and child.tag.startswith('{' + ATOM_NS):
+            if child.get('rel', 'alternate') == 'alternate' and 'link' not in fields:
+                fields['link'] = child.get('href', '')
+            continue
+        text = ''.join(child.itertext()).strip()
+        if text and name not in fields:
+            fields[name] = text
+    return fields
+
+
+def parse_feed(content, journal_name, chunk_size=64 * 1024):
+    """增量解析 RSS/Atom 正文，返回文章记录列表
+
+    content 是 HttpClient.read_body 已读入内存的正文（大小受
+    BYTES_CONFIG 的字节上限约束）。XMLPullParser 分块喂入，每个条目
+    处理完即释放，不会在正文之外再构建整棵元素树；除正文本身外，
+    额外内存只有解析出的文章记录。
+    """
+    parser = ET.XMLPullParser(events=('end',))
+    articles = []
+    for start in range(0, len(content), chunk_size):
+        parser.feed(content[start:start + chunk_size])
+        for _, elem in parser.read_events():
+            if local_name(elem.tag) not in ITEM_TAGS:
+                continue
+            fields = parse_item(elem)
+            elem.clear()
+
+            title = clean_jats(fields.get('title'))
+            if not title:
+                continue
+            link = fields.get('link') or fields.get('guid') or fields.get('id') or ''
+            date_text = next((fields[tag] for tag in DATE_TAGS if fields.get(tag)), '')
+            abstract = next((clean_jats(fields[tag]) for tag in ABSTRACT_TAGS if fields.get(tag)), '')
+            doi = (fields.get('doi') or extract_doi(fields.get('identifier'))
+                   or extract_doi(link) or extract_doi(fields.get('guid')))
+            article = {
+                'title': title,
+                'link': link,
+                'date': normalize_date(date_text) or '',
+                'journal': journal_name,
+                'abstract': abstract
+            }
+            if doi:
+                article['doi'] = doi.lower()
+            articles.append(article)
+    parser.close()
+    return articles
+
+
+class FeedReader:
+    """期刊RSS/Atom订阅源的读取
+
+    使用条件请求（ETag / Last-Modified），订阅源未变化时服务器返回304，
+    直接使用上次解析的结果；订阅源的条目带有准确的日期和DOI，比解析
+    期刊主页轻量得多。
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.setup_logging()
+        self.http = get_http_client()
+        self.lock = threading.Lock()
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def load_state(self):
+        """读取各订阅源的 ETag、Last-Modified 和上次的解析结果"""
+        state_file = self.config.FEED_CONFIG['state_file']
+        if os.path.exists(state_file):
+            try:
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"读取订阅源状态失败: {str(e)}")
+        return {}
+
+    def save_state(self, state):
+        """保存订阅源状态"""
+        state_file = self.config.FEED_CONFIG['state_file']
+        os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+        tmp_path = state_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, state_file)
+
+    def fetch(self, journal, headers=None, deadline=None):
+        """读取期刊的订阅源，返回文章列表（订阅源未变化时返回上次的结果）"""
+        feed_url = journal['feed_url']
+        with self.lock:
+            entry = self.load_state().get(feed_url, {})
+
+        request_headers = dict(headers or {})
+        request_headers['Accept'] = 'application/rss+xml, application/atom+xml, application/xml;q=0.9, */*;q=0.1'
+        # 只有保存了上次的解析结果时才发条件请求，否则304时无内容可用
+        if 'articles' in entry:
+            if entry.get('etag'):
+                request_headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request_headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self.http.get(feed_url, headers=request_headers, source='feed', deadline=deadline)
+        if response.status_code == 304 and 'articles' in entry:
+            self.logger.info(f"{journal['name']} 订阅源未变化（304），使用上次的 {len(entry['articles'])} 篇")
+            return [dict(article) for article in entry['articles']]
+        response.raise_for_status()
+
+        articles = parse_feed(response.content, journal['name'])
+        with self.lock:
+            state = self.load_state()
+            state[feed_url] = {
+                'etag': response.headers.get('ETag', ''),
+                'last_modified': response.headers.get('Last-Modified', ''),
+                'articles': articles
+            }
+            self.save_state(state)
+        self.logger.info(f"{journal['name']} 订阅源解析出 {len(articles)} 篇（{len(response.content) / 1024:.0f} KB）")
+        return [dict(article) for article in articles]
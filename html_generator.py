@@ -2,10 +2,117 @@
 # -*- coding: utf-8 -*-
 
 import os
-from datetime import datetime
-from jinja2 import Template
+import re
+import threading
+from datetime import datetime, timedelta
+from jinja2 import (Environment, FileSystemLoader, FileSystemBytecodeCache,
+                    select_autoescape)
+from markupsafe import Markup, escape
 import logging
 from config import Config
+from log_config import configure_logging
+from topics import get_window_days
+from date_utils import get_date_window, current_day
+from clustering import ThemeClusterer
+
+_template_env = None
+_template_env_lock = threading.Lock()
+
+# 邮件、共用的宏和备用摘要中随订阅者语言变化的文字
+EMAIL_LABELS = {
+    'zh': {
+        'title': '学术期刊日报',
+        'summary': '今日摘要',
+        'stats': '{journals}种期刊，{articles}篇文章',
+        'journal_count': '{count}篇',
+        'footer': '生成时间：{date} | AutoDLD系统自动生成',
+        'date_format': '%Y年%m月%d日',
+        'condensed_notice': '今日文章较多，邮件中仅列出摘要和各期刊篇数。',
+        'view_full': '查看完整日报',
+        'missing_sources': '以下来源本次未能完整获取：',
+        'source_reason': '{source}（{reason}）',
+        'list_separator': '、',
+        'journal_line': '{journal}：{count}',
+        'published': '发布日期：',
+        'abstract': '摘要：',
+        'unknown_date': '未知',
+        'subject': '每日新闻导览 - {date}',
+        'text_body': '学术期刊日报 - {date}\n\n今日共收录 {count} 篇文章，涵盖多个学术期刊的最新研究动态。\n\n'
+                     '详细内容请查看HTML版本邮件。\n\n--\nAutoDLD系统自动生成',
+        'no_articles': '今日未发现新的学术文章更新。',
+        'fallback_intro': '过去{days}天内，各学术期刊的研究动态如下：\n\n',
+        'fallback_journal': '• {journal}: {count}篇新文章\n',
+        'fallback_keywords': '\n研究热点主要集中在：\n',
+        'fallback_outro': '\n这些研究反映了当前学术界的活跃态势，涵盖了多个前沿领域。'
+    },
+    'en': {
+        'title': 'Academic Journal Daily',
+        'summary': "Today's Summary",
+        'stats': '{journals} journals, {articles} articles',
+        'journal_count': '{count} articles',
+        'footer': 'Generated on {date} | AutoDLD',
+        'date_format': '%Y-%m-%d',
+        'condensed_notice': 'Too many articles today; this email lists only the summary and per-journal counts.',
+        'view_full': 'View the full report',
+        'missing_sources': 'Incomplete sources in this issue: ',
+        'source_reason': '{source} ({reason})',
+        'list_separator': ', ',
+        'journal_line': '{journal}: {count}',
+        'published': 'Published: ',
+        'abstract': 'Abstract: ',
+        'unknown_date': 'unknown',
+        'subject': 'Academic Journal Daily - {date}',
+        'text_body': 'Academic Journal Daily - {date}\n\n{count} new articles from academic journals today.\n\n'
+                     'See the HTML version of this email for details.\n\n--\nGenerated by AutoDLD',
+        'no_articles': 'No new journal articles were found today.',
+        'fallback_intro': 'Research activity across journals over the past {days} days:\n\n',
+        'fallback_journal': '• {journal}: {count} new articles\n',
+        'fallback_keywords': '\nMain research topics:\n',
+        'fallback_outro': '\nTogether these reflect active research across several frontier areas.'
+    }
+}
+
+
+_WHITESPACE_BETWEEN_TAGS = re.compile(r'>\s+<')
+_LEADING_WHITESPACE = re.compile(r'^\s+', re.MULTILINE)
+
+
+def minify_html(html):
+    """去掉缩进和标签之间的空白"""
+    html = _LEADING_WHITESPACE.sub('', html)
+    return _WHITESPACE_BETWEEN_TAGS.sub('><', html).strip()
+
+
+def nl2br(value):
+    """转义文本并将换行转换为<br>"""
+    return Markup('<br>').join(escape(value).split('\n'))
+
+
+def get_template_env():
+    """获取共享的Jinja2环境（进程内只创建一次）
+
+    模板从 PATHS['templates_dir'] 加载，编译结果同时缓存在内存和
+    磁盘字节码缓存中，重复渲染与后续进程都不再重新编译模板。
+    """
+    global _template_env
+
+    with _template_env_lock:
+        if _template_env is None:
+            cache_dir = os.path.join(Config.PATHS['data_dir'], 'jinja_cache')
+            os.makedirs(cache_dir, exist_ok=True)
+
+            env = Environment(
+                loader=FileSystemLoader(Config.PATHS['templates_dir']),
+                bytecode_cache=FileSystemBytecodeCache(cache_dir),
+                autoescape=select_autoescape(['html', 'xml']),
+                cache_size=-1
+            )
+            env.filters['nl2br'] = nl2br
+            env.globals['now'] = datetime.now
+            env.globals['labels'] = EMAIL_LABELS
+            _template_env = env
+
+    return _template_env
 
 class HTMLGenerator:
     """HTML日报页面生成器"""
@@ -17,21 +124,15 @@ class HTMLGenerator:
     
     def setup_logging(self):
         """设置日志"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f"{self.config.PATHS['logs_dir']}/html_generator.log"),
-                logging.StreamHandler()
-            ]
-        )
+        configure_logging()
         self.logger = logging.getLogger(__name__)
     
-    def generate_daily_report(self, articles, summary):
-        """生成日报HTML页面"""
+    def generate_daily_report(self, articles, summary, themes=None, missing_sources=None):
+        """生成日报HTML页面（missing_sources 为本次未能完整获取的来源 -> 原因）"""
         try:
             # 准备数据
-            report_data = self.prepare_report_data(articles, summary)
+            report_data = self.prepare_report_data(articles, summary, themes=themes,
+                                                   missing_sources=missing_sources)
             
             # 生成HTML内容
             html_content = self.render_template(report_data)
@@ -46,10 +147,18 @@ class HTMLGenerator:
             self.logger.error(f"日报生成失败: {str(e)}")
             raise
     
-    def prepare_report_data(self, articles, summary):
-        """准备报告数据"""
-        current_date = datetime.now().strftime('%Y年%m月%d日')
-        start_date, end_date = self.config.get_date_range()
+    def prepare_report_data(self, articles, summary, report_date=None, themes=None, missing_sources=None):
+        """准备报告数据（report_date 用于重新生成历史日报，默认为今天）
+        
+        themes 为主题聚类结果，未提供且 CLUSTER_CONFIG 启用时在此计算。
+        """
+        if report_date is None:
+            current_date = current_day().strftime('%Y年%m月%d日')
+            start_date, end_date = get_date_window(get_window_days())
+        else:
+            current_date = report_date.strftime('%Y年%m月%d日')
+            start_date = (report_date - timedelta(days=get_window_days())).strftime('%Y-%m-%d')
+            end_date = report_date.strftime('%Y-%m-%d')
         
         # 按期刊分组文章
         journals = {}
@@ -59,6 +168,13 @@ class HTMLGenerator:
                 journals[journal_name] = []
             journals[journal_name].append(article)
         
+        # 按主题分组文章
+        if themes is None and self.config.CLUSTER_CONFIG['enabled']:
+            try:
+                themes = ThemeClusterer().cluster(articles)
+            except Exception as e:
+                self.logger.warning(f"主题聚类失败，日报只按期刊分组: {str(e)}")
+        
         # 统计信息
         total_articles = len(articles)
         journal_count = len(journals)
@@ -69,6 +185,8 @@ class HTMLGenerator:
             'end_date': end_date,
             'summary': summary,
             'journals': journals,
+            'themes': themes or [],
+            'missing_sources': missing_sources or {},
             'total_articles': total_articles,
             'journal_count': journal_count,
             'articles': articles
@@ -76,419 +194,12 @@ class HTMLGenerator:
     
     def render_template(self, data):
         """渲染HTML模板"""
-        template_str = """
-<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>学术期刊日报 - {{ current_date }}</title>
-    <style>
-        :root {
-            --primary-color: #2c3e50;
-            --secondary-color: #3498db;
-            --background-color: #ffffff;
-            --text-color: #2c3e50;
-            --border-color: #e0e0e0;
-            --accent-color: #e74c3c;
-        }
-        
-        @media (prefers-color-scheme: dark) {
-            :root {
-                --background-color: #1a1a1a;
-                --text-color: #ffffff;
-                --border-color: #444444;
-                --primary-color: #3498db;
-            }
-        }
-        
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "PingFang SC", "Hiragino Sans GB", "Microsoft YaHei", sans-serif;
-            line-height: 1.6;
-            color: var(--text-color);
-            background-color: var(--background-color);
-            transition: all 0.3s ease;
-        }
-        
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-        }
-        
-        .header {
-            text-align: center;
-            margin-bottom: 40px;
-            padding-bottom: 20px;
-            border-bottom: 2px solid var(--border-color);
-        }
-        
-        .header h1 {
-            color: var(--primary-color);
-            font-size: 2.5em;
-            margin-bottom: 10px;
-        }
-        
-        .header .date {
-            color: var(--secondary-color);
-            font-size: 1.2em;
-            font-weight: 300;
-        }
-        
-        .header .stats {
-            margin-top: 15px;
-            font-size: 1.1em;
-            color: var(--text-color);
-            opacity: 0.8;
-        }
-        
-        .summary-section {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 30px;
-            border-radius: 15px;
-            margin-bottom: 40px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-        }
-        
-        .summary-section h2 {
-            font-size: 1.8em;
-            margin-bottom: 20px;
-            text-align: center;
-        }
-        
-        .summary-content {
-            font-size: 1.1em;
-            line-height: 1.8;
-            text-align: justify;
-            max-height: 300px;
-            overflow-y: auto;
-            padding-right: 10px;
-        }
-        
-        .summary-content::-webkit-scrollbar {
-            width: 6px;
-        }
-        
-        .summary-content::-webkit-scrollbar-track {
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 3px;
-        }
-        
-        .summary-content::-webkit-scrollbar-thumb {
-            background: rgba(255, 255, 255, 0.3);
-            border-radius: 3px;
-        }
-        
-        .summary-content::-webkit-scrollbar-thumb:hover {
-            background: rgba(255, 255, 255, 0.5);
-        }
-        
-        .journals-section {
-            margin-bottom: 40px;
-        }
-        
-        .journals-section h2 {
-            font-size: 2em;
-            color: var(--primary-color);
-            margin-bottom: 20px;
-            text-align: center;
-        }
-        
-        .journal-card {
-            background: var(--background-color);
-            border: 1px solid var(--border-color);
-            border-radius: 10px;
-            padding: 25px;
-            margin-bottom: 25px;
-            transition: transform 0.3s ease, box-shadow 0.3s ease;
-        }
-        
-        .journal-card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 15px 35px rgba(0,0,0,0.1);
-        }
-        
-        .journal-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 15px;
-            padding-bottom: 15px;
-            border-bottom: 1px solid var(--border-color);
-        }
-        
-        .journal-name {
-            font-size: 1.5em;
-            color: var(--primary-color);
-            font-weight: 600;
-        }
-        
-        .article-count {
-            background: var(--secondary-color);
-            color: white;
-            padding: 5px 15px;
-            border-radius: 20px;
-            font-size: 0.9em;
-        }
-        
-        .articles-list {
-            list-style: none;
-        }
-        
-        .article-item {
-            padding: 15px 0;
-            border-bottom: 1px solid var(--border-color);
-        }
-        
-        .article-item:last-child {
-            border-bottom: none;
-        }
-        
-        .article-title {
-            font-size: 1.1em;
-            font-weight: 500;
-            margin-bottom: 5px;
-            color: var(--text-color);
-        }
-        
-        .article-title a {
-            color: inherit;
-            text-decoration: none;
-            transition: color 0.3s ease;
-        }
-        
-        .article-title a:hover {
-            color: var(--secondary-color);
-        }
-        
-        .article-meta {
-            font-size: 0.9em;
-            color: var(--text-color);
-            opacity: 0.7;
-        }
-        
-        .footer {
-            text-align: center;
-            margin-top: 50px;
-            padding-top: 20px;
-            border-top: 1px solid var(--border-color);
-            color: var(--text-color);
-            opacity: 0.7;
-            font-size: 0.9em;
-        }
-        
-        .toc {
-            position: fixed;
-            top: 20px;
-            right: 20px;
-            background: var(--background-color);
-            border: 1px solid var(--border-color);
-            border-radius: 10px;
-            padding: 20px;
-            max-width: 250px;
-            display: none;
-        }
-        
-        .toc h3 {
-            margin-bottom: 10px;
-            color: var(--primary-color);
-        }
-        
-        .toc ul {
-            list-style: none;
-        }
-        
-        .toc li {
-            margin-bottom: 5px;
-        }
-        
-        .toc a {
-            color: var(--text-color);
-            text-decoration: none;
-            transition: color 0.3s ease;
-        }
-        
-        .toc a:hover {
-            color: var(--secondary-color);
-        }
-        
-        @media (max-width: 768px) {
-            .container {
-                padding: 15px;
-            }
-            
-            .header h1 {
-                font-size: 2em;
-            }
-            
-            .summary-section {
-                padding: 20px;
-            }
-            
-            .journal-header {
-                flex-direction: column;
-                align-items: flex-start;
-            }
-            
-            .article-count {
-                margin-top: 10px;
-            }
-            
-            .toc {
-                display: none !important;
-            }
-        }
-        
-        .highlight {
-            background: linear-gradient(120deg, #a8edea 0%, #fed6e3 100%);
-            padding: 2px 5px;
-            border-radius: 3px;
-        }
-        
-        .back-to-top {
-            position: fixed;
-            bottom: 20px;
-            right: 20px;
-            background: var(--secondary-color);
-            color: white;
-            width: 50px;
-            height: 50px;
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            text-decoration: none;
-            font-size: 1.5em;
-            opacity: 0;
-            transition: opacity 0.3s ease;
-            cursor: pointer;
-        }
-        
-        .back-to-top.visible {
-            opacity: 1;
-        }
-    </style>
-</head>
-<body>
-    <a href="#" class="back-to-top" id="backToTop">↑</a>
-    
-    <div class="container">
-        <div class="header">
-            <h1>📚 学术期刊日报</h1>
-            <div class="date">{{ current_date }}</div>
-            <div class="stats">
-                覆盖 {{ journal_count }} 种期刊，共 {{ total_articles }} 篇文章
-                <br>时间范围：{{ start_date }} 至 {{ end_date }}
-            </div>
-        </div>
-        
-        <section class="summary-section">
-            <h2>🎯 今日导览摘要</h2>
-            <div class="summary-content">
-                {{ summary | replace('\\n', '<br>') }}
-            </div>
-        </section>
-        
-        <section class="journals-section">
-            <h2>📖 期刊文章详情</h2>
-            
-            {% for journal_name, journal_articles in journals.items() %}
-            <div class="journal-card" id="journal-{{ loop.index }}">
-                <div class="journal-header">
-                    <h3 class="journal-name">{{ journal_name }}</h3>
-                    <span class="article-count">{{ journal_articles|length }} 篇文章</span>
-                </div>
-                <ul class="articles-list">
-                    {% for article in journal_articles %}
-                    <li class="article-item">
-                        <div class="article-title">
-                            <a href="{{ article.link }}" target="_blank" rel="noopener">
-                                {{ article.title }}
-                            </a>
-                        </div>
-                        <div class="article-meta">
-                            发布日期：{{ article.date }} 
-                            {% if article.abstract %}
-                            • 摘要：{{ article.abstract }}
-                            {% endif %}
-                        </div>
-                    </li>
-                    {% endfor %}
-                </ul>
-            </div>
-            {% endfor %}
-        </section>
-        
-        <footer class="footer">
-            <p>生成时间：{{ current_date }} {{ now().strftime('%H:%M:%S') }}</p>
-            <p>本日报由AutoDLD系统自动生成，数据来源于各学术期刊官方网站</p>
-        </footer>
-    </div>
-
-    <script>
-        // 返回顶部功能
-        const backToTop = document.getElementById('backToTop');
-        
-        window.addEventListener('scroll', () => {
-            if (window.pageYOffset > 300) {
-                backToTop.classList.add('visible');
-            } else {
-                backToTop.classList.remove('visible');
-            }
-        });
-        
-        backToTop.addEventListener('click', (e) => {
-            e.preventDefault();
-            window.scrollTo({
-                top: 0,
-                behavior: 'smooth'
-            });
-        });
-        
-        // 暗色模式支持
-        function updateColorScheme() {
-            const isDark = window.matchMedia('(prefers-color-scheme: dark)').matches;
-            document.body.classList.toggle('dark-mode', isDark);
-        }
-        
-        window.matchMedia('(prefers-color-scheme: dark)').addEventListener('change', updateColorScheme);
-        updateColorScheme();
-        
-        // 平滑滚动
-        document.querySelectorAll('a[href^="#"]').forEach(anchor => {
-            anchor.addEventListener('click', function (e) {
-                e.preventDefault();
-                const target = document.querySelector(this.getAttribute('href'));
-                if (target) {
-                    target.scrollIntoView({
-                        behavior: 'smooth',
-                        block: 'start'
-                    });
-                }
-            });
-        });
-    </script>
-</body>
-</html>
-        """
-        
-        # 添加当前时间函数到模板上下文
-        from datetime import datetime as dt
-        data['now'] = dt.now
-        
-        template = Template(template_str)
+        template = get_template_env().get_template('report.html')
         return template.render(**data)
     
     def save_html_file(self, html_content):
         """保存HTML文件"""
-        current_date = datetime.now().strftime('%Y%m%d')
+        current_date = current_day().strftime('%Y%m%d')
         filename = f"daily_report_{current_date}.html"
         filepath = os.path.join(self.config.PATHS['base_dir'], filename)
         
@@ -497,75 +208,55 @@ class HTMLGenerator:
         
         return filepath
     
-    def generate_email_html(self, articles, summary):
-        """生成邮件专用的HTML内容（简化版）"""
-        current_date = datetime.now().strftime('%Y年%m月%d日')
-        start_date, end_date = self.config.get_date_range()
+    def render_article_fragments(self, articles):
+        """预渲染每篇文章的邮件片段，多个订阅者视图之间共享"""
+        template = get_template_env().get_template('partials/email_article.html')
+        return [Markup(template.render(article=article)) for article in articles]
+    
+    def generate_email_html(self, articles, summary, language='zh', fragments=None, missing_sources=None):
+        """生成邮件专用的HTML内容
+        
+        输出单个使用内联样式并压缩空白的HTML文档。超过
+        EMAIL_CONFIG['max_html_bytes'] 时改为只含摘要、期刊统计和完整日报
+        链接的精简版，避免邮件客户端截断。fragments 为与 articles 一一
+        对应的预渲染文章片段，未提供时现场渲染。missing_sources 为本次
+        未能完整获取的来源，在摘要下方注明。
+        """
+        labels = EMAIL_LABELS.get(language, EMAIL_LABELS['zh'])
+        current_date = current_day().strftime(labels['date_format'])
+        email_config = self.config.EMAIL_CONFIG
         
-        # 按期刊分组文章
+        if fragments is None:
+            fragments = self.render_article_fragments(articles)
+        
+        # 按期刊分组文章片段
         journals = {}
-        for article in articles:
+        for article, fragment in zip(articles, fragments):
             journal_name = article['journal']
             if journal_name not in journals:
                 journals[journal_name] = []
-            journals[journal_name].append(article)
+            journals[journal_name].append(fragment)
         
-        email_template = """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>学术期刊日报 - {{ current_date }}</title>
-    <style>
-        body { font-family: -apple-system, BlinkMacSystemFont, sans-serif; line-height: 1.6; margin: 0; padding: 20px; }
-        .header { text-align: center; margin-bottom: 30px; }
-        .header h1 { color: #2c3e50; margin-bottom: 10px; }
-        .summary { background: #f8f9fa; padding: 20px; border-radius: 10px; margin-bottom: 30px; }
-        .journal { margin-bottom: 20px; border-left: 4px solid #3498db; padding-left: 15px; }
-        .journal h3 { color: #2c3e50; margin-bottom: 10px; }
-        .article { margin-bottom: 10px; }
-        .article a { color: #2980b9; text-decoration: none; }
-        .footer { text-align: center; margin-top: 30px; color: #7f8c8d; font-size: 0.9em; }
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>学术期刊日报</h1>
-        <p>{{ current_date }} | {{ journals|length }}种期刊，{{ articles|length }}篇文章</p>
-    </div>
-    
-    <div class="summary">
-        <h2>今日摘要</h2>
-        <p>{{ summary | replace('\\n', '<br>') }}</p>
-    </div>
-    
-    {% for journal_name, journal_articles in journals.items() %}
-    <div class="journal">
-        <h3>{{ journal_name }} ({{ journal_articles|length }}篇)</h3>
-        {% for article in journal_articles %}
-        <div class="article">
-            • <a href="{{ article.link }}">{{ article.title }}</a>
-        </div>
-        {% endfor %}
-    </div>
-    {% endfor %}
-    
-    <div class="footer">
-        <p>生成时间：{{ current_date }} | AutoDLD系统自动生成</p>
-    </div>
-</body>
-</html>
-        """
+        template = get_template_env().get_template('email.html')
+        context = {
+            't': labels,
+            'current_date': current_date,
+            'journals': journals,
+            'article_count': len(articles),
+            'summary': summary,
+            'report_url': email_config.get('report_url', ''),
+            'missing_sources': missing_sources or {},
+            'condensed': False
+        }
+        html = minify_html(template.render(**context))
+        
+        max_bytes = email_config.get('max_html_bytes', 0)
+        if max_bytes and len(html.encode('utf-8')) > max_bytes:
+            self.logger.info(f"邮件HTML超过 {max_bytes} 字节，改用精简版")
+            context['condensed'] = True
+            html = minify_html(template.render(**context))
         
-        from jinja2 import Template
-        template = Template(email_template)
-        return template.render(
-            current_date=current_date,
-            journals=journals,
-            articles=articles,
-            summary=summary
-        )
+        return html
 
 if __name__ == "__main__":
     # 测试HTML生成器
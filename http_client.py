@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from config import Config
+from log_config import configure_logging
+from circuit_breaker import CircuitBreakers, CircuitOpenError
+from run_deadline import DeadlineExceeded
+
+_client = None
+_client_lock = threading.Lock()
+
+# 本地能够解压的压缩格式（安装 brotli/zstandard 后会包含 br/zstd）
+SUPPORTED_ENCODINGS = set(ACCEPT_ENCODING.split(','))
+
+
+class ResponseTooLarge(requests.RequestException):
+    """响应正文超过该来源的字节上限"""
+
+
+class HttpClient:
+    """所有模块共用的HTTP客户端
+
+    基于连接池化的 requests.Session，同一主机的请求复用TCP/TLS连接；
+    常驻进程中连接在多次运行之间保持可用。每个主机有一个熔断器，
+    故障主机在本次运行中被快速跳过（抛出 CircuitOpenError）。
+    响应正文以流的方式读取，超过来源的字节上限时中止；每次运行按主机
+    统计传输（压缩）字节数和解压后字节数。
+
+    circuit_state_file 指定熔断状态文件；后台预取使用单独的客户端和
+    状态文件，与日报运行互不干扰。
+    """
+
+    def __init__(self, circuit_state_file=None):
+        self.config = Config()
+        self.setup_logging()
+
+        http_config = self.config.HTTP_CONFIG
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=http_config['pool_connections'],
+                              pool_maxsize=http_config['pool_maxsize'])
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': self.config.CRAWL_CONFIG['user_agent'],
+            'Accept-Encoding': ACCEPT_ENCODING
+        })
+        self.breakers = CircuitBreakers(circuit_state_file)
+        self.cassette = None
+        self.traffic = {}
+        self.traffic_lock = threading.Lock()
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def request(self, method, url, source=None, allow_truncated=False, deadline=None, **kwargs):
+        """发送请求（未指定超时时使用 CRAWL_CONFIG['timeout']）
+
+        source 为数据来源（arxiv、pubmed、crossref、journal、deepseek 等），
+        决定正文的字节上限（BYTES_CONFIG['caps']）。超过上限时抛出
+        ResponseTooLarge；allow_truncated 为True时（如HTML列表页，所需内容
+        在页面前部）改为提前结束下载，返回已读取的部分。
+
+        熔断器打开（或半开且试探请求尚未结束）的主机直接抛出 CircuitOpenError；
+        连接错误、超时和5xx响应计为该主机的失败。传入运行截止时间 deadline
+        时超时压缩到剩余预算内（预算用完时抛出 DeadlineExceeded），因压缩而
+        超时不计为主机的失败。
+        使用回放记录时直接返回录制的响应，不访问网络。
+        """
+        if self.cassette is not None:
+            prepared = self.session.prepare_request(requests.Request(
+                method, url, params=kwargs.get('params'), data=kwargs.get('data'),
+                json=kwargs.get('json'), headers=kwargs.get('headers')))
+            if self.cassette.replaying:
+                return self.cassette.replay(prepared)
+
+        host = urlsplit(url).hostname or ''
+        if not self.breakers.allow(host):
+            raise CircuitOpenError(host)
+
+        try:
+            timeout = kwargs.get('timeout') or self.config.CRAWL_CONFIG['timeout']
+            kwargs['timeout'] = deadline.timeout(timeout) if deadline is not None else timeout
+            kwargs['headers'] = self.negotiate_encoding(kwargs.get('headers'))
+            kwargs['stream'] = True
+            try:
+                response = self.session.request(method, url, **kwargs)
+                try:
+                    self.read_body(response, host, source, allow_truncated, deadline)
+                finally:
+                    response.close()
+            except DeadlineExceeded:
+                raise
+            except requests.Timeout:
+                if kwargs['timeout'] >= timeout:
+                    self.breakers.record_failure(host, timeout=True)
+                raise
+            except requests.ConnectionError:
+                self.breakers.record_failure(host)
+                raise
+
+            if response.status_code >= 500:
+                self.breakers.record_failure(host)
+            else:
+                self.breakers.record_success(host)
+            if self.cassette is not None:
+                self.cassette.record(prepared, response)
+            return response
+        finally:
+            self.breakers.release(host)
+
+    def negotiate_encoding(self, headers):
+        """请求头中的 Accept-Encoding 只保留本地能解压的格式"""
+        if not headers or 'Accept-Encoding' not in headers:
+            return headers
+        headers = dict(headers)
+        accepted = [encoding.strip() for encoding in headers['Accept-Encoding'].split(',')
+                    if encoding.strip().split(';')[0] in SUPPORTED_ENCODINGS]
+        headers['Accept-Encoding'] = ', '.join(accepted) or 'identity'
+        return headers
+
+    def read_body(self, response, host, source, allow_truncated, deadline=None):
+        """按块读取正文（受字节上限约束），并计入按主机的流量统计"""
+        caps = self.config.BYTES_CONFIG['caps']
+        cap = caps.get(source, caps['default'])
+
+        chunks = []
+        size = 0
+        truncated = False
+        for chunk in response.iter_content(self.config.BYTES_CONFIG['chunk_size']):
+            if cap and size + len(chunk) > cap:
+                if not allow_truncated:
+                    raise ResponseTooLarge(f"{host} 的响应超过 {cap} 字节上限（来源 {source or 'default'}）")
+                chunks.append(chunk[:cap - size])
+                size = cap
+                truncated = True
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(f"下载 {host} 的响应时时间预算用完")
+
+        response._content = b''.join(chunks)
+        response._content_consumed = True
+        response.truncated = truncated
+        if truncated:
+            self.logger.info(f"{host} 的响应达到 {cap} 字节上限，提前结束下载")
+
+        # 传输字节数取自底层连接（压缩数据），未压缩时与正文大小相同
+        encoding = response.headers.get('Content-Encoding', '').strip().lower()
+        transferred = getattr(response.raw, 'tell', lambda: size)() or size
+        with self.traffic_lock:
+            entry = self.traffic.setdefault(host, {'requests': 0, 'transferred': 0, 'decoded': 0,
+                                                   'uncompressed': 0, 'truncated': 0})
+            entry['requests'] += 1
+            entry['transferred'] += transferred
+            entry['decoded'] += size
+            entry['truncated'] += truncated
+            if encoding in ('', 'identity') and size >= self.config.BYTES_CONFIG['compress_warn_bytes']:
+                entry['uncompressed'] += 1
+
+    def traffic_report(self):
+        """本次运行按主机的流量统计 {host: {'requests', 'transferred', 'decoded', 'uncompressed', 'truncated'}}"""
+        with self.traffic_lock:
+            return {host: dict(entry) for host, entry in self.traffic.items()}
+
+    def get(self, url, **kwargs):
+        """GET请求"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """POST请求"""
+        return self.request('POST', url, **kwargs)
+
+    def pause(self, seconds):
+        """请求之间的礼貌性等待（回放时跳过）"""
+        if self.cassette is None or not self.cassette.replaying:
+            time.sleep(seconds)
+
+    def use_cassette(self, cassette):
+        """录制或回放之后的所有请求（None 恢复正常访问）"""
+        self.cassette = cassette
+
+    def begin_run(self):
+        """新一次运行开始（打开的熔断器转为半开试探，清零流量统计）"""
+        self.breakers.begin_run()
+        with self.traffic_lock:
+            self.traffic = {}
+
+    def skipped_hosts(self):
+        """本次运行中因熔断被跳过的主机"""
+        return self.breakers.skipped_hosts()
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
+
+
+def get_http_client():
+    """获取进程内共享的HTTP客户端"""
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+    return _client
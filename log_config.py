@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import gzip
+import json
+import shutil
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import (QueueHandler, QueueListener,
+                              RotatingFileHandler, TimedRotatingFileHandler)
+from config import Config
+
+_lock = threading.Lock()
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """结构化（JSON行）日志格式"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName,
+            'process': record.process
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _gzip_namer(name):
+    """轮转文件名追加.gz后缀"""
+    return name + '.gz'
+
+
+def _gzip_rotator(source, dest):
+    """轮转时压缩旧日志文件"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _create_file_handler(log_config, logs_dir):
+    """根据配置创建带轮转的文件处理器"""
+    filepath = os.path.join(logs_dir, log_config['file'])
+    if log_config['rotation'] == 'time':
+        handler = TimedRotatingFileHandler(
+            filepath,
+            when=log_config['when'],
+            backupCount=log_config['backup_count'],
+            encoding='utf-8'
+        )
+    else:
+        handler = RotatingFileHandler(
+            filepath,
+            maxBytes=log_config['max_bytes'],
+            backupCount=log_config['backup_count'],
+            encoding='utf-8'
+        )
+
+    if log_config['compress']:
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+
+    if log_config['json']:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(log_config['format']))
+    return handler
+
+
+def configure_logging():
+    """配置全局日志系统（进程内仅首次调用生效）
+
+    所有模块的日志记录先写入内存队列，由后台监听线程统一写入
+    带轮转和压缩的文件以及控制台，调用方不会阻塞在磁盘I/O上。
+    """
+    global _listener
+
+    with _lock:
+        if _listener is not None:
+            return
+
+        log_config = Config.LOG_CONFIG
+        logs_dir = Config.PATHS['logs_dir']
+        os.makedirs(logs_dir, exist_ok=True)
+
+        file_handler = _create_file_handler(log_config, logs_dir)
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(log_config['format']))
+
+        log_queue = queue.Queue(-1)
+        _listener = QueueListener(log_queue, file_handler, console_handler,
+                                  respect_handler_level=True)
+        _listener.start()
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(QueueHandler(log_queue))
+        root.setLevel(log_config['level'])
+
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """停止后台监听线程并刷新队列中剩余的日志"""
+    global _listener
+
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
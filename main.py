@@ -3,19 +3,33 @@
 
 import os
 import sys
+import atexit
 import logging
 import webbrowser
 from datetime import datetime
 from config import Config
+from log_config import configure_logging
 from api_crawler import APICrawler
+from http_client import HttpClient
 from summarizer import DeepSeekSummarizer
 from html_generator import HTMLGenerator
 from email_sender import EmailSender
+from subscribers import SubscriberRegistry
+from archive import ArchiveBuilder
+from article_store import ArticleStore
+from prefetch import Prefetcher
+from clustering import ThemeClusterer
+from run_lock import RunLock
+from date_utils import current_day
+from run_deadline import start_deadline
+from profiler import StageProfiler
+from export import Exporter
+from atom_feed import AtomFeedPublisher
 
 class AutoDLD:
     """学术期刊日报系统主类"""
     
-    def __init__(self):
+    def __init__(self, profile=False):
         self.config = Config()
         self.setup_logging()
         self.config.ensure_directories()
@@ -25,53 +39,79 @@ class AutoDLD:
         self.summarizer = DeepSeekSummarizer()
         self.html_generator = HTMLGenerator()
         self.email_sender = EmailSender()
+        self.subscribers = SubscriberRegistry()
+        self.archive = ArchiveBuilder()
+        self.store = ArticleStore()
+        # 后台预取使用独立的HTTP客户端和爬取器，不与日报运行共享状态
+        prefetch_http = HttpClient(self.config.PREFETCH_CONFIG['circuit_state_file'])
+        self.prefetcher = Prefetcher(APICrawler(prefetch_http), DeepSeekSummarizer(prefetch_http), self.store)
+        self.clusterer = ThemeClusterer()
+        self.profiler = StageProfiler(enabled=profile)
+        self.exporter = Exporter(self.store)
+        self.feed_publisher = AtomFeedPublisher()
+        self.deadline = None  # 本次运行的截止时间，显式传给抓取、预取和摘要
     
     def setup_logging(self):
         """设置日志"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f"{self.config.PATHS['logs_dir']}/main.log"),
-                logging.StreamHandler()
-            ]
-        )
+        configure_logging()
         self.logger = logging.getLogger(__name__)
     
-    def run_daily_report(self, send_email=True, open_browser=True):
-        """运行日报生成流程"""
+    def close(self):
+        """释放文章库连接、预取HTTP客户端和复用的SMTP连接（常驻进程重建实例前调用）"""
+        for resource in (self.store, self.prefetcher.crawler.http, self.email_sender):
+            try:
+                resource.close()
+            except Exception as e:
+                self.logger.warning(f"释放资源失败: {str(e)}")
+    
+    def run_daily_report(self, send_email=True, open_browser=True, deliver_by=None):
+        """运行日报生成流程（deliver_by 为 'HH:MM' 交付时间，默认见 DEADLINE_CONFIG）"""
         try:
             self.logger.info("开始生成学术期刊日报")
             start_time = datetime.now()
+            self.begin_run(deliver_by)
             
             # 1. 爬取期刊文章
             self.logger.info("步骤1: 爬取期刊文章")
-            articles = self.crawler.crawl_journals()
+            articles = self.collect_articles()
             
             if not articles:
                 self.logger.warning("未找到任何文章，日报生成终止")
                 return False
             
+            self.store.ingest_articles(articles)
             self.logger.info(f"爬取到 {len(articles)} 篇文章")
             
             # 2. 生成摘要
             self.logger.info("步骤2: 生成摘要")
-            summary = self.summarizer.generate_summary(articles)
+            self.enter_stage('summary')
+            themes = self.cluster_articles(articles)
+            summary = self.summarizer.generate_summary(articles, themes=themes, deadline=self.deadline)
             self.logger.info(f"摘要生成完成，长度: {len(summary)} 字符")
+            self.store.save_daily_report(current_day().isoformat(), summary, articles)
             
             # 3. 生成HTML页面
             self.logger.info("步骤3: 生成HTML页面")
-            html_content, html_filepath = self.html_generator.generate_daily_report(articles, summary)
+            self.enter_stage('render')
+            missing_sources = self.crawler.skipped_sources
+            html_content, html_filepath = self.html_generator.generate_daily_report(
+                articles, summary, themes, missing_sources=missing_sources)
             self.logger.info(f"HTML页面生成完成: {html_filepath}")
+            self.publish_archive(articles, summary)
+            self.export_run(articles, summary)
             
             # 4. 发送邮件
             if send_email:
                 self.logger.info("步骤4: 发送邮件")
-                email_success = self.email_sender.send_daily_report(html_content, len(articles))
+                self.enter_stage('deliver')
+                email_html = self.html_generator.generate_email_html(
+                    articles, summary, missing_sources=missing_sources)
+                email_success = self.email_sender.send_daily_report(email_html, len(articles))
                 if email_success:
                     self.logger.info("邮件发送成功")
                 else:
                     self.logger.warning("邮件发送失败")
+                self.email_sender.close()
             
             # 5. 打开浏览器预览
             if open_browser:
@@ -92,6 +132,169 @@ class AutoDLD:
         except Exception as e:
             self.logger.error(f"日报生成过程中出错: {str(e)}")
             return False
+        finally:
+            self.end_run()
+    
+    def run_fanout_report(self, open_browser=False, deliver_by=None):
+        """多订阅者分发：爬取和摘要只做一次，按订阅者过滤后分别渲染发送"""
+        try:
+            self.logger.info("开始生成多订阅者日报")
+            start_time = datetime.now()
+            self.begin_run(deliver_by)
+            
+            subscribers = self.subscribers.get_subscribers()
+            if not subscribers:
+                self.logger.warning("没有可用的订阅者，分发终止")
+                return False
+            
+            # 1. 爬取所有订阅者所需文章的并集（只爬取一次）
+            self.logger.info("步骤1: 爬取期刊文章")
+            articles = self.collect_articles()
+            
+            if not articles:
+                self.logger.warning("未找到任何文章，日报生成终止")
+                return False
+            
+            self.store.ingest_articles(articles)
+            self.logger.info(f"爬取到 {len(articles)} 篇文章，订阅者 {len(subscribers)} 位")
+            
+            # 2. 每种语言只生成一次整体摘要
+            self.logger.info("步骤2: 生成摘要")
+            self.enter_stage('summary')
+            themes = self.cluster_articles(articles)
+            summaries = {}
+            for language in self.subscribers.get_languages(subscribers):
+                summaries[language] = self.summarizer.generate_summary(articles, language, themes, self.deadline)
+            
+            # 3. 生成完整网页版日报，并预渲染所有订阅者共享的文章片段
+            self.logger.info("步骤3: 生成HTML页面")
+            self.enter_stage('render')
+            missing_sources = self.crawler.skipped_sources
+            summary = summaries.get('zh') or next(iter(summaries.values()))
+            self.store.save_daily_report(current_day().isoformat(), summary, articles)
+            html_content, html_filepath = self.html_generator.generate_daily_report(
+                articles, summary, themes, missing_sources=missing_sources)
+            fragments = self.html_generator.render_article_fragments(articles)
+            self.publish_archive(articles, summary)
+            self.export_run(articles, summary)
+            
+            # 4. 按订阅者组装视图，通过连接池批量发送
+            self.logger.info("步骤4: 按订阅者发送邮件")
+            self.enter_stage('deliver')
+            if not self.email_sender.validate_email_config(require_receiver=False):
+                self.logger.error("邮箱配置不完整，无法发送邮件")
+                return False
+            messages = []
+            for subscriber in subscribers:
+                indexes = self.subscribers.select_articles(subscriber, articles)
+                if not indexes:
+                    self.logger.info(f"订阅者 {subscriber['name']} 今日无匹配文章，跳过")
+                    continue
+                
+                email_html = self.html_generator.generate_email_html(
+                    [articles[i] for i in indexes],
+                    summaries[subscriber['language']],
+                    language=subscriber['language'],
+                    fragments=[fragments[i] for i in indexes],
+                    missing_sources=missing_sources
+                )
+                messages.append(self.email_sender.create_email_message(
+                    email_html, len(indexes), subscriber['email'], subscriber['language']))
+            
+            results = self.email_sender.send_bulk(messages)
+            sent_count = sum(1 for result in results if result['success'])
+            
+            if open_browser:
+                webbrowser.open(f'file://{html_filepath}')
+            
+            execution_time = (datetime.now() - start_time).total_seconds()
+            self.logger.info(f"多订阅者日报完成，成功发送 {sent_count}/{len(subscribers)} 封，总耗时: {execution_time:.2f} 秒")
+            
+            self.print_summary(articles, summary, html_filepath, execution_time)
+            
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"多订阅者日报生成过程中出错: {str(e)}")
+            return False
+        finally:
+            self.end_run()
+    
+    def begin_run(self, deliver_by=None):
+        """设置本次运行的截止时间并进入抓取阶段"""
+        self.deadline = start_deadline(deliver_by)
+        if self.deadline is not None:
+            self.logger.info(f"本次运行须在 {self.deadline.deliver_at.strftime('%H:%M:%S')} 前交付")
+        self.enter_stage('collect')
+    
+    def enter_stage(self, name):
+        """进入下一阶段：调整截止时间为后续阶段预留的时间，启用剖析时切换阶段"""
+        if self.deadline is not None:
+            self.deadline.stage(name)
+        self.profiler.switch(name)
+    
+    def end_run(self):
+        """运行结束：清除截止时间，记录流量统计，启用剖析时写出报告"""
+        self.deadline = None
+        traffic = self.crawler.http.traffic_report()
+        if traffic:
+            self.logger.info("本次流量（传输/解压后）: " + ', '.join(
+                f"{host} {entry['transferred'] / 1024:.0f}/{entry['decoded'] / 1024:.0f} KB"
+                for host, entry in sorted(traffic.items(), key=lambda item: -item[1]['transferred'])))
+        self.profiler.finish()
+    
+    def collect_articles(self):
+        """获取本次日报的文章：有后台预取数据时直接读库，否则现场爬取
+
+        录制或回放HTTP请求时总是现场爬取，保证请求序列完整、可重现。
+        """
+        self.crawler.begin_run()
+        if (self.config.PREFETCH_CONFIG['enabled'] and self.crawler.http.cassette is None
+                and self.prefetcher.has_fresh_data()):
+            articles = self.prefetcher.collect_articles(self.deadline, self.crawler)
+        else:
+            articles = self.crawler.crawl_journals(self.deadline)
+        
+        if self.crawler.skipped_sources:
+            self.logger.warning("本次未能完整获取的来源: " + ', '.join(
+                f"{source}（{reason}）" for source, reason in self.crawler.skipped_sources.items()))
+        return articles
+    
+    def cluster_articles(self, articles):
+        """按主题聚类当日文章（未启用或失败时返回空列表，日报只按期刊分组）"""
+        if not self.config.CLUSTER_CONFIG['enabled']:
+            return []
+        try:
+            return self.clusterer.cluster(articles)
+        except Exception as e:
+            self.logger.warning(f"主题聚类失败: {str(e)}")
+            return []
+    
+    def publish_archive(self, articles, summary):
+        """将当天日报登记到归档，增量更新归档站点和 Atom 订阅源（失败不影响日报）"""
+        if not self.config.ARCHIVE_CONFIG['enabled']:
+            return
+        date = current_day().isoformat()
+        try:
+            self.archive.add_day(date, articles, summary)
+            self.archive.build()
+        except Exception as e:
+            self.logger.warning(f"更新归档站点失败: {str(e)}")
+        
+        if self.config.ATOM_CONFIG['enabled']:
+            try:
+                self.feed_publisher.publish(date, articles, summary)
+            except Exception as e:
+                self.logger.warning(f"更新 Atom 订阅源失败: {str(e)}")
+    
+    def export_run(self, articles, summary):
+        """把当天的文章和整体摘要导出为机器可读文件（失败不影响日报）"""
+        if not self.config.EXPORT_CONFIG['enabled']:
+            return
+        try:
+            self.exporter.export_run(current_day().isoformat(), summary, articles)
+        except Exception as e:
+            self.logger.warning(f"导出文章失败: {str(e)}")
     
     def print_summary(self, articles, summary, html_filepath, execution_time):
         """打印结果摘要"""
@@ -109,6 +312,21 @@ class AutoDLD:
         print(f"   文章总数: {len(articles)}")
         print(f"   期刊数量: {len(journals)}")
         print(f"   执行时间: {execution_time:.2f} 秒")
+        if self.crawler.skipped_sources:
+            print(f"   缺失来源: " + ', '.join(
+                f"{source}（{reason}）" for source, reason in self.crawler.skipped_sources.items()))
+        
+        traffic = self.crawler.http.traffic_report()
+        if traffic:
+            print(f"\n🌐 网络流量（传输 / 解压后）:")
+            for host, entry in sorted(traffic.items(), key=lambda item: -item[1]['transferred']):
+                notes = []
+                if entry['uncompressed']:
+                    notes.append(f"{entry['uncompressed']} 个响应未压缩")
+                if entry['truncated']:
+                    notes.append(f"{entry['truncated']} 个响应达到上限被截断")
+                print(f"   • {host}: {entry['requests']} 次请求，{entry['transferred'] / 1024:.0f} KB / "
+                      f"{entry['decoded'] / 1024:.0f} KB" + (f"（{'，'.join(notes)}）" if notes else ''))
         
         print(f"\n📖 期刊分布:")
         for journal, count in sorted(journals.items(), key=lambda x: x[1], reverse=True):
@@ -153,6 +371,15 @@ class AutoDLD:
             html_content, filename = self.html_generator.generate_daily_report(test_articles, test_summary)
             print("✅ HTML生成测试通过")
             
+            # 用保存的页面样本校验期刊解析规则
+            from parsers import validate_parsers
+            failed = [(journal_type, message) for journal_type, ok, message in validate_parsers() if not ok]
+            if failed:
+                for journal_type, message in failed:
+                    print(f"⚠️ 解析规则校验 {journal_type}: {message}")
+            else:
+                print("✅ 解析规则校验通过")
+            
             # 测试邮件发送（仅测试连接）
             success, message = self.email_sender.test_email_connection()
             if success:
@@ -167,6 +394,102 @@ class AutoDLD:
             self.logger.error(f"系统测试失败: {str(e)}")
             return False
 
+def run_search(args):
+    """命令行全文检索"""
+    import time
+    from article_store import ArticleStore
+    
+    store = ArticleStore()
+    start = time.perf_counter()
+    results = store.search(' '.join(args.query), since=args.since, until=args.until,
+                           journal=args.journal, source=args.source, limit=args.limit)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    for i, result in enumerate(results, 1):
+        print(f"{i}. {result['title']}")
+        print(f"   {result['date']} | {result['journal']} | {result['source']}")
+        print(f"   {result['link']}")
+        if result['snippet']:
+            print(f"   {result['snippet']}")
+    print(f"\n共 {len(results)} 条结果，耗时 {elapsed_ms:.1f} 毫秒（库中共 {store.count_articles()} 篇文章）")
+
+def deliver_time(value):
+    """解析 --deliver-by：24小时制的 HH:MM"""
+    import argparse
+    
+    try:
+        datetime.strptime(value, '%H:%M')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"交付时间格式应为 HH:MM（24小时制）: {value}")
+    return value
+
+def export_formats(value):
+    """解析 --formats：逗号分隔，只允许 ndjson、csv、parquet"""
+    import argparse
+    from export import EXPORT_FORMATS
+    
+    formats = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in formats if name not in EXPORT_FORMATS]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(
+            f"不支持的导出格式: {', '.join(unknown) or value}（可选 {', '.join(EXPORT_FORMATS)}）")
+    return formats
+
+def run_export(args):
+    """命令行导出历史文章和每日摘要"""
+    import time
+    from article_store import ArticleStore
+    from export import Exporter
+    
+    start = time.perf_counter()
+    directory, article_count, digest_count = Exporter(ArticleStore()).export_history(
+        since=args.since, until=args.until, directory=args.output, formats=args.formats)
+    print(f"已导出 {article_count} 篇文章、{digest_count} 份每日摘要到 {directory}"
+          f"（耗时 {time.perf_counter() - start:.1f} 秒）")
+
+def run_rollup(args):
+    """命令行生成周报/月报（只读取已保存的日报，最多调用一次模型）"""
+    import time
+    from rollup import RollupBuilder
+    from summarizer import DeepSeekSummarizer
+    
+    day = datetime.strptime(args.date, '%Y-%m-%d').date() if args.date else None
+    start = time.perf_counter()
+    builder = RollupBuilder(summarizer=DeepSeekSummarizer())
+    rollup = builder.build(args.period, day, use_llm=not args.no_llm)
+    filepath = builder.render(rollup)
+    print(f"{rollup['title']}（{rollup['start_date']} 至 {rollup['end_date']}）已生成: {filepath}"
+          f"（{len(rollup['digests'])} 份日报，耗时 {time.perf_counter() - start:.1f} 秒）")
+    if not args.no_browser:
+        webbrowser.open(f'file://{os.path.abspath(filepath)}')
+
+def setup_cassette(args):
+    """按 --record/--replay 为共享HTTP客户端挂上录制或回放记录"""
+    import shutil
+    from cassette import Cassette
+    from http_client import get_http_client
+    from date_utils import set_today
+    
+    if args.record:
+        cassette = Cassette(args.record, 'record')
+        atexit.register(cassette.close)
+    else:
+        cassette = Cassette(args.replay, 'replay')
+        # 文章库、状态文件、归档、订阅源、导出和日报都写到回放目录下的
+        # 临时目录（每次回放前清空），不污染正式的历史数据
+        scratch_dir = os.path.join(args.replay, 'replay_output')
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        os.makedirs(scratch_dir)
+        Config.redirect_outputs(scratch_dir)
+        Config.ensure_directories()
+        # 日期窗口和日报日期固定为录制当天，与录制时的结果一致
+        if cassette.recorded_at is not None:
+            set_today(cassette.recorded_at.date())
+        else:
+            logging.getLogger(__name__).warning("回放记录中没有录制时间，使用当前日期")
+    get_http_client().use_cassette(cassette)
+    return cassette
+
 def main():
     """主函数"""
     import argparse
@@ -176,11 +499,78 @@ def main():
     parser.add_argument('--no-email', action='store_true', help='不发送邮件')
     parser.add_argument('--no-browser', action='store_true', help='不打开浏览器')
     parser.add_argument('--setup-schedule', action='store_true', help='设置定时任务')
+    parser.add_argument('--fanout', action='store_true', help='按订阅者列表分别发送个性化日报')
+    parser.add_argument('--deliver-by', metavar='HH:MM', type=deliver_time, help='本次日报的交付时间，超出预算的来源将被跳过')
+    parser.add_argument('--profile', action='store_true',
+                        help='按阶段剖析本次运行（cProfile + tracemalloc + 调用栈采样），报告写入 logs/')
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument('--record', metavar='DIR', help='把本次所有HTTP请求和响应录制到目录DIR')
+    cassette_group.add_argument('--replay', metavar='DIR', help='从目录DIR回放录制的HTTP响应，不访问网络也不发送邮件')
+    
+    subparsers = parser.add_subparsers(dest='command')
+    
+    search_parser = subparsers.add_parser('search', help='检索历史文章（全文索引）')
+    search_parser.add_argument('query', nargs='+', help='检索词，支持FTS5语法，如 bilingual AND children')
+    search_parser.add_argument('--since', help='起始日期 YYYY-MM-DD')
+    search_parser.add_argument('--until', help='截止日期 YYYY-MM-DD')
+    search_parser.add_argument('--journal', help='期刊名称（部分匹配）')
+    search_parser.add_argument('--source', help='数据来源，如 arxiv、pubmed、crossref')
+    search_parser.add_argument('--limit', type=int, default=20, help='最多返回条数')
+    
+    export_parser = subparsers.add_parser('export', help='把历史文章和每日摘要导出为 NDJSON/CSV/Parquet')
+    export_parser.add_argument('--since', help='起始日期 YYYY-MM-DD（默认全部）')
+    export_parser.add_argument('--until', help='截止日期 YYYY-MM-DD')
+    export_parser.add_argument('--output', metavar='DIR', help='输出目录（默认 exports/history_<起止日期>）')
+    export_parser.add_argument('--formats', type=export_formats, help='逗号分隔的格式，如 ndjson,csv（默认见 EXPORT_CONFIG）')
+    
+    rollup_parser = subparsers.add_parser('rollup', help='由已保存的日报生成周报或月报（不重新抓取）')
+    rollup_parser.add_argument('--period', choices=['week', 'month'], default='week', help='汇总周期')
+    rollup_parser.add_argument('--date', help='周期内的任一日期 YYYY-MM-DD（默认今天）')
+    rollup_parser.add_argument('--no-llm', action='store_true', help='不调用模型，综述只含统计概况')
+    # 默认值不覆盖主命令的 --no-browser，两种写法都有效
+    rollup_parser.add_argument('--no-browser', action='store_true', default=argparse.SUPPRESS,
+                               help='生成后不打开浏览器')
+    
+    subparsers.add_parser('serve', help='以常驻进程运行，按 SCHEDULE_CONFIG 定时生成日报')
+    subparsers.add_parser('prefetch', help='预取一轮到期的来源并生成单篇摘要（可由cron每小时调用）')
     
     args = parser.parse_args()
     
+    if args.command == 'search':
+        run_search(args)
+        return
+    
+    if args.command == 'export':
+        run_export(args)
+        return
+    
+    if args.command == 'rollup':
+        run_rollup(args)
+        return
+    
+    if args.command == 'serve':
+        from daemon import ReportDaemon
+        ReportDaemon().run_forever()
+        return
+    
+    if args.record or args.replay:
+        setup_cassette(args)
+    
     # 创建系统实例
-    system = AutoDLD()
+    system = AutoDLD(profile=args.profile)
+    
+    if args.command == 'prefetch':
+        # 与日报任务互斥：日报运行期间不再并行预取同一批来源
+        lock = RunLock(system.config.SCHEDULE_CONFIG['lock_file'])
+        if not lock.acquire():
+            print("\n⚠️ 已有日报任务正在运行，本次预取跳过")
+            return
+        try:
+            system.prefetcher.run_due()
+        finally:
+            lock.release()
+        print(f"预取完成，库中共 {system.store.count_articles()} 篇文章")
+        return
     
     if args.test:
         # 运行测试
@@ -193,10 +583,23 @@ def main():
     
     else:
         # 运行日报生成
-        send_email = not args.no_email
+        send_email = not args.no_email and not args.replay
         open_browser = not args.no_browser
         
-        success = system.run_daily_report(send_email=send_email, open_browser=open_browser)
+        # 与常驻进程或其他cron任务互斥
+        lock = RunLock(system.config.SCHEDULE_CONFIG['lock_file'])
+        if not lock.acquire():
+            print("\n⚠️ 已有日报任务正在运行，本次跳过")
+            return
+        
+        try:
+            if args.fanout and send_email:
+                success = system.run_fanout_report(open_browser=open_browser, deliver_by=args.deliver_by)
+            else:
+                success = system.run_daily_report(send_email=send_email, open_browser=open_browser,
+                                                  deliver_by=args.deliver_by)
+        finally:
+            lock.release()
         
         if success:
             print("\n🎉 日报生成任务完成！")
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from urllib.parse import urljoin
+import soupsieve
+from bs4 import BeautifulSoup
+from config import Config
+from log_config import configure_logging
+from date_utils import normalize_date
+
+# 各期刊类型的声明式抽取规则
+#   containers: 文章条目的CSS选择器，按顺序尝试，使用第一个有结果的
+#   title:      条目内标题元素的选择器（按顺序尝试）
+#   link:       条目内链接元素的选择器；为空时使用标题本身或其中的链接
+#   date:       条目内日期元素的选择器，优先读取 datetime 属性
+#   date_formats: 常见写法之外需要额外尝试的 strptime 格式
+#   abstract:   条目内摘要元素的选择器
+#   base_url:   相对链接的基准地址，为空时使用期刊的 url
+# 新增出版商只需在此（或 Config.PARSER_SPECS 中）添加一项，并在
+# fixtures/parsers/ 下保存一份页面样本用于校验
+
+PARSER_SPECS = {
+    'nature': {
+        'containers': ['article[class*="article"], article[class*="item"]', 'article.c-card'],
+        'title': ['h1[class*="title"], h1[class*="heading"], h2[class*="title"], h2[class*="heading"], '
+                  'h3[class*="title"], h3[class*="heading"], h4[class*="title"], h4[class*="heading"]'],
+        'link': ['a[href]'],
+        'date': ['time', 'span[class*="date"], span[class*="time"]'],
+        'abstract': ['p[class*="abstract"], p[class*="summary"]']
+    },
+    'sciencedirect': {
+        'containers': ['li[class*="article"], li[class*="item"], li[class*="result"]'],
+        'title': ['h2[class*="title"]', 'a[class*="title"]'],
+        'date': ['[class*="date"]'],
+        'abstract': ['[class*="abstract"]']
+    },
+    'ieee': {
+        'containers': ['div[class*="result"], div[class*="article"], div[class*="item"]'],
+        'title': ['h2', 'a[class*="title"]'],
+        'date': ['[class*="date"]'],
+        'abstract': ['[class*="abstract"]']
+    },
+    'cell': {
+        'containers': ['article', 'div[class*="article"], div[class*="item"]'],
+        'title': ['h2', 'a[class*="title"]'],
+        'date': ['time', '[class*="date"]'],
+        'abstract': ['[class*="abstract"]']
+    },
+    'asha': {
+        'containers': ['div[class*="article"], div[class*="item"], div[class*="listing"]'],
+        'title': ['h3', 'a[class*="title"]'],
+        'date': ['[class*="date"]'],
+        'abstract': ['[class*="abstract"]']
+    },
+    'apa': {
+        'containers': ['div[class*="article"], div[class*="item"], div[class*="issue"]'],
+        'title': ['h3', 'a[class*="title"]'],
+        'date': ['[class*="date"]'],
+        'abstract': ['[class*="abstract"]']
+    },
+    'wiley': {
+        'containers': ['article', 'div[class*="article"], div[class*="item"]'],
+        'title': ['h2', 'a[class*="title"]'],
+        'date': ['time', '[class*="date"]'],
+        'abstract': ['[class*="abstract"]']
+    },
+    'generic': {
+        'containers': ['article', '.article', '.item', '.result', '.listing-item',
+                       '[class*="article"]', '[class*="item"]'],
+        'title': ['h1', 'h2', 'h3', 'a[class*="title"]'],
+        'date': ['time'],
+        'abstract': []
+    }
+}
+
+FIXTURES_DIR = os.path.join('fixtures', 'parsers')
+
+_custom_parsers = {}
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class SpecParser:
+    """由声明式规则编译得到的解析器
+
+    所有CSS选择器在构造时编译一次（soupsieve），所有期刊类型共用同一
+    抽取流程。
+    """
+
+    def __init__(self, journal_type, spec):
+        self.journal_type = journal_type
+        self.spec = spec
+        self.containers = [soupsieve.compile(selector) for selector in spec['containers']]
+        self.title = [soupsieve.compile(selector) for selector in spec['title']]
+        self.link = [soupsieve.compile(selector) for selector in spec.get('link', [])]
+        self.date = [soupsieve.compile(selector) for selector in spec.get('date', [])]
+        self.abstract = [soupsieve.compile(selector) for selector in spec.get('abstract', [])]
+        self.date_formats = tuple(spec.get('date_formats', ()))
+        self.link_pattern = soupsieve.compile('a[href]')
+
+    @staticmethod
+    def first(patterns, element):
+        """按顺序尝试选择器，返回第一个匹配的元素"""
+        for pattern in patterns:
+            found = pattern.select_one(element)
+            if found is not None:
+                return found
+        return None
+
+    def parse(self, soup, journal):
+        """抽取页面中的文章列表"""
+        elements = []
+        for pattern in self.containers:
+            elements = pattern.select(soup)
+            if elements:
+                break
+
+        entries = []
+        for element in elements:
+            title_elem = self.first(self.title, element)
+            if title_elem is not None and title_elem.get_text(strip=True):
+                entries.append((element, title_elem))
+
+        # 选择器可能同时命中列表外层和条目本身，只保留含标题的最内层条目
+        if len(entries) > 1:
+            matched = {id(element) for element, _ in entries}
+            outer = {id(parent) for element, _ in entries for parent in element.parents
+                     if id(parent) in matched}
+            entries = [entry for entry in entries if id(entry[0]) not in outer]
+
+        base_url = self.spec.get('base_url') or journal['url']
+        articles = []
+        for element, title_elem in entries:
+            title = title_elem.get_text(strip=True)
+
+            if self.link:
+                link_elem = self.first(self.link, element)
+            elif title_elem.name == 'a' and title_elem.get('href'):
+                link_elem = title_elem
+            else:
+                link_elem = self.link_pattern.select_one(title_elem) or self.link_pattern.select_one(element)
+            if link_elem is None and self.link:
+                continue
+
+            date_elem = self.first(self.date, element)
+            abstract_elem = self.first(self.abstract, element)
+            articles.append({
+                'title': title,
+                'link': urljoin(base_url, link_elem.get('href', '')) if link_elem is not None else '',
+                'date': self.extract_date(date_elem),
+                'journal': journal['name'],
+                'abstract': abstract_elem.get_text(' ', strip=True) if abstract_elem is not None else ''
+            })
+        return articles
+
+    def extract_date(self, date_elem):
+        """提取日期，无法识别时返回空字符串（由调用方决定如何处理）"""
+        if date_elem is None:
+            return ''
+        date_str = date_elem.get('datetime') or date_elem.get_text(' ', strip=True)
+        return normalize_date(date_str, self.date_formats) or ''
+
+
+def register_parser(journal_type, parser):
+    """注册自定义解析器：parser(soup, journal) 返回文章列表，优先于声明式规则"""
+    _custom_parsers[journal_type] = parser
+
+
+def get_specs():
+    """内置规则与 Config.PARSER_SPECS 合并后的全部规则"""
+    return {**PARSER_SPECS, **Config.PARSER_SPECS}
+
+
+def get_parser(journal_type):
+    """获取期刊类型的解析函数（编译结果按类型缓存，未知类型使用通用规则）"""
+    if journal_type in _custom_parsers:
+        return _custom_parsers[journal_type]
+
+    specs = get_specs()
+    if journal_type not in specs:
+        journal_type = 'generic'
+
+    with _compiled_lock:
+        parser = _compiled.get(journal_type)
+        if parser is None or parser.spec is not specs[journal_type]:
+            parser = _compiled[journal_type] = SpecParser(journal_type, specs[journal_type])
+    return parser.parse
+
+
+def parse_page(content, journal):
+    """解析页面原始字节，返回文章记录列表（进程池的工作函数，只传回普通字典）"""
+    soup = BeautifulSoup(content, 'lxml')
+    return get_parser(journal['type'])(soup, journal)
+
+
+class ParsePool:
+    """页面解析进程池
+
+    BeautifulSoup 解析是CPU密集型操作且持有GIL，大页面的原始字节交给
+    按CPU核数创建的进程池解析，只传回抽取出的文章记录；小页面（少于
+    PARSE_CONFIG['min_pool_bytes']）、自定义解析器的期刊类型或进程池
+    不可用时在当前进程解析。进程池在首次需要时才创建。
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.setup_logging()
+        self.executor = None
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def get_executor(self):
+        """创建（或复用）进程池；使用 spawn 方式，避免在多线程进程中 fork"""
+        if self.executor is None:
+            processes = self.config.PARSE_CONFIG['processes'] or os.cpu_count() or 1
+            self.executor = ProcessPoolExecutor(max_workers=processes,
+                                                mp_context=multiprocessing.get_context('spawn'))
+            self.logger.info(f"页面解析进程池已启动，进程数 {processes}")
+        return self.executor
+
+    def submit(self, content, journal):
+        """提交解析任务，返回 Future（结果为文章记录列表）"""
+        parse_config = self.config.PARSE_CONFIG
+        if (parse_config['enabled'] and len(content) >= parse_config['min_pool_bytes']
+                and journal['type'] not in _custom_parsers):
+            try:
+                return self.get_executor().submit(parse_page, content, journal)
+            except Exception as e:
+                self.logger.warning(f"进程池不可用，改在当前进程解析: {str(e)}")
+                self.shutdown()
+
+        future = Future()
+        try:
+            future.set_result(parse_page(content, journal))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def parse(self, content, journal):
+        """同步解析一个页面"""
+        return self.submit(content, journal).result()
+
+    def shutdown(self):
+        """关闭进程池（配置重新加载后，新的工作进程会读取新配置）"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+def get_parse_pool():
+    """获取进程内共享的页面解析进程池"""
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ParsePool()
+    return _pool
+
+
+def shutdown_parse_pool():
+    """关闭共享的解析进程池"""
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+
+
+def validate_parsers(fixtures_dir=FIXTURES_DIR):
+    """用保存的页面样本校验各类型的规则
+
+    fixtures_dir 下 <type>.html 为页面样本，<type>.json 为期望结果
+    （{'url': 页面地址, 'titles': [标题...]}）。返回 [(类型, 是否通过, 说明)]。
+    """
+    configure_logging()
+    logger = logging.getLogger(__name__)
+    results = []
+
+    for journal_type in sorted(set(get_specs()) | set(_custom_parsers)):
+        page_path = os.path.join(fixtures_dir, f'{journal_type}.html')
+        expected_path = os.path.join(fixtures_dir, f'{journal_type}.json')
+        if not os.path.exists(page_path):
+            results.append((journal_type, False, '缺少页面样本'))
+            continue
+
+        with open(page_path, 'rb') as f:
+            soup = BeautifulSoup(f.read(), 'lxml')
+        expected = {}
+        if os.path.exists(expected_path):
+            with open(expected_path, 'r', encoding='utf-8') as f:
+                expected = json.load(f)
+
+        journal = {'name': journal_type, 'url': expected.get('url', 'https://example.com/'), 'type': journal_type}
+        try:
+            articles = get_parser(journal_type)(soup, journal)
+        except Exception as e:
+            results.append((journal_type, False, f'解析出错: {str(e)}'))
+            continue
+
+        titles = [article['title'] for article in articles]
+        if not articles:
+            results.append((journal_type, False, '未抽取到任何文章'))
+        elif any(not article['link'] for article in articles):
+            results.append((journal_type, False, '存在缺少链接的文章'))
+        elif 'titles' in expected and titles != expected['titles']:
+            results.append((journal_type, False, f'标题与期望不一致: {titles}'))
+        else:
+            results.append((journal_type, True, f'抽取 {len(articles)} 篇文章'))
+
+    for journal_type, ok, message in results:
+        (logger.info if ok else logger.warning)(f"解析规则校验 {journal_type}: {message}")
+    return results
+
+
+if __name__ == "__main__":
+    # 校验所有解析规则
+    for journal_type, ok, message in validate_parsers():
+        print(f"{'✅' if ok else '❌'} {journal_type}: {message}")
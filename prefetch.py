@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from config import Config
+from log_config import configure_logging
+
+class Prefetcher:
+    """日间后台预取：按 PREFETCH_CONFIG 的间隔轮询各来源
+
+    新文章写入文章库并预先生成单篇摘要；定时触发时 collect_articles()
+    直接从库中读取，只有长时间未成功轮询的来源才现场抓取，
+    因此日报的发送时间不再取决于当天上游API的响应速度。
+
+    crawler 和 summarizer 应使用独立的HTTP客户端（见 AutoDLD），日报运行
+    开始时重置跳过记录、流量统计和熔断状态不会影响正在进行的后台轮询；
+    日报触发时的现场抓取使用日报运行自己的爬取器。
+    """
+
+    def __init__(self, crawler, summarizer, store):
+        self.config = Config()
+        self.setup_logging()
+        self.crawler = crawler
+        self.summarizer = summarizer
+        self.store = store
+        # 后台线程与日报任务可能同时轮询同一来源，抓取和状态写入需串行
+        self.poll_lock = threading.Lock()
+        self.summary_lock = threading.Lock()
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def load_state(self):
+        """读取各来源的轮询记录"""
+        state_file = self.config.PREFETCH_CONFIG['state_file']
+        if os.path.exists(state_file):
+            try:
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"读取预取状态失败: {str(e)}")
+        return {}
+
+    def save_state(self, state):
+        """保存轮询记录"""
+        state_file = self.config.PREFETCH_CONFIG['state_file']
+        os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+        tmp_path = state_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, state_file)
+
+    def active_sources(self):
+        """配置了轮询间隔且被主题配置使用的来源"""
+        fetchers = self.crawler.get_source_fetchers()
+        return [source for source in self.config.PREFETCH_CONFIG['intervals'] if source in fetchers]
+
+    def seconds_until_due(self, source, now, state):
+        """距离该来源下次轮询的秒数（<=0 表示已到期）"""
+        last_poll = state.get(source, {}).get('last_poll')
+        if not last_poll:
+            return 0
+        interval = timedelta(minutes=self.config.PREFETCH_CONFIG['intervals'][source])
+        return (datetime.fromisoformat(last_poll) + interval - now).total_seconds()
+
+    def poll_source(self, source, deadline=None, crawler=None):
+        """抓取一个来源并入库，返回新增文章数
+
+        deadline 为日报运行的截止时间，crawler 为日报运行的爬取器（后台
+        线程自身的轮询均为None）：等待后台轮询释放锁和抓取本身都受截止
+        时间约束，预算用完时跳过该来源。
+        """
+        crawler = crawler or self.crawler
+        fetchers = crawler.get_source_fetchers()
+        timeout = max(0, deadline.remaining()) if deadline is not None else -1
+        if not self.poll_lock.acquire(timeout=timeout):
+            crawler.skipped_sources[source] = "超出时间预算"
+            self.logger.warning(f"等待后台预取 {source} 超出时间预算，跳过")
+            return 0
+        try:
+            started = datetime.now()
+            try:
+                articles = fetchers[source](deadline)
+                inserted = self.store.ingest_articles(articles)
+                success = True
+                self.logger.info(f"预取 {source}: 获取 {len(articles)} 篇，新增 {inserted} 篇")
+            except Exception as e:
+                inserted = 0
+                success = False
+                self.logger.warning(f"预取 {source} 失败: {str(e)}")
+
+            state = self.load_state()
+            entry = state.setdefault(source, {})
+            entry['last_poll'] = started.isoformat()
+            if success:
+                entry['last_success'] = started.isoformat()
+            self.save_state(state)
+        finally:
+            self.poll_lock.release()
+        return inserted
+
+    def summarize_pending(self):
+        """为近期入库、尚无摘要的文章生成单篇摘要，返回生成数量"""
+        prefetch_config = self.config.PREFETCH_CONFIG
+        if not prefetch_config['summarize_articles']:
+            return 0
+
+        # 同一时间只有一个线程在生成摘要，避免重复调用API
+        if not self.summary_lock.acquire(blocking=False):
+            return 0
+        try:
+            pending = self.store.get_unsummarized_articles(
+                self.window_start(), prefetch_config['max_summaries_per_poll'])
+            done = 0
+            for article in pending:
+                try:
+                    self.store.set_article_summary(article['article_key'],
+                                                   self.summarizer.summarize_article(article))
+                    done += 1
+                except Exception as e:
+                    self.logger.warning(f"单篇摘要生成失败，留待下轮重试: {str(e)}")
+                    break
+            if done:
+                self.logger.info(f"预先生成单篇摘要 {done} 篇")
+            return done
+        finally:
+            self.summary_lock.release()
+
+    def run_due(self):
+        """轮询所有到期的来源并处理待摘要文章，返回距离下次到期的秒数"""
+        sources = self.active_sources()
+        polled = False
+        for source in sources:
+            if self.seconds_until_due(source, datetime.now(), self.load_state()) <= 0:
+                self.poll_source(source)
+                polled = True
+
+        if polled:
+            self.summarize_pending()
+
+        now = datetime.now()
+        state = self.load_state()
+        return min((self.seconds_until_due(source, now, state) for source in sources), default=3600)
+
+    def window_start(self):
+        """日报收录窗口的起点"""
+        start = datetime.now() - timedelta(hours=self.config.PREFETCH_CONFIG['max_age_hours'])
+        return start.strftime('%Y-%m-%d %H:%M:%S')
+
+    def has_fresh_data(self):
+        """是否有来源在有效期内成功轮询过"""
+        state = self.load_state()
+        return any(not self.is_stale(source, state) for source in self.active_sources())
+
+    def is_stale(self, source, state):
+        """来源在有效期内没有成功轮询"""
+        last_success = state.get(source, {}).get('last_success')
+        if not last_success:
+            return True
+        max_age = timedelta(hours=self.config.PREFETCH_CONFIG['max_age_hours'])
+        return datetime.now() - datetime.fromisoformat(last_success) > max_age
+
+    def collect_articles(self, deadline=None, crawler=None):
+        """日报触发时收集文章：过期来源用日报运行的爬取器在截止时间内现场抓取，其余直接读库"""
+        state = self.load_state()
+        for source in self.active_sources():
+            if self.is_stale(source, state):
+                self.logger.info(f"来源 {source} 预取数据已过期，现场抓取")
+                self.poll_source(source, deadline, crawler)
+
+        articles = self.crawler.ranker.select_report(
+            self.store.get_articles_seen_since(self.window_start()))
+        summarized = sum(1 for article in articles if article['summary'])
+        self.logger.info(f"从文章库读取 {len(articles)} 篇文章，其中 {summarized} 篇已有单篇摘要")
+        return articles
+
+
+class PrefetchThread(threading.Thread):
+    """常驻进程中的后台预取线程"""
+
+    def __init__(self, prefetcher):
+        super().__init__(name='prefetch', daemon=True)
+        self.prefetcher = prefetcher
+        self.stop_event = threading.Event()
+
+    def run(self):
+        logger = self.prefetcher.logger
+        logger.info("后台预取线程已启动")
+        while not self.stop_event.is_set():
+            try:
+                wait_seconds = self.prefetcher.run_due()
+            except Exception as e:
+                logger.error(f"后台预取出错: {str(e)}")
+                wait_seconds = 300
+            # 最长每分钟检查一次，兼顾配置变化和时钟跳变
+            self.stop_event.wait(min(max(wait_seconds, 1), 60))
+        logger.info("后台预取线程已停止")
+
+    def stop(self, timeout=None):
+        """请求停止并等待当前轮询结束"""
+        self.stop_event.set()
+        self.join(timeout)
+
+
+if __name__ == "__main__":
+    # 执行一轮到期来源的预取（可由cron按小时调用）
+    from main import AutoDLD
+    system = AutoDLD()
+    system.prefetcher.run_due()
+    print(f"预取完成，库中共 {system.store.count_articles()} 篇文章")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from config import Config
+from log_config import configure_logging
+
+
+class StackSampler(threading.Thread):
+    """按固定间隔采样目标线程的调用栈，累计为折叠栈（flame graph 输入格式）"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stage = ''
+        self.stacks = Counter()
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or not self.stage:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            names.append(self.stage)
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+class StageProfiler:
+    """按阶段剖析一次日报运行
+
+    每个阶段（collect、summary、render、deliver）在独立的 cProfile 下运行，
+    并用 tracemalloc 记录该阶段的内存峰值和新增分配最多的代码行；同时
+    后台线程采样调用栈。运行结束后在 logs/ 下写出：
+      profile_<时间>.txt        各阶段耗时、内存峰值和热点函数（按累计/自身耗时排序）
+      profile_<时间>_<阶段>.prof cProfile 原始数据（可用 snakeviz 等工具查看）
+      profile_<时间>.collapsed  折叠栈，可直接输入 flamegraph.pl 或 speedscope
+    未启用时所有方法都不做任何事。
+    """
+
+    def __init__(self, enabled=False):
+        self.config = Config()
+        self.setup_logging()
+        self.enabled = enabled
+        self.started = False
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """开始剖析本次运行"""
+        if not self.enabled or self.started:
+            return
+        profile_config = self.config.PROFILE_CONFIG
+        self.started = True
+        self.stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.stages = []
+        self.current = None
+        tracemalloc.start(profile_config['traceback_frames'])
+        self.sampler = StackSampler(threading.get_ident(), profile_config['sample_interval_ms'] / 1000)
+        self.sampler.start()
+
+    def switch(self, name):
+        """结束当前阶段并开始新阶段"""
+        if not self.enabled:
+            return
+        self.start()
+        self.end_stage()
+
+        tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        self.current = {
+            'name': name,
+            'profile': profile,
+            'snapshot': tracemalloc.take_snapshot(),
+            'memory_start': tracemalloc.get_traced_memory()[0],
+            'started': time.perf_counter()
+        }
+        self.sampler.stage = name
+        profile.enable()
+
+    def end_stage(self):
+        """结束当前阶段，记录耗时、内存峰值和分配热点"""
+        stage = self.current
+        if stage is None:
+            return
+        stage['profile'].disable()
+        self.sampler.stage = ''
+        stage['elapsed'] = time.perf_counter() - stage['started']
+        current, peak = tracemalloc.get_traced_memory()
+        stage['memory_end'] = current
+        stage['memory_peak'] = peak
+        stage['allocations'] = tracemalloc.take_snapshot().compare_to(stage['snapshot'], 'lineno')
+        del stage['snapshot']
+        self.stages.append(stage)
+        self.current = None
+
+    def finish(self):
+        """结束剖析并写出报告，返回报告文件路径"""
+        if not self.enabled or not self.started:
+            return None
+        self.end_stage()
+        self.sampler.stop()
+        tracemalloc.stop()
+        self.started = False
+
+        try:
+            return self.write_reports()
+        except OSError as e:
+            self.logger.error(f"写出剖析报告失败: {str(e)}")
+            return None
+
+    def write_reports(self):
+        """写出文本报告、各阶段 .prof 文件和折叠栈文件"""
+        profile_config = self.config.PROFILE_CONFIG
+        logs_dir = self.config.PATHS['logs_dir']
+        os.makedirs(logs_dir, exist_ok=True)
+        prefix = os.path.join(logs_dir, f'profile_{self.stamp}')
+
+        lines = ['阶段        耗时(秒)   内存峰值(MB)   阶段结束时新增(MB)']
+        for stage in self.stages:
+            lines.append(f"{stage['name']:<10} {stage['elapsed']:>9.2f} {stage['memory_peak'] / 1e6:>13.1f} "
+                         f"{(stage['memory_end'] - stage['memory_start']) / 1e6:>17.1f}")
+
+        for stage in self.stages:
+            stage['profile'].dump_stats(f"{prefix}_{stage['name']}.prof")
+            for sort_key, title in (('cumulative', '按累计耗时'), ('tottime', '按自身耗时')):
+                buffer = io.StringIO()
+                stats = pstats.Stats(stage['profile'], stream=buffer)
+                stats.strip_dirs().sort_stats(sort_key).print_stats(profile_config['top_functions'])
+                lines.append(f"\n===== {stage['name']}：{title} =====")
+                lines.append(buffer.getvalue().strip())
+
+            lines.append(f"\n===== {stage['name']}：新增内存分配最多的代码行 =====")
+            for diff in stage['allocations'][:profile_config['top_allocations']]:
+                lines.append(f"{diff.size_diff / 1024:>10.1f} KiB  {diff.count_diff:>8} 次  {diff.traceback}")
+
+        report_path = f'{prefix}.txt'
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+        with open(f'{prefix}.collapsed', 'w', encoding='utf-8') as f:
+            for stack, count in self.sampler.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+        summary = ', '.join(f"{stage['name']} {stage['elapsed']:.1f}秒/{stage['memory_peak'] / 1e6:.0f}MB"
+                            for stage in self.stages)
+        self.logger.info(f"剖析报告已写入 {report_path}（{summary}）")
+        return report_path
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+import math
+import time
+import heapq
+import logging
+from collections import Counter
+from config import Config
+from log_config import configure_logging
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# 查询词中不参与打分的常见词
+STOPWORDS = {'the', 'a', 'an', 'and', 'or', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from'}
+
+
+def tokenize(text):
+    """与全文索引（unicode61）一致的小写分词"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class RelevanceRanker:
+    """按主题配置的查询词和关键词，对候选文章的标题和摘要做BM25打分
+
+    IDF由文章历史库的全文索引词表（fts5vocab）与本次候选池合并计算，
+    历史统计按 RANKING_CONFIG['stats_refresh_minutes'] 缓存；选取使用
+    堆（heapq.nlargest），候选池达到数千篇时依然只需线性时间。
+    """
+
+    def __init__(self, store=None, topics=None):
+        self.config = Config()
+        self.setup_logging()
+        self.store = store
+        self.topics = topics if topics is not None else self.config.TOPICS
+
+        # 每个主题的查询词元（terms 与 keywords 的并集）
+        self.queries = {}
+        for key, topic in self.topics.items():
+            tokens = set()
+            for phrase in topic.get('terms', []) + topic.get('keywords', []):
+                tokens.update(tokenize(phrase))
+            self.queries[key] = tokens - STOPWORDS
+        self.vocabulary = set().union(*self.queries.values()) if self.queries else set()
+
+        self.history = None
+        self.history_loaded_at = 0
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def history_statistics(self):
+        """历史库中的文章总数及查询词元的文档频率（带缓存）"""
+        refresh_seconds = self.config.RANKING_CONFIG['stats_refresh_minutes'] * 60
+        if self.history is not None and time.time() - self.history_loaded_at < refresh_seconds:
+            return self.history
+
+        try:
+            if self.store is None:
+                from article_store import ArticleStore
+                self.store = ArticleStore()
+            self.history = (self.store.count_articles(),
+                            self.store.term_document_frequencies(self.vocabulary))
+        except Exception as e:
+            self.logger.warning(f"读取历史库词频失败，仅使用候选文章统计: {str(e)}")
+            self.history = (0, {})
+        self.history_loaded_at = time.time()
+        return self.history
+
+    def score(self, articles):
+        """为每篇文章写入 'relevance' 分数，返回文章列表"""
+        if not articles:
+            return articles
+
+        ranking_config = self.config.RANKING_CONFIG
+        k1 = ranking_config['k1']
+        b = ranking_config['b']
+        title_weight = ranking_config['title_weight']
+
+        # 标题词频加权后与摘要合并，只保留查询词表内的词元
+        documents = []
+        lengths = []
+        pool_df = Counter()
+        for article in articles:
+            title_tokens = tokenize(article.get('title') or '')
+            abstract_tokens = tokenize(article.get('abstract') or '')
+            tf = Counter()
+            for token in title_tokens:
+                if token in self.vocabulary:
+                    tf[token] += title_weight
+            for token in abstract_tokens:
+                if token in self.vocabulary:
+                    tf[token] += 1
+            documents.append(tf)
+            lengths.append(title_weight * len(title_tokens) + len(abstract_tokens))
+            pool_df.update(tf.keys())
+
+        history_count, history_df = self.history_statistics()
+        total = history_count + len(articles)
+        idf = {}
+        for token in self.vocabulary:
+            df = history_df.get(token, 0) + pool_df.get(token, 0)
+            idf[token] = math.log(1 + (total - df + 0.5) / (df + 0.5))
+
+        avg_length = (sum(lengths) / len(lengths)) or 1
+        for article, tf, length in zip(articles, documents, lengths):
+            query = set()
+            for key in article.get('topics') or self.queries:
+                query |= self.queries.get(key, set())
+
+            norm = k1 * (1 - b + b * length / avg_length)
+            article['relevance'] = round(sum(
+                idf[token] * tf[token] * (k1 + 1) / (tf[token] + norm)
+                for token in query if token in tf
+            ), 4)
+        return articles
+
+    def select(self, articles, limit, per_journal=None):
+        """打分后按期刊取前 per_journal 篇，再在全部中取前 limit 篇（按分数降序）"""
+        self.score(articles)
+        key = lambda article: article['relevance']
+
+        candidates = articles
+        if per_journal:
+            journals = {}
+            for article in articles:
+                journals.setdefault(article.get('journal', ''), []).append(article)
+            candidates = []
+            for group in journals.values():
+                candidates.extend(heapq.nlargest(per_journal, group, key=key))
+
+        selected = heapq.nlargest(limit, candidates, key=key)
+        if len(selected) < len(articles):
+            self.logger.info(f"相关度排序: 从 {len(articles)} 篇候选中选出 {len(selected)} 篇")
+        return selected
+
+    def select_report(self, articles):
+        """按 RANKING_CONFIG 选出日报收录的文章"""
+        ranking_config = self.config.RANKING_CONFIG
+        return self.select(articles, ranking_config['max_articles'], ranking_config['per_journal'])
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+from config import Config
+from log_config import configure_logging
+from article_store import ArticleStore
+from clustering import ThemeClusterer
+from html_generator import get_template_env
+
+PERIOD_NAMES = {'week': '周', 'month': '月'}
+
+
+def period_bounds(period, day):
+    """day 所在的自然周（周一至周日）或自然月，返回 (起始日期, 结束日期, 标签)"""
+    if period == 'week':
+        start = day - timedelta(days=day.weekday())
+        end = start + timedelta(days=6)
+        year, week, _ = day.isocalendar()
+        return start, end, f'{year}-W{week:02d}'
+    start = day.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return start, end, start.strftime('%Y-%m')
+
+
+def count_matrix(groups, days, group_count, day_count):
+    """按 (分组, 日期) 计数的矩阵：groups 和 days 为每篇文章的分组编号和日期编号"""
+    counts = np.zeros((group_count, day_count), dtype=np.int64)
+    np.add.at(counts, (groups, days), 1)
+    return counts
+
+
+class RollupBuilder:
+    """由已保存的日报生成周报/月报
+
+    文章来自文章库，各日的整体摘要来自 daily_reports，不访问任何数据
+    来源。统计（各期刊、各主题的逐日篇数、活跃天数、前后半段变化）
+    用 NumPy 在计数矩阵上一次算出；各日摘要经一次模型调用归并为综述，
+    结果按输入哈希缓存，输入不变时重复生成不再调用模型。
+    """
+
+    def __init__(self, store=None, summarizer=None):
+        self.config = Config()
+        self.setup_logging()
+        self.store = store or ArticleStore()
+        self.summarizer = summarizer
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def collect(self, start, end):
+        """读取时段内的各日摘要和文章，返回 (digests, articles, first_days)
+
+        first_days[i] 为第 i 篇文章首次出现在日报中的日期编号（相对 start）。
+        """
+        digests = list(self.store.iter_daily_reports(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')))
+        first_seen = {}
+        for digest in digests:
+            offset = (datetime.strptime(digest['date'], '%Y-%m-%d').date() - start).days
+            for key in digest['article_keys']:
+                first_seen.setdefault(key, offset)
+
+        stored = self.store.get_articles_by_keys(first_seen)
+        articles = [stored[key] for key in first_seen if key in stored]
+        first_days = np.array([first_seen[article['article_key']] for article in articles], dtype=np.int64)
+        return digests, articles, first_days
+
+    def compute_stats(self, articles, first_days, day_count, themes):
+        """各期刊和各主题的统计"""
+        rollup_config = self.config.ROLLUP_CONFIG
+        journal_names, journal_ids = np.unique(
+            np.array([article['journal'] or '未知期刊' for article in articles], dtype=object),
+            return_inverse=True)
+        journal_counts = count_matrix(journal_ids, first_days, len(journal_names), day_count)
+        daily_totals = journal_counts.sum(axis=0)
+
+        theme_ids = np.zeros(len(articles), dtype=np.int64)
+        positions = {id(article): i for i, article in enumerate(articles)}
+        for theme_id, theme in enumerate(themes):
+            theme_ids[[positions[id(article)] for article in theme['articles']]] = theme_id
+        theme_counts = count_matrix(theme_ids, first_days, max(1, len(themes)), day_count)
+
+        # 前后半段的篇数，用于标出增长或减少的主题
+        half = day_count // 2
+        theme_first, theme_second = theme_counts[:, :half].sum(axis=1), theme_counts[:, half:].sum(axis=1)
+        total = max(1, len(articles))
+
+        journal_totals = journal_counts.sum(axis=1)
+        journal_active = np.count_nonzero(journal_counts, axis=1)
+        order = np.argsort(-journal_totals, kind='stable')[:rollup_config['top_journals']]
+        journals = [{
+            'name': journal_names[i],
+            'count': int(journal_totals[i]),
+            'share': float(journal_totals[i] / total),
+            'active_days': int(journal_active[i]),
+            'daily': journal_counts[i].tolist()
+        } for i in order]
+
+        theme_stats = [{
+            'label': theme['label'],
+            'count': len(theme['articles']),
+            'share': len(theme['articles']) / total,
+            'first_half': int(theme_first[i]),
+            'second_half': int(theme_second[i]),
+            'daily': theme_counts[i].tolist(),
+            'representative': theme['representative']
+        } for i, theme in enumerate(themes[:rollup_config['max_themes']])]
+
+        return {
+            'total_articles': len(articles),
+            'journal_count': len(journal_names),
+            'daily_totals': daily_totals.tolist(),
+            'active_days': int(np.count_nonzero(daily_totals)),
+            'journals': journals,
+            'themes': theme_stats
+        }
+
+    @staticmethod
+    def stats_text(stats):
+        """统计概况的文字描述（作为归并摘要的输入）"""
+        lines = [f"共 {stats['total_articles']} 篇文章，来自 {stats['journal_count']} 个期刊。"]
+        lines.append("发文最多的期刊：" + "，".join(
+            f"{journal['name']} {journal['count']}篇" for journal in stats['journals'][:5]))
+        for theme in stats['themes']:
+            lines.append(f"主题「{theme['label']}」{theme['count']} 篇"
+                         f"（前半段 {theme['first_half']} 篇，后半段 {theme['second_half']} 篇）")
+        return '\n'.join(lines)
+
+    def build(self, period='week', day=None, use_llm=True):
+        """生成 day（默认今天）所在周或月的汇总，返回报告数据"""
+        day = day or datetime.now().date()
+        start, end, label = period_bounds(period, day)
+        period_name = f"{start.isoformat()} 至 {end.isoformat()} 这一{PERIOD_NAMES[period]}"
+        day_count = (end - start).days + 1
+
+        digests, articles, first_days = self.collect(start, end)
+        themes = ThemeClusterer().cluster(articles) if articles else []
+        stats = self.compute_stats(articles, first_days, day_count, themes) if articles else None
+        stats_text = self.stats_text(stats) if stats else ''
+
+        input_hash = hashlib.sha1(json.dumps(
+            [[digest['date'], digest['summary']] for digest in digests] + [stats_text],
+            ensure_ascii=False).encode('utf-8')).hexdigest()
+        summary = self.store.get_rollup(period, start.isoformat(), input_hash)
+        if summary is not None:
+            self.logger.info(f"{label} 的输入未变化，使用缓存的综述")
+        elif use_llm and self.summarizer is not None and digests:
+            try:
+                summary = self.summarizer.generate_rollup_summary(period_name, digests, stats_text)
+                self.store.save_rollup(period, start.isoformat(), input_hash, summary)
+            except Exception as e:
+                # 失败时不写缓存，下次生成时重试
+                self.logger.error(f"{label} 综述生成失败，使用统计概况: {str(e)}")
+        if summary is None:
+            summary = stats_text or f"{period_name}内没有保存的日报。"
+
+        self.logger.info(f"{label} 汇总完成：{len(digests)} 份日报，{len(articles)} 篇文章")
+        return {
+            'period': period,
+            'title': f"学术期刊{PERIOD_NAMES[period]}报 {label}",
+            'label': label,
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'days': [(start + timedelta(days=i)).isoformat() for i in range(day_count)],
+            'summary': summary,
+            'digests': digests,
+            'stats': stats
+        }
+
+    def render(self, rollup):
+        """渲染汇总报告，返回文件路径"""
+        template = get_template_env().get_template('rollup.html')
+        html_content = template.render(**rollup)
+        filepath = os.path.join(self.config.PATHS['base_dir'], f"rollup_{rollup['label']}.html")
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+        self.logger.info(f"汇总报告已生成: {filepath}")
+        return filepath
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+from datetime import datetime, timedelta
+import requests
+from config import Config
+from log_config import configure_logging
+
+
+class DeadlineExceeded(requests.Timeout):
+    """本阶段的时间预算已用完，不再发起新的请求"""
+
+
+class RunDeadline:
+    """一次日报运行的截止时间
+
+    各阶段为后续阶段预留时间（DEADLINE_CONFIG['stage_reserves']）：
+    抓取阶段在截止时间前留出摘要和发送的时间，摘要阶段留出发送的时间。
+    HTTP请求的超时被压缩到当前阶段的剩余时间内，剩余时间不足时
+    抛出 DeadlineExceeded，各阶段据此停止并使用已获取的结果。
+
+    截止时间保存在运行对象上，由调用方显式传给抓取、预取和摘要等
+    组件（而不是线程局部变量），因此无论在哪个线程中执行都受同一
+    截止时间约束；没有截止时间的调用（如后台预取线程自身的轮询）传 None。
+    """
+
+    def __init__(self, deliver_at):
+        self.config = Config()
+        self.setup_logging()
+        self.deliver_at = deliver_at
+        # 用单调时钟计时，不受系统时间调整影响
+        self.expires = time.monotonic() + (deliver_at - datetime.now()).total_seconds()
+        self.stage_name = ''
+        self.reserve = 0
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def stage(self, name):
+        """进入某一阶段（collect、summary、deliver）"""
+        self.stage_name = name
+        self.reserve = self.config.DEADLINE_CONFIG['stage_reserves'].get(name, 0)
+        self.logger.info(f"进入阶段 {name}，剩余时间预算 {self.remaining():.0f} 秒")
+
+    def remaining(self):
+        """当前阶段剩余的秒数（已扣除为后续阶段预留的时间）"""
+        return self.expires - self.reserve - time.monotonic()
+
+    def expired(self):
+        """剩余时间不足以发起一次请求"""
+        return self.remaining() < self.config.DEADLINE_CONFIG['min_request_seconds']
+
+    def timeout(self, default):
+        """把请求超时压缩到剩余时间内；预算已用完时抛出 DeadlineExceeded"""
+        if self.expired():
+            raise DeadlineExceeded(f"阶段 {self.stage_name} 的时间预算已用完")
+        return min(default, self.remaining())
+
+
+def resolve_deliver_at(deliver_by=None, now=None):
+    """计算本次运行的交付时间
+
+    deliver_by 为 'HH:MM'（默认取 DEADLINE_CONFIG['deliver_by']），且今天的
+    该时刻尚未过去时使用它；否则（未配置或补跑）为当前时间加 max_run_minutes。
+    """
+    deadline_config = Config.DEADLINE_CONFIG
+    now = now or datetime.now()
+    deliver_by = deliver_by or deadline_config['deliver_by']
+    fallback = now + timedelta(minutes=deadline_config['max_run_minutes'])
+    if not deliver_by:
+        return fallback
+    hour, minute = (int(part) for part in deliver_by.split(':'))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return target if target > now else fallback
+
+
+def start_deadline(deliver_by=None):
+    """创建本次运行的截止时间（未启用时返回None）"""
+    if not Config.DEADLINE_CONFIG['enabled']:
+        return None
+    return RunDeadline(resolve_deliver_at(deliver_by))
+
+
+def deadline_expired(deadline):
+    """当前阶段的时间预算是否已用完（deadline 为 None 时为False）"""
+    return deadline is not None and deadline.expired()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import fcntl
+
+class RunLock:
+    """基于文件锁的运行互斥，防止cron任务与常驻进程的日报重叠执行
+
+    进程退出时操作系统自动释放锁，不会留下失效的锁文件。
+    """
+
+    def __init__(self, lock_path):
+        self.lock_path = lock_path
+        self.lock_file = None
+
+    def acquire(self):
+        """尝试获取锁，已被占用时立即返回False"""
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        self.lock_file = open(self.lock_path, 'a+')
+        try:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self.lock_file.close()
+            self.lock_file = None
+            return False
+
+        self.lock_file.seek(0)
+        self.lock_file.truncate()
+        self.lock_file.write(str(os.getpid()))
+        self.lock_file.flush()
+        return True
+
+    def release(self):
+        """释放锁"""
+        if self.lock_file is not None:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -6,6 +6,7 @@ import sys
 from crontab import CronTab
 import logging
 from config import Config
+from log_config import configure_logging
 
 class TaskScheduler:
     """定时任务调度器"""
@@ -19,14 +20,7 @@ class TaskScheduler:
     
     def setup_logging(self):
         """设置日志"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f"{self.config.PATHS['logs_dir']}/scheduler.log"),
-                logging.StreamHandler()
-            ]
-        )
+        configure_logging()
         self.logger = logging.getLogger(__name__)
     
     def add_daily_task(self):
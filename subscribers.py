@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+from config import Config
+from log_config import configure_logging
+
+class SubscriberRegistry:
+    """订阅者注册表：每位订阅者有独立的主题、期刊、来源过滤和语言"""
+
+    SUPPORTED_LANGUAGES = ('zh', 'en')
+
+    def __init__(self):
+        self.config = Config()
+        self.setup_logging()
+
+    def setup_logging(self):
+        """设置日志"""
+        configure_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def get_subscribers(self):
+        """获取启用的订阅者列表（已规范化）"""
+        raw_subscribers = self.config.SUBSCRIBERS
+        if not raw_subscribers:
+            raw_subscribers = [{
+                'name': 'default',
+                'email': self.config.EMAIL_CONFIG.get('receiver_email', '')
+            }]
+
+        subscribers = []
+        for entry in raw_subscribers:
+            if not entry.get('enabled', True):
+                continue
+            if not entry.get('email'):
+                self.logger.warning(f"订阅者 {entry.get('name', '未命名')} 缺少邮箱地址，已跳过")
+                continue
+
+            language = entry.get('language', 'zh')
+            if language not in self.SUPPORTED_LANGUAGES:
+                self.logger.warning(f"订阅者 {entry['email']} 的语言 {language} 不受支持，使用中文")
+                language = 'zh'
+
+            subscribers.append({
+                'name': entry.get('name') or entry['email'],
+                'email': entry['email'],
+                'language': language,
+                'topics': set(entry.get('topics', [])),
+                'journals': {j.lower() for j in entry.get('journals', [])},
+                'sources': set(entry.get('sources', []))
+            })
+
+        return subscribers
+
+    def get_languages(self, subscribers):
+        """所有订阅者用到的语言集合"""
+        return sorted({subscriber['language'] for subscriber in subscribers})
+
+    def matches(self, subscriber, article):
+        """判断文章是否符合订阅者的过滤条件（空条件视为不过滤）"""
+        if subscriber['topics'] and not subscriber['topics'].intersection(article.get('topics', [])):
+            return False
+        if subscriber['journals'] and article.get('journal', '').lower() not in subscriber['journals']:
+            return False
+        if subscriber['sources'] and article.get('source') not in subscriber['sources']:
+            return False
+        return True
+
+    def select_articles(self, subscriber, articles):
+        """返回订阅者视图中的文章下标（保持原顺序）"""
+        return [i for i, article in enumerate(articles) if self.matches(subscriber, article)]
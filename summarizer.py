@@ -1,51 +1,51 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import requests
+import re
 import json
 import logging
 from config import Config
+from log_config import configure_logging
+from http_client import get_http_client
+from topics import get_window_days
+from html_generator import EMAIL_LABELS
 
 class DeepSeekSummarizer:
     """使用DeepSeek API生成摘要"""
     
-    def __init__(self):
+    def __init__(self, http=None):
         self.config = Config()
         self.setup_logging()
+        self.http = http or get_http_client()
     
     def setup_logging(self):
         """设置日志"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f"{self.config.PATHS['logs_dir']}/summarizer.log"),
-                logging.StreamHandler()
-            ]
-        )
+        configure_logging()
         self.logger = logging.getLogger(__name__)
     
-    def generate_summary(self, articles):
-        """为文章列表生成整体摘要"""
+    def generate_summary(self, articles, language='zh', themes=None, deadline=None):
+        """为文章列表生成整体摘要（language 为 'zh' 或 'en'，themes 为主题聚类结果，
+        deadline 为本次运行的截止时间）"""
+        labels = EMAIL_LABELS.get(language, EMAIL_LABELS['zh'])
         if not articles:
-            return "今日未发现新的学术文章更新。"
+            return labels['no_articles']
         
         # 准备输入文本
-        input_text = self.prepare_input_text(articles)
+        input_text = self.prepare_input_text(articles, language, themes)
         
         try:
             # 调用DeepSeek API
-            summary = self.call_deepseek_api(input_text)
+            summary = self.call_deepseek_api(input_text, deadline, language)
             self.logger.info("摘要生成成功")
             return summary
             
         except Exception as e:
             self.logger.error(f"摘要生成失败: {str(e)}")
             # 如果API调用失败，生成一个简单的摘要
-            return self.generate_fallback_summary(articles)
+            return self.generate_fallback_summary(articles, language)
     
-    def prepare_input_text(self, articles):
-        """准备输入文本"""
+    def prepare_input_text(self, articles, language='zh', themes=None):
+        """准备输入文本（有主题聚类结果时每个主题只提供一篇代表文章）"""
         # 按期刊分组文章
         journals = {}
         for article in articles:
@@ -55,13 +55,29 @@ class DeepSeekSummarizer:
             journals[journal_name].append(article)
         
         # 构建输入文本
-        input_text = "以下是过去7天内各学术期刊的最新文章标题列表：\n\n"
-        
-        for journal_name, journal_articles in journals.items():
-            input_text += f"【{journal_name}】期刊：\n"
-            for i, article in enumerate(journal_articles, 1):
-                input_text += f"{i}. {article['title']}\n"
-            input_text += "\n"
+        if themes:
+            input_text = f"以下是过去{get_window_days()}天内各学术期刊的 {len(articles)} 篇最新文章按主题归纳的结果，每个主题附一篇代表文章：\n\n"
+            for i, theme in enumerate(themes, 1):
+                representative = theme['representative']
+                input_text += f"【主题{i}：{theme['label']}】共 {len(theme['articles'])} 篇\n"
+                input_text += f"代表文章：{representative['title']}（{representative['journal']}）\n"
+                # 后台预取时已生成的单篇摘要一并提供，帮助提炼趋势
+                if representative.get('summary'):
+                    input_text += f"   {representative['summary']}\n"
+                input_text += "\n"
+            input_text += "各期刊文章数：" + "，".join(
+                f"{name} {len(items)}篇" for name, items in journals.items()) + "\n"
+        else:
+            input_text = f"以下是过去{get_window_days()}天内各学术期刊的最新文章标题列表：\n\n"
+            
+            for journal_name, journal_articles in journals.items():
+                input_text += f"【{journal_name}】期刊：\n"
+                for i, article in enumerate(journal_articles, 1):
+                    input_text += f"{i}. {article['title']}\n"
+                    # 后台预取时已生成的单篇摘要一并提供，帮助提炼趋势
+                    if article.get('summary'):
+                        input_text += f"   {article['summary']}\n"
+                input_text += "\n"
         
         input_text += """
 请根据以上文章标题，生成一段300-500字的中文摘要，要求：
@@ -74,10 +90,13 @@ class DeepSeekSummarizer:
 请直接输出摘要内容，不要包含任何额外的说明或格式标记。
 """
         
+        if language == 'en':
+            input_text += "\n请改用英文撰写摘要，篇幅约200-300个英文单词，其余要求不变。\n"
+        
         return input_text
     
-    def call_deepseek_api(self, input_text):
-        """调用DeepSeek API"""
+    def call_deepseek_api(self, input_text, deadline=None, language='zh'):
+        """调用DeepSeek API（language 为摘要的语言，决定长度的计算方式）"""
         headers = {
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {self.config.DEEPSEEK_API_KEY}'
@@ -100,11 +119,13 @@ class DeepSeekSummarizer:
             "stream": False
         }
         
-        response = requests.post(
+        response = self.http.post(
             self.config.DEEPSEEK_API_URL,
             headers=headers,
             json=data,
-            timeout=60
+            timeout=60,
+            source='deepseek',
+            deadline=deadline
         )
         response.raise_for_status()
         
@@ -112,12 +133,20 @@ class DeepSeekSummarizer:
         summary = result['choices'][0]['message']['content'].strip()
         
         # 确保摘要长度在要求范围内
-        summary = self.adjust_summary_length(summary)
+        summary = self.adjust_summary_length(summary, language)
         
         return summary
     
-    def adjust_summary_length(self, summary):
-        """调整摘要长度"""
+    def adjust_summary_length(self, summary, language='zh'):
+        """调整摘要长度（中文按汉字数，英文按单词数）"""
+        if language == 'en':
+            # 英文摘要只截断到 max_words 个单词，过短时不补充套话
+            words = list(re.finditer(r'\S+', summary))
+            max_words = self.config.SUMMARY_CONFIG['max_words']
+            if len(words) > max_words:
+                summary = summary[:words[max_words - 1].end()] + "..."
+            return summary
+        
         # 计算中文字符数
         chinese_chars = len([c for c in summary if '\u4e00' <= c <= '\u9fff'])
         
@@ -133,7 +162,7 @@ class DeepSeekSummarizer:
         
         return summary
     
-    def generate_fallback_summary(self, articles):
+    def generate_fallback_summary(self, articles, language='zh'):
         """API调用失败时的备用摘要生成"""
         self.logger.info("使用备用摘要生成方法")
         
@@ -144,20 +173,21 @@ class DeepSeekSummarizer:
             journal_stats[journal] = journal_stats.get(journal, 0) + 1
         
         # 生成简单的统计摘要
-        summary = "过去7天内，各学术期刊的研究动态如下：\n\n"
+        labels = EMAIL_LABELS.get(language, EMAIL_LABELS['zh'])
+        summary = labels['fallback_intro'].format(days=get_window_days())
         
         # 添加期刊统计
         for journal, count in journal_stats.items():
-            summary += f"• {journal}: {count}篇新文章\n"
+            summary += labels['fallback_journal'].format(journal=journal, count=count)
         
-        summary += "\n研究热点主要集中在：\n"
+        summary += labels['fallback_keywords']
         
         # 分析关键词（简单的关键词提取）
         keywords = self.extract_keywords(articles)
         for keyword in keywords[:5]:  # 取前5个关键词
             summary += f"• {keyword}\n"
         
-        summary += "\n这些研究反映了当前学术界的活跃态势，涵盖了多个前沿领域。"
+        summary += labels['fallback_outro']
         
         return summary
     
@@ -181,43 +211,72 @@ class DeepSeekSummarizer:
         sorted_keywords = sorted(keywords.items(), key=lambda x: x[1], reverse=True)
         return [keyword for keyword, count in sorted_keywords[:10]]  # 返回前10个关键词
     
+    def generate_rollup_summary(self, period_name, digests, stats_text):
+        """把一段时间内各日的整体摘要归并为一份周报/月报综述（调用失败时抛出异常）
+        
+        period_name 如 '2025-03-03 至 2025-03-09 这一周'，digests 为
+        [{'date', 'summary'}]，stats_text 为该时段的统计概况。
+        """
+        digest_chars = self.config.ROLLUP_CONFIG['digest_chars']
+        input_text = f"以下是{period_name}内每天的学术期刊日报摘要：\n\n"
+        for digest in digests:
+            input_text += f"【{digest['date']}】\n{digest['summary'][:digest_chars]}\n\n"
+        input_text += f"该时段的统计概况：\n{stats_text}\n"
+        input_text += f"""
+请把以上各日摘要归并为一段300-500字的中文综述，要求：
+1. 提炼整个时段的主要研究趋势和持续出现的热点，而不是逐日复述
+2. 结合统计概况，指出增长明显的主题和发文集中的期刊
+3. 语言简洁明了，逻辑清晰
+
+请直接输出综述内容，不要包含任何额外的说明或格式标记。
+"""
+        return self.call_deepseek_api(input_text)
+    
+    def summarize_article(self, article):
+        """为单篇文章生成50字左右的简短摘要（调用失败时抛出异常）"""
+        prompt = f"请为以下学术文章标题生成一个50字左右的简短摘要：\n\n标题：{article['title']}\n\n期刊：{article['journal']}\n\n"
+        abstract = article.get('abstract') or ''
+        if abstract and abstract != '摘要暂不可用':
+            prompt += f"原文摘要：{abstract[:1500]}\n\n"
+        prompt += "摘要："
+        
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.config.DEEPSEEK_API_KEY}'
+        }
+        
+        data = {
+            "model": "deepseek-chat",
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.7,
+            "max_tokens": 100,
+            "stream": False
+        }
+        
+        response = self.http.post(
+            self.config.DEEPSEEK_API_URL,
+            headers=headers,
+            json=data,
+            timeout=30,
+            source='deepseek'
+        )
+        response.raise_for_status()
+        
+        result = response.json()
+        return result['choices'][0]['message']['content'].strip()
+    
     def summarize_individual_articles(self, articles):
         """为每篇文章生成简短摘要（可选功能）"""
         individual_summaries = []
         
         for article in articles:
             try:
-                # 为单篇文章生成简短摘要
-                prompt = f"请为以下学术文章标题生成一个50字左右的简短摘要：\n\n标题：{article['title']}\n\n期刊：{article['journal']}\n\n摘要："
-                
-                headers = {
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Bearer {self.config.DEEPSEEK_API_KEY}'
-                }
-                
-                data = {
-                    "model": "deepseek-chat",
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 100,
-                    "stream": False
-                }
-                
-                response = requests.post(
-                    self.config.DEEPSEEK_API_URL,
-                    headers=headers,
-                    json=data,
-                    timeout=30
-                )
-                response.raise_for_status()
-                
-                result = response.json()
-                summary = result['choices'][0]['message']['content'].strip()
+                summary = self.summarize_article(article)
                 
                 individual_summaries.append({
                     'title': article['title'],
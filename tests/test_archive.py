@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""ArchiveBuilder 的增量发布：只重写受影响的页面，索引页从新到旧排列"""
+
+import os
+import re
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from config import Config
+from archive import ArchiveBuilder, slugify
+
+
+def day_articles(date):
+    journal = 'Journal A' if int(date[-2:]) % 2 else 'Journal B'
+    return [{'title': f'Paper {date}', 'link': f'https://example.com/{date}', 'journal': journal}]
+
+
+class ArchiveBuilderTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        for patcher in (
+            mock.patch.dict(Config.PATHS, {
+                'templates_dir': os.path.join(ROOT_DIR, 'templates'),
+                'data_dir': os.path.join(tmp_dir, 'data'),
+                'archive_dir': os.path.join(tmp_dir, 'archive')
+            }),
+            mock.patch.dict(Config.ARCHIVE_CONFIG, {'page_size': 2}),
+            # 共享的模板环境把字节码缓存放在 data_dir 下，测试中单独创建
+            mock.patch('html_generator._template_env', None)
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.builder = ArchiveBuilder()
+        for day in range(1, 6):
+            self.publish(f'2025-03-0{day}')
+        self.builder.build()
+
+    def publish(self, date, summary=None):
+        self.builder.add_day(date, day_articles(date), summary or f'{date} 的摘要')
+
+    def build(self):
+        """构建一次，返回写入的归档页面（相对路径）"""
+        written = set()
+        write_file = self.builder._write_file
+
+        def record(filepath, content):
+            if filepath.startswith(self.builder.output_dir):
+                written.add(os.path.relpath(filepath, self.builder.output_dir).replace(os.sep, '/'))
+            write_file(filepath, content)
+
+        with mock.patch.object(self.builder, '_write_file', side_effect=record):
+            count = self.builder.build()
+        self.assertEqual(count, len(written))
+        return written
+
+    def page_dates(self, path):
+        with open(os.path.join(self.builder.output_dir, path), 'r', encoding='utf-8') as f:
+            return re.findall(r'days/(\d{4}-\d{2}-\d{2})\.html', f.read())
+
+    def test_publishing_two_days_rewrites_only_affected_pages(self):
+        journal_a = f'journals/{slugify("Journal A")}/'
+        journal_b = f'journals/{slugify("Journal B")}/'
+
+        # 新增 03-06（Journal B）：日期索引原最后一页 [03-05] 变为 [03-05, 03-06]；
+        # Journal B 新增第2页，原第1页加上“较新”链接；Journal A 的页面不变
+        self.publish('2025-03-06')
+        self.assertEqual(self.build(), {
+            'days/2025-03-06.html', 'page-3.html', 'index.html',
+            f'{journal_b}page-1.html', f'{journal_b}page-2.html', f'{journal_b}index.html',
+            'journals/index.html'
+        })
+
+        # 修改 03-01（Journal A）的摘要：只有它所在的第一页需要更新
+        self.publish('2025-03-01', summary='更新后的摘要')
+        self.assertEqual(self.build(), {'days/2025-03-01.html', 'page-1.html'})
+
+        self.assertEqual(self.build(), set())
+        self.assertTrue(os.path.exists(os.path.join(self.builder.output_dir, f'{journal_a}index.html')))
+
+    def test_index_pages_are_newest_first(self):
+        self.publish('2025-03-06')
+        self.build()
+
+        self.assertEqual(self.page_dates('index.html'), ['2025-03-06', '2025-03-05'])
+        self.assertEqual(self.page_dates('page-3.html'), ['2025-03-06', '2025-03-05'])
+        self.assertEqual(self.page_dates('page-2.html'), ['2025-03-04', '2025-03-03'])
+        self.assertEqual(self.page_dates('page-1.html'), ['2025-03-02', '2025-03-01'])
+        with open(os.path.join(self.builder.output_dir, 'index.html'), 'r', encoding='utf-8') as f:
+            html = f.read()
+        self.assertIn('href="page-2.html"', html)
+        self.assertNotIn('较新', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
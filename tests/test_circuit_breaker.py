@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""CircuitBreakers 半开状态只放行一个试探请求"""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from circuit_breaker import CircuitBreakers, OPEN, HALF_OPEN
+
+HOST = 'api.example.com'
+
+
+class HalfOpenTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        patcher = mock.patch.dict(Config.CIRCUIT_CONFIG, {'enabled': True, 'failure_threshold': 1,
+                                                          'cooldown_minutes': 30})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.breakers = CircuitBreakers(os.path.join(tmp_dir, 'circuit_state.json'))
+        self.breakers.record_failure(HOST)
+        self.assertFalse(self.breakers.allow(HOST))
+        self.breakers.begin_run()
+        self.assertEqual(self.breakers.hosts[HOST]['state'], HALF_OPEN)
+
+    def allow_in_thread(self):
+        allowed = []
+        thread = threading.Thread(target=lambda: allowed.append(self.breakers.allow(HOST)))
+        thread.start()
+        thread.join()
+        return allowed[0]
+
+    def test_only_one_trial_in_flight(self):
+        self.assertTrue(self.breakers.allow(HOST))
+        self.assertFalse(self.allow_in_thread())
+        self.assertFalse(self.allow_in_thread())
+        self.assertEqual(self.breakers.skipped_hosts(), {HOST: 2})
+
+    def test_successful_trial_closes(self):
+        self.assertTrue(self.breakers.allow(HOST))
+        self.breakers.record_success(HOST)
+        self.breakers.release(HOST)
+
+        self.assertNotIn(HOST, self.breakers.hosts)
+        self.assertTrue(self.allow_in_thread())
+        self.assertTrue(self.allow_in_thread())
+
+    def test_failed_trial_reopens(self):
+        self.assertTrue(self.breakers.allow(HOST))
+        self.breakers.record_failure(HOST)
+        self.breakers.release(HOST)
+
+        self.assertEqual(self.breakers.hosts[HOST]['state'], OPEN)
+        self.assertFalse(self.allow_in_thread())
+
+    def test_trial_without_result_frees_the_slot(self):
+        self.assertTrue(self.breakers.allow(HOST))
+        # 其他线程的请求结束不会释放本线程的试探名额
+        thread = threading.Thread(target=self.breakers.release, args=(HOST,))
+        thread.start()
+        thread.join()
+        self.assertFalse(self.allow_in_thread())
+
+        self.breakers.release(HOST)
+        self.assertEqual(self.breakers.hosts[HOST]['state'], HALF_OPEN)
+        self.assertTrue(self.allow_in_thread())
+
+    def test_closed_host_is_not_limited(self):
+        self.breakers.record_success(HOST)
+        self.assertTrue(self.breakers.allow(HOST))
+        self.assertTrue(self.allow_in_thread())
+        self.assertEqual(self.breakers.trials, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""CronSchedule 的步长、范围、日/周“或”规则和周日写作7"""
+
+import os
+import sys
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from daemon import CronSchedule
+
+
+class CronScheduleTest(unittest.TestCase):
+
+    def test_minute_step(self):
+        schedule = CronSchedule('*/15 * * * *')
+        self.assertEqual(schedule.next_after(datetime(2025, 3, 3, 8, 0)), datetime(2025, 3, 3, 8, 15))
+        self.assertEqual(schedule.next_after(datetime(2025, 3, 3, 8, 50, 30)), datetime(2025, 3, 3, 9, 0))
+
+    def test_weekday_range(self):
+        # 2025-03-07 是周五，下一个工作日 8:00 是周一 03-10
+        schedule = CronSchedule('0 8 * * 1-5')
+        self.assertEqual(schedule.next_after(datetime(2025, 3, 7, 8, 0)), datetime(2025, 3, 10, 8, 0))
+        self.assertFalse(schedule.day_matches(datetime(2025, 3, 8)))
+        self.assertTrue(schedule.day_matches(datetime(2025, 3, 10)))
+
+    def test_day_or_weekday_when_both_restricted(self):
+        # 每月1日或每周一
+        schedule = CronSchedule('0 8 1 * 1')
+        self.assertTrue(schedule.day_matches(datetime(2025, 3, 1)))    # 周六，但是1日
+        self.assertTrue(schedule.day_matches(datetime(2025, 3, 3)))    # 周一
+        self.assertFalse(schedule.day_matches(datetime(2025, 3, 4)))
+        self.assertEqual(schedule.next_after(datetime(2025, 3, 1, 9, 0)), datetime(2025, 3, 3, 8, 0))
+
+    def test_day_step_is_not_restricted(self):
+        # '*/2' 以*开头，与周字段按“且”组合：奇数日且为周一
+        schedule = CronSchedule('0 8 */2 * 1')
+        self.assertFalse(schedule.day_restricted)
+        self.assertFalse(schedule.day_matches(datetime(2025, 3, 1)))   # 奇数日但不是周一
+        self.assertFalse(schedule.day_matches(datetime(2025, 3, 10)))  # 周一但是偶数日
+        self.assertTrue(schedule.day_matches(datetime(2025, 3, 17)))
+        self.assertEqual(schedule.next_after(datetime(2025, 3, 1)), datetime(2025, 3, 3, 8, 0))
+
+    def test_sunday_as_seven(self):
+        schedule = CronSchedule('30 6 * * 7')
+        self.assertEqual(schedule.weekdays, {0})
+        self.assertTrue(schedule.day_matches(datetime(2025, 3, 9)))
+        self.assertEqual(schedule.next_after(datetime(2025, 3, 3)), datetime(2025, 3, 9, 6, 30))
+        self.assertEqual(CronSchedule('30 6 * * 0').next_after(datetime(2025, 3, 3)), datetime(2025, 3, 9, 6, 30))
+
+
+if __name__ == '__main__':
+    unittest.main()
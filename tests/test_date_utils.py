@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""normalize_date 的内置写法与解析规则指定的格式"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from date_utils import normalize_date
+
+
+class NormalizeDateTest(unittest.TestCase):
+
+    def test_builtin_formats(self):
+        self.assertEqual(normalize_date('2025-01-15T08:00:00Z'), '2025-01-15')
+        self.assertEqual(normalize_date('Published: 13 March 2025'), '2025-03-13')
+        self.assertEqual(normalize_date('January 15, 2025'), '2025-01-15')
+        self.assertEqual(normalize_date('01/15/2025'), '2025-01-15')
+        self.assertEqual(normalize_date('March 2025'), '2025-03-01')
+        self.assertIsNone(normalize_date('no date here'))
+
+    def test_day_first_format_beats_us_numeric(self):
+        self.assertEqual(normalize_date('03/04/2025', ('%d/%m/%Y',)), '2025-04-03')
+        self.assertEqual(normalize_date('03/04/2025'), '2025-03-04')
+
+    def test_day_first_format_for_dates_invalid_as_us(self):
+        self.assertEqual(normalize_date('15/01/2025', ('%d/%m/%Y',)), '2025-01-15')
+        self.assertEqual(normalize_date('15.01.2025', ('%d.%m.%Y',)), '2025-01-15')
+        self.assertIsNone(normalize_date('15/01/2025'))
+
+    def test_invalid_builtin_match_falls_through(self):
+        # 数字形式的非法日期不应挡住后面的年月写法
+        self.assertEqual(normalize_date('13/45/2025 · March 2025'), '2025-03-01')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""SMTPConnection 的连接复用、断线重连和 421 重试，以及 EmailSender.send_bulk（使用进程内的SMTP服务器）"""
+
+import os
+import sys
+import logging
+import threading
+import socketserver
+import unittest
+from unittest import mock
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from email_sender import SMTPConnection, EmailSender
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """最小的SMTP会话：不支持STARTTLS和AUTH，DATA之后按服务器的剧本应答"""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode('ascii'))
+        self.wfile.flush()
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 localhost ESMTP test')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 localhost')
+            elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                with server.lock:
+                    action = server.script.pop(0) if server.script else 'ok'
+                    if action == 'ok':
+                        server.delivered += 1
+                if action == 'drop':
+                    return
+                if action == '421':
+                    self.reply('421 Service not available, closing channel')
+                    return
+                self.reply('250 OK queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPTestServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, script=None):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.lock = threading.Lock()
+        # 依次对每次DATA的处理：'ok' 接收，'421' 应答421后断开，'drop' 不应答直接断开
+        self.script = list(script or [])
+        self.connections = 0
+        self.delivered = 0
+
+
+class SMTPTestCase(unittest.TestCase):
+
+    def start_server(self, script=None):
+        server = SMTPTestServer(script)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    @staticmethod
+    def message(recipient='reader@example.com'):
+        msg = MIMEText('正文', 'plain', 'utf-8')
+        msg['Subject'] = '测试'
+        msg['From'] = 'sender@example.com'
+        msg['To'] = recipient
+        return msg
+
+
+class SMTPConnectionTest(SMTPTestCase):
+
+    def make_connection(self, server, **overrides):
+        email_config = {
+            'smtp_server': '127.0.0.1',
+            'smtp_port': server.server_address[1],
+            'sender_email': 'sender@example.com',
+            'sender_password': 'secret',
+            'use_tls': False,
+            'timeout': 5,
+            'max_retries': 1,
+            'max_messages_per_connection': 0
+        }
+        email_config.update(overrides)
+        connection = SMTPConnection(email_config, logging.getLogger(__name__))
+        self.addCleanup(connection.close)
+        return connection
+
+    def test_reuses_one_connection(self):
+        server = self.start_server()
+        connection = self.make_connection(server)
+        results = [connection.deliver(self.message()) for _ in range(3)]
+
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual([result['attempts'] for result in results], [1, 1, 1])
+        self.assertEqual(server.delivered, 3)
+        self.assertEqual(server.connections, 1)
+
+    def test_reconnects_after_disconnect(self):
+        server = self.start_server(['drop'])
+        connection = self.make_connection(server)
+        result = connection.deliver(self.message())
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['attempts'], 2)
+        self.assertEqual(server.delivered, 1)
+        self.assertEqual(server.connections, 2)
+
+    def test_retries_on_a_new_connection_after_421(self):
+        server = self.start_server(['421'])
+        connection = self.make_connection(server)
+        result = connection.deliver(self.message())
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['attempts'], 2)
+        self.assertEqual(server.delivered, 1)
+        self.assertEqual(server.connections, 2)
+
+    def test_gives_up_after_max_retries(self):
+        server = self.start_server(['421', '421'])
+        connection = self.make_connection(server, max_retries=1)
+        result = connection.deliver(self.message())
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['attempts'], 2)
+        self.assertIn('421', result['error'])
+        self.assertEqual(server.delivered, 0)
+
+    def test_rotates_connection_at_message_limit(self):
+        server = self.start_server()
+        connection = self.make_connection(server, max_messages_per_connection=2)
+        results = [connection.deliver(self.message()) for _ in range(3)]
+
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(server.delivered, 3)
+        self.assertEqual(server.connections, 2)
+
+    def test_warns_when_password_is_configured_but_auth_is_not_offered(self):
+        server = self.start_server()
+        connection = self.make_connection(server)
+        with self.assertLogs(__name__, level='WARNING') as logs:
+            connection.connect()
+        self.assertIn('AUTH', logs.output[0])
+
+        quiet = self.make_connection(server, sender_password='')
+        with self.assertNoLogs(__name__, level='WARNING'):
+            quiet.connect()
+
+
+class SendBulkTest(SMTPTestCase):
+
+    def bulk_sender(self, server, **overrides):
+        email_config = {
+            'smtp_server': '127.0.0.1',
+            'smtp_port': server.server_address[1],
+            'sender_email': 'sender@example.com',
+            'sender_password': '',
+            'use_tls': False,
+            'timeout': 5,
+            'max_connections': 2,
+            'max_messages_per_connection': 0,
+            'max_retries': 1
+        }
+        email_config.update(overrides)
+        patcher = mock.patch.dict(Config.EMAIL_CONFIG, email_config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return EmailSender()
+
+    def test_results_follow_message_order(self):
+        server = self.start_server()
+        sender = self.bulk_sender(server)
+        recipients = [f'reader{i}@example.com' for i in range(5)]
+        results = sender.send_bulk([self.message(recipient) for recipient in recipients])
+
+        self.assertEqual([result['recipient'] for result in results], recipients)
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(server.delivered, 5)
+        # 每个工作线程只建立一条连接
+        self.assertEqual(server.connections, 2)
+
+    def test_failed_message_is_reported_without_stopping_others(self):
+        server = self.start_server(['421', '421'])
+        sender = self.bulk_sender(server, max_connections=1)
+        results = sender.send_bulk([self.message(f'reader{i}@example.com') for i in range(3)])
+
+        self.assertEqual([result['success'] for result in results], [False, True, True])
+        self.assertIn('421', results[0]['error'])
+        self.assertEqual(server.delivered, 2)
+
+    def test_empty_batch(self):
+        self.assertEqual(EmailSender().send_bulk([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
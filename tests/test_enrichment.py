@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""AbstractEnricher 的PMID/DOI分流和部分批次失败时的缓存（使用假的HTTP客户端和文章库）"""
+
+import os
+import sys
+import json
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from enrichment import AbstractEnricher, CROSSREF_URL
+
+ABSTRACT = 'Background: ' + ' '.join(['a long structured abstract'] * 10)
+
+
+class FakeResponse:
+
+    def __init__(self, status_code=200, content=b'', payload=None):
+        self.status_code = status_code
+        self.content = content
+        self.payload = payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f'HTTP {self.status_code}')
+
+    def json(self):
+        return self.payload
+
+
+class FakeHTTP:
+    """记录请求；efetch 为PMID 111 返回带DOI的摘要，其余请求按 fail 规则返回503"""
+
+    def __init__(self, fail=lambda source, batch: False):
+        self.fail = fail
+        self.calls = []
+
+    def post(self, url, data=None, source=None, deadline=None):
+        if url.endswith('efetch.fcgi'):
+            batch = data['id'].split(',')
+            self.calls.append(('efetch', batch))
+            if self.fail('efetch', batch):
+                return FakeResponse(503)
+            articles = ''.join(
+                f'<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article><Abstract>'
+                f'<AbstractText>{ABSTRACT}</AbstractText></Abstract></Article></MedlineCitation>'
+                f'<PubmedData><ArticleIdList><ArticleId IdType="doi">10.1000/P{pmid}</ArticleId>'
+                f'</ArticleIdList></PubmedData></PubmedArticle>'
+                for pmid in batch if pmid == '111')
+            return FakeResponse(content=f'<PubmedArticleSet>{articles}</PubmedArticleSet>'.encode())
+        batch = [term.split('"')[1] for term in data['term'].split(' OR ')]
+        self.calls.append(('esearch', batch))
+        if self.fail('esearch', batch):
+            return FakeResponse(503)
+        return FakeResponse(payload={'esearchresult': {'idlist': []}})
+
+    def get(self, url, params=None, source=None, deadline=None):
+        assert url == CROSSREF_URL
+        batch = [doi[4:] for doi in params['filter'].split(',')]
+        self.calls.append(('crossref', batch))
+        if self.fail('crossref', batch):
+            return FakeResponse(503)
+        items = [{'DOI': doi.upper(), 'abstract': f'<jats:p>{ABSTRACT}</jats:p>'}
+                 for doi in batch if doi == '10.1000/found']
+        return FakeResponse(payload={'message': {'items': items}})
+
+
+class FakeStore:
+
+    def __init__(self):
+        self.saved = {}
+
+    def get_enrichments(self, keys, retry_days):
+        return {key: self.saved[key] for key in keys if key in self.saved}
+
+    def save_enrichments(self, results):
+        self.saved.update(results)
+
+
+class AbstractEnricherTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(Config.ENRICH_CONFIG, {'enabled': True, 'batch_size': 2})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_enricher(self, http):
+        return AbstractEnricher(store=FakeStore(), http=http)
+
+    def test_pmid_and_doi_are_split(self):
+        http = FakeHTTP()
+        enricher = self.make_enricher(http)
+        articles = [
+            # 有PMID的文章只走efetch，不再按DOI查询
+            {'title': 'a', 'link': 'https://pubmed.ncbi.nlm.nih.gov/111/', 'doi': '10.1000/P111'},
+            {'title': 'b', 'link': 'https://doi.org/10.1000/found'},
+            {'title': 'c', 'link': 'https://doi.org/10.1000/missing'},
+        ]
+
+        self.assertEqual(enricher.enrich(articles), 2)
+
+        self.assertEqual(http.calls, [
+            ('esearch', ['10.1000/found', '10.1000/missing']),
+            ('efetch', ['111']),
+            ('crossref', ['10.1000/found', '10.1000/missing']),
+        ])
+        self.assertEqual(articles[0]['abstract'], ABSTRACT)
+        self.assertEqual(articles[1]['abstract'], ABSTRACT)
+        self.assertNotIn('abstract', articles[2])
+        saved = enricher.store.saved
+        self.assertEqual(saved['pmid:111'], ABSTRACT)
+        self.assertEqual(saved['doi:10.1000/p111'], ABSTRACT)
+        self.assertEqual(saved['doi:10.1000/missing'], '')
+
+    def test_failed_batch_is_not_cached_as_missing(self):
+        # 第二批DOI的Crossref请求失败：这批DOI不能记为“未查到”
+        http = FakeHTTP(fail=lambda source, batch: source == 'crossref' and '10.1000/c' in batch)
+        enricher = self.make_enricher(http)
+        articles = [{'title': doi, 'link': f'https://doi.org/{doi}'}
+                    for doi in ('10.1000/a', '10.1000/b', '10.1000/c')]
+
+        self.assertEqual(enricher.enrich(articles), 0)
+
+        self.assertEqual(enricher.store.saved, {'doi:10.1000/a': '', 'doi:10.1000/b': ''})
+
+        # 下次运行只重试失败批次中的DOI
+        http.calls.clear()
+        http.fail = lambda source, batch: False
+        enricher.enrich(articles)
+        self.assertEqual(http.calls, [('esearch', ['10.1000/c']), ('crossref', ['10.1000/c'])])
+        self.assertEqual(enricher.store.saved['doi:10.1000/c'], '')
+
+    def test_failed_efetch_is_not_cached_as_missing(self):
+        http = FakeHTTP(fail=lambda source, batch: source == 'efetch' and '333' in batch)
+        enricher = self.make_enricher(http)
+        articles = [{'title': pmid, 'link': f'https://pubmed.ncbi.nlm.nih.gov/{pmid}/'}
+                    for pmid in ('111', '222', '333')]
+
+        self.assertEqual(enricher.enrich(articles), 1)
+
+        self.assertNotIn('pmid:333', enricher.store.saved)
+        self.assertEqual(enricher.store.saved['pmid:222'], '')
+
+
+if __name__ == '__main__':
+    unittest.main()
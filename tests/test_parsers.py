@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""用 fixtures/parsers 下保存的页面样本校验每种期刊类型的解析规则"""
+
+import os
+import sys
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from parsers import validate_parsers, get_specs
+
+
+class ValidateParsersTest(unittest.TestCase):
+
+    def test_every_fixture_passes(self):
+        results = validate_parsers(os.path.join(ROOT_DIR, 'fixtures', 'parsers'))
+
+        self.assertTrue(set(get_specs()) <= {journal_type for journal_type, _, _ in results})
+        failures = [(journal_type, message) for journal_type, ok, message in results if not ok]
+        self.assertEqual(failures, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+from config import Config
+from date_utils import is_within_window
+
+# 支持的数据来源（主题未指定 sources 时使用全部）
+SOURCES = ('arxiv', 'pubmed', 'crossref')
+
+
+def normalize_term(term):
+    """查询词规范化：小写并合并空白，用于跨主题去重"""
+    return ' '.join(term.lower().split())
+
+
+def get_window_days(topics=None):
+    """所有主题中最长的时间窗口（天）"""
+    topics = topics if topics is not None else Config.TOPICS
+    default = Config.CRAWL_CONFIG['days_back']
+    return max((topic.get('days_back') or default for topic in topics.values()), default=default)
+
+
+class TopicMatcher:
+    """根据 Config.TOPICS 为文章标注主题
+
+    文章由某主题的查询词检索得到（'query_terms'），或标题摘要命中该主题的
+    关键词，即视为属于该主题；同时须满足主题的来源和期刊限制。
+    """
+
+    def __init__(self, topics=None):
+        self.topics = topics if topics is not None else Config.TOPICS
+        # 每个主题的关键词合并为一个预编译正则，匹配时只需扫描一次文本
+        self.patterns = {}
+        self.terms = {}
+        self.sources = {}
+        self.journals = {}
+        for key, topic in self.topics.items():
+            keywords = sorted(topic.get('keywords', []), key=len, reverse=True)
+            if keywords:
+                self.patterns[key] = re.compile(
+                    r'\b(?:' + '|'.join(re.escape(k) for k in keywords) + r')',
+                    re.IGNORECASE
+                )
+            self.terms[key] = {normalize_term(term) for term in topic.get('terms', [])}
+            self.sources[key] = set(topic.get('sources') or SOURCES)
+            self.journals[key] = [journal.lower() for journal in topic.get('journals', [])]
+
+    def allows(self, key, article):
+        """文章是否满足主题的来源和期刊限制"""
+        source = article.get('source')
+        if source and source not in self.sources[key]:
+            return False
+        if self.journals[key]:
+            journal = (article.get('journal') or '').lower()
+            return any(name in journal for name in self.journals[key])
+        return True
+
+    def match(self, article):
+        """返回文章命中的主题键列表"""
+        text = f"{article.get('title', '')} {article.get('abstract', '')}"
+        query_terms = {normalize_term(term) for term in article.get('query_terms', [])}
+        matched = []
+        for key in self.topics:
+            pattern = self.patterns.get(key)
+            if (query_terms & self.terms[key]) or (pattern and pattern.search(text)):
+                if self.allows(key, article):
+                    matched.append(key)
+        return matched
+
+    def tag_articles(self, articles):
+        """为每篇文章写入 'topics' 字段"""
+        for article in articles:
+            article['topics'] = self.match(article)
+        return articles
+
+    def topic_name(self, key):
+        """获取主题的显示名称"""
+        return self.topics.get(key, {}).get('name', key)
+
+
+class QueryPlanner:
+    """把所有主题的查询词合并为每个来源的查询计划
+
+    相同（规范化后）的查询词在同一来源只查询一次，时间窗口取需要它的
+    主题中最长的一个；查询结果再按主题的查询词、关键词、来源、期刊和
+    时间窗口分配回各主题。
+    """
+
+    def __init__(self, topics=None):
+        self.topics = topics if topics is not None else Config.TOPICS
+        self.matcher = TopicMatcher(self.topics)
+        default = Config.CRAWL_CONFIG['days_back']
+        self.windows = {key: topic.get('days_back') or default for key, topic in self.topics.items()}
+        self.window_days = get_window_days(self.topics)
+
+    def plan(self):
+        """返回 {来源: [{'term', 'days_back', 'topics'}, ...]}，查询词按首次出现的顺序"""
+        plan = {}
+        for key, topic in self.topics.items():
+            for source in topic.get('sources') or SOURCES:
+                queries = plan.setdefault(source, {})
+                for term in topic.get('terms', []):
+                    query = queries.setdefault(normalize_term(term), {
+                        'term': term,
+                        'days_back': 0,
+                        'topics': []
+                    })
+                    query['days_back'] = max(query['days_back'], self.windows[key])
+                    query['topics'].append(key)
+        return {source: list(queries.values()) for source, queries in plan.items()}
+
+    def sources(self):
+        """至少有一个主题使用的来源"""
+        return list(self.plan())
+
+    def within_window(self, article, key):
+        """文章日期是否在主题的时间窗口内（没有日期时保留）"""
+        return is_within_window(article.get('date') or '', self.windows[key])
+
+    def assign(self, articles):
+        """为文章写入所属主题，不属于任何主题的文章被丢弃"""
+        assigned = []
+        for article in articles:
+            topics = self.matcher.match(article)
+            article.pop('query_terms', None)
+            # 查询按最长窗口进行，窗口较短的主题需要再按日期过滤
+            article['topics'] = [key for key in topics
+                                 if self.windows[key] >= self.window_days
+                                 or self.within_window(article, key)]
+            if article['topics']:
+                assigned.append(article)
+        return assigned